@@ -1,17 +1,24 @@
 # File: backend/libs/auth_utils/src/auth_utils/__init__.py
 from .models.user import CurrentUser
-from .dependencies import get_current_user
+from .dependencies import get_current_user, get_gateway_user
 from .permissions import require_roles, require_permissions, validate_ownership
 from .jwt import decode_jwt
+from .identity import verify_identity_assertion
+from .deadline import DeadlineMiddleware, check_deadline, deadline_remaining
 from .config import JWT_SECRET_KEY, JWT_ALGORITHM
 
 __all__ = [
         "CurrentUser",
         "get_current_user",
+        "get_gateway_user",
         "require_roles",
         "require_permissions",
         "validate_ownership",
         "decode_jwt",
+        "verify_identity_assertion",
+        "DeadlineMiddleware",
+        "check_deadline",
+        "deadline_remaining",
         "JWT_SECRET_KEY",
         "JWT_ALGORITHM"
     ]
\ No newline at end of file
@@ -4,3 +4,14 @@ import os
 # JWT Configuration (load from environment in production)
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "YOUR_JWT_SECRET_KEY")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+
+# Identity assertion signed by the API gateway (empty key: assertions are ignored
+# and every request is verified from its JWT). The key must match the gateway's.
+GATEWAY_IDENTITY_KEY = os.getenv("GATEWAY_IDENTITY_KEY", "")
+GATEWAY_IDENTITY_HEADER = os.getenv("GATEWAY_IDENTITY_HEADER", "X-Gateway-Identity")
+# Audience this service accepts assertions for, e.g. "pdf-service". Required with a key:
+# assertions whose `aud` does not match (or with no audience configured) are refused.
+GATEWAY_IDENTITY_AUDIENCE = os.getenv("GATEWAY_IDENTITY_AUDIENCE")
+
+# Milliseconds the caller (the API gateway) still waits for the response
+DEADLINE_HEADER = os.getenv("DEADLINE_HEADER", "X-Request-Timeout-Ms")
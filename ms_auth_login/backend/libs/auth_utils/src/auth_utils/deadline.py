@@ -0,0 +1,87 @@
+# File: backend/libs/auth_utils/src/auth_utils/deadline.py
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+
+from .config import DEADLINE_HEADER
+
+# [time.monotonic() by which the current request must be answered], a list so the
+# middleware can clear it once the response is sent, whichever context reads it
+_deadline: ContextVar[Optional[List[Optional[float]]]] = ContextVar("request_deadline", default=None)
+
+
+def deadline_remaining() -> Optional[float]:
+    """Seconds left until the current request's deadline, None if it has none"""
+    holder = _deadline.get()
+    if holder is None or holder[0] is None:
+        return None
+    return holder[0] - time.monotonic()
+
+
+def check_deadline():
+    """
+    Stop work nobody is waiting for any more
+
+    Raises:
+        HTTPException: 504 if the current request's deadline has passed
+    """
+    left = deadline_remaining()
+    if left is not None and left <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Request deadline exceeded"
+        )
+
+
+class DeadlineMiddleware:
+    """
+    Read the deadline the API gateway forwards in DEADLINE_HEADER (milliseconds left)
+
+    The deadline is kept in a context variable for `deadline_remaining`,
+    and `check_deadline`, which also reach threadpool
+    dependencies such as database sessions. Requests whose deadline has
+    already passed on arrival are answered with 504 without running.
+    Background tasks run after the response was sent, when nobody waits
+    any more, so the deadline no longer applies to them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.header = DEADLINE_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = None
+        for name, value in scope["headers"]:
+            if name == self.header:
+                if value.isdigit():
+                    deadline = time.monotonic() + int(value) / 1000
+                break
+
+        if deadline is not None and deadline <= time.monotonic():
+            await send({"type": "http.response.start", "status": status.HTTP_504_GATEWAY_TIMEOUT,
+                        "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+            await send({"type": "http.response.body", "body": b"Request deadline exceeded"})
+            return
+
+        if deadline is None:
+            await self.app(scope, receive, send)
+            return
+
+        holder = [deadline]
+
+        async def send_until_answered(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                holder[0] = None
+
+        token = _deadline.set(holder)
+        try:
+            await self.app(scope, receive, send_until_answered)
+        finally:
+            _deadline.reset(token)
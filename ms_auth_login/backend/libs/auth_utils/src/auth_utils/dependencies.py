@@ -1,12 +1,37 @@
 # File: backend/libs/auth_utils/src/auth_utils/dependencies.py
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from .config import GATEWAY_IDENTITY_KEY, GATEWAY_IDENTITY_HEADER, GATEWAY_IDENTITY_AUDIENCE
+from .identity import verify_identity_assertion
 from .models.user import CurrentUser
 from .jwt import decode_jwt
 
 # Token security scheme
 security = HTTPBearer()
+# Same scheme, but a missing token is left to the dependency (gateway assertions need none)
+optional_security = HTTPBearer(auto_error=False)
+
+
+def _user_from_claims(payload: dict) -> CurrentUser:
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User identifier missing"
+        )
+
+    return CurrentUser(
+        id=user_id,
+        email=payload.get("email", ""),
+        name=payload.get("name"),
+        roles=payload.get("roles", []),
+        permissions=payload.get("permissions", []),
+        metadata=payload.get("metadata", {})
+    )
+
 
 async def get_current_user(
         credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -27,19 +52,42 @@ async def get_current_user(
     # Decode and validate the token
     payload = decode_jwt(token, service_name)
 
-    # Extract user information
-    user_id = payload.get("sub")
-    if user_id is None:
+    return _user_from_claims(payload)
+
+
+async def get_gateway_user(
+        request: Request,
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+        service_name: str = None
+) -> CurrentUser:
+    """
+    Dependency to get the current user, trusting the API gateway's identity assertion
+
+    Behind the gateway the token was already verified there, so the signed
+    identity header is checked with a single HMAC instead. Requests without
+    the header (or with GATEWAY_IDENTITY_KEY unset) fall back to full JWT
+    verification, so the service still works when called directly.
+    Assertions are only accepted for GATEWAY_IDENTITY_AUDIENCE, or
+    service_name when no audience is configured.
+
+    Args:
+        request: The incoming request
+        credentials: The HTTP Bearer token, if any
+        service_name: Optional service name to validate against audience
+
+    Returns:
+        CurrentUser: The current authenticated user
+    """
+    assertion = request.headers.get(GATEWAY_IDENTITY_HEADER)
+    if assertion is not None and GATEWAY_IDENTITY_KEY:
+        audience = GATEWAY_IDENTITY_AUDIENCE or service_name
+        return _user_from_claims(verify_identity_assertion(assertion, GATEWAY_IDENTITY_KEY, audience))
+
+    if credentials is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User identifier missing"
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
         )
 
-    return CurrentUser(
-        id=user_id,
-        email=payload.get("email", ""),
-        name=payload.get("name"),
-        roles=payload.get("roles", []),
-        permissions=payload.get("permissions", []),
-        metadata=payload.get("metadata", {})
-    )
\ No newline at end of file
+    return _user_from_claims(decode_jwt(credentials.credentials, service_name))
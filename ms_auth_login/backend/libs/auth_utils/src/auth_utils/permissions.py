@@ -4,7 +4,7 @@ from uuid import UUID
 from fastapi import Depends, HTTPException, status
 
 from .models.user import CurrentUser
-from .dependencies import get_current_user
+from .dependencies import get_gateway_user
 
 def require_roles(required_roles: List[str]):
     """
@@ -17,7 +17,7 @@ def require_roles(required_roles: List[str]):
         Dependency function that yields the current user if authorized
     """
 
-    async def role_checker(current_user: CurrentUser = Depends(get_current_user)):
+    async def role_checker(current_user: CurrentUser = Depends(get_gateway_user)):
         for role in required_roles:
             if role in current_user.roles:
                 return current_user
@@ -41,7 +41,7 @@ def require_permissions(required_permissions: List[str]):
         Dependency function that yields the current user if authorized
     """
 
-    async def permission_checker(current_user: CurrentUser = Depends(get_current_user)):
+    async def permission_checker(current_user: CurrentUser = Depends(get_gateway_user)):
         user_permissions = current_user.permissions
 
         for permission in required_permissions:
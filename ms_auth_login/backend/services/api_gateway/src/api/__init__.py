@@ -2,8 +2,10 @@
 from fastapi import APIRouter
 from ..routes.health import router as health_router
 from ..routes.info import router as info_router
+from ..routes.metrics import router as metrics_router
 
 # Combine all routers
 router = APIRouter()
 router.include_router(health_router)
-router.include_router(info_router)
\ No newline at end of file
+router.include_router(info_router)
+router.include_router(metrics_router)
\ No newline at end of file
@@ -1,7 +1,236 @@
+import datetime
+import json
 import logging
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from .settings import (
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_QUEUE_SIZE,
+    LOG_BATCH_SIZE,
+    LOG_RATE_LIMIT_PER_SECOND,
+    LOG_SAMPLE_RATES,
+)
+
+# Attributes every LogRecord has; others were passed with `extra=` and become JSON fields
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "log_class"}
+
+# Put on the queue by `close` to stop the writer thread
+_STOP = object()
+
+
+def record_class(record: logging.LogRecord) -> str:
+    """The class a record is sampled and rate limited by: its `log_class` extra, else "<logger>.<level>" """
+    return getattr(record, "log_class", None) or f"{record.name}.{record.levelname.lower()}"
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, `extra=` fields and the exception"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(
+                timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class LogSampler(logging.Filter):
+    """
+    Per-class sampling and rate limiting of log records
+
+    Classes listed in `sample_rates` (exactly, or by the part before the
+    first dot, so "access" covers "access.2xx") keep that fraction of their
+    records; every class then passes at most `per_second` records in each
+    second. Dropped records are only counted, which is what keeps an error
+    storm from turning into a logging storm.
+    """
+
+    def __init__(self, sample_rates: Dict[str, float] = None, per_second: int = LOG_RATE_LIMIT_PER_SECOND):
+        super().__init__()
+        self.sample_rates = dict(LOG_SAMPLE_RATES if sample_rates is None else sample_rates)
+        self.per_second = per_second
+        # class -> (second, records passed in it)
+        self._windows: Dict[str, Tuple[int, int]] = {}
+        self.sampled = 0
+        self.rate_limited = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        name = record_class(record)
+        rate = self.sample_rates.get(name, self.sample_rates.get(name.partition(".")[0], 1.0))
+        if rate < 1.0 and random.random() >= rate:
+            self.sampled += 1
+            return False
+
+        if self.per_second > 0:
+            second = int(time.monotonic())
+            window, passed = self._windows.get(name, (second, 0))
+            if window != second:
+                passed = 0
+            if passed >= self.per_second:
+                self.rate_limited += 1
+                return False
+            self._windows[name] = (second, passed + 1)
+        return True
+
+
+class QueueLogHandler(logging.Handler):
+    """
+    Logging handler that never blocks the caller
+
+    `emit` only renders the message and puts the record on a bounded queue;
+    a dedicated writer thread takes whatever has accumulated (up to
+    `batch_size` records), formats it and writes it to the stream in one
+    call. When the queue is full the record is dropped and counted, and the
+    writer reports the drops in its next batch, so a slow or blocked stdout
+    costs log lines instead of request latency.
+    """
+
+    def __init__(
+            self,
+            stream: Optional[TextIO] = None,
+            queue_size: int = LOG_QUEUE_SIZE,
+            batch_size: int = LOG_BATCH_SIZE,
+    ):
+        super().__init__()
+        # None: whatever sys.stderr is when a batch is written
+        self.stream = stream
+        self.batch_size = batch_size
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self._thread: Optional[threading.Thread] = None
+
+        self.dropped = 0
+        self._reported_drops = 0
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self._prepare(record)
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def _prepare(self, record: logging.LogRecord):
+        """Render everything that may change or not be thread-safe before the record leaves the caller"""
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = [record for record in batch if record is not _STOP]
+            self._write(records)
+            for _ in batch:
+                self.queue.task_done()
+            if len(records) < len(batch):
+                return
+
+    def _write(self, records: List[logging.LogRecord]):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.write_errors += 1
+        dropped = self.dropped
+        if dropped > self._reported_drops:
+            lines.append(self.format(logging.makeLogRecord({
+                "name": "api_gateway",
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": f"{dropped - self._reported_drops} log records dropped, the log queue was full",
+            })))
+            self._reported_drops = dropped
+        if not lines:
+            return
+
+        stream = self.stream if self.stream is not None else sys.stderr
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except Exception:
+            self.write_errors += 1
+            return
+        self.written += len(records)
+        self.batches += 1
+
+    def flush(self):
+        """Wait until every queued record was written"""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=1.0)
+            except queue.Full:
+                pass
+            thread.join(timeout=5.0)
+        super().close()
+
+    def stats(self) -> dict:
+        sampler = next((item for item in self.filters if isinstance(item, LogSampler)), None)
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "sampled": sampler.sampled if sampler else 0,
+            "rate_limited": sampler.rate_limited if sampler else 0,
+            "write_errors": self.write_errors,
+        }
+
+
+# Handler behind every gateway logger, read by the health and metrics routes
+log_handler = QueueLogHandler()
+log_handler.addFilter(LogSampler())
+log_handler.setFormatter(
+    JsonLinesFormatter() if LOG_FORMAT == "json"
+    else logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+)
+
 
 def setup_logging():
-    """Configure logging for the API Gateway"""
-    logging.basicConfig(level=logging.INFO)
+    """Configure logging for the API Gateway: queued, batched, sampled output on the root logger"""
+    root = logging.getLogger()
+    if log_handler not in root.handlers:
+        root.addHandler(log_handler)
+    root.setLevel(LOG_LEVEL)
+    log_handler.start()
     logger = logging.getLogger("api_gateway")
-    return logger
\ No newline at end of file
+    return logger
@@ -4,10 +4,268 @@ import os
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "YOUR_JWT_SECRET_KEY")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 
+# Verified-token cache: payloads are reused until the token expires (capped at
+# TOKEN_CACHE_MAX_TTL seconds), bounded by entry count and approximate bytes
+TOKEN_CACHE_ENABLED = os.getenv("TOKEN_CACHE_ENABLED", "true").lower() == "true"
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_CACHE_MAX_BYTES = int(os.getenv("TOKEN_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+TOKEN_CACHE_MAX_TTL = float(os.getenv("TOKEN_CACHE_MAX_TTL", "3600"))
+
+# Cheap structural checks run before any signature verification, and a
+# short-lived cache of rejected token digests
+JWT_ALLOWED_ALGORITHMS = [alg.strip() for alg in os.getenv("JWT_ALLOWED_ALGORITHMS", JWT_ALGORITHM).split(",")]
+TOKEN_MAX_LENGTH = int(os.getenv("TOKEN_MAX_LENGTH", "8192"))
+REJECTED_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("REJECTED_TOKEN_CACHE_MAX_ENTRIES", "50000"))
+REJECTED_TOKEN_CACHE_TTL = float(os.getenv("REJECTED_TOKEN_CACHE_TTL", "60"))
+
+# Signed identity assertion forwarded to services after the gateway verified the
+# token, so they can skip JWT verification (one HMAC check instead). The key is
+# shared only inside the cluster; empty disables the assertion. Client-supplied
+# copies of the header are always stripped.
+GATEWAY_IDENTITY_KEY = os.getenv("GATEWAY_IDENTITY_KEY", "")
+GATEWAY_IDENTITY_HEADER = os.getenv("GATEWAY_IDENTITY_HEADER", "X-Gateway-Identity")
+GATEWAY_IDENTITY_TTL = int(os.getenv("GATEWAY_IDENTITY_TTL", "60"))
+
+# Upstream connection pool configuration (shared defaults, per-service
+# "timeout" and optional "max_connections"/"http2" in SERVICES override them)
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30.0"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5.0"))
+UPSTREAM_POOL_TIMEOUT = float(os.getenv("UPSTREAM_POOL_TIMEOUT", "5.0"))
+UPSTREAM_DEFAULT_TIMEOUT = float(os.getenv("UPSTREAM_DEFAULT_TIMEOUT", "30.0"))
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "false").lower() == "true"
+
+# Client-side load balancing across service replicas: "least_outstanding" or
+# "power_of_two" (two random replicas, the less loaded one wins). Recovered or
+# newly added replicas ramp up their share over UPSTREAM_SLOW_START seconds.
+UPSTREAM_BALANCER = os.getenv("UPSTREAM_BALANCER", "least_outstanding")
+UPSTREAM_SLOW_START = float(os.getenv("UPSTREAM_SLOW_START", "30.0"))
+# Passive health: eject a replica after this many consecutive failures, for
+# UPSTREAM_EJECTION_TIME seconds times the number of times it was ejected
+UPSTREAM_EJECT_CONSECUTIVE_FAILURES = int(os.getenv("UPSTREAM_EJECT_CONSECUTIVE_FAILURES", "5"))
+UPSTREAM_EJECTION_TIME = float(os.getenv("UPSTREAM_EJECTION_TIME", "30.0"))
+UPSTREAM_MAX_EJECTION_PERCENT = int(os.getenv("UPSTREAM_MAX_EJECTION_PERCENT", "50"))
+# Active health: every replica's UPSTREAM_HEALTH_CHECK_PATH is probed concurrently
+# every interval (+/- jitter as a fraction of it, 0 disables); a replica is
+# unhealthy after UPSTREAM_UNHEALTHY_THRESHOLD failed probes in a row.
+# Latency/availability are kept over the last UPSTREAM_HEALTH_CHECK_WINDOW probes.
+UPSTREAM_HEALTH_CHECK_INTERVAL = float(os.getenv("UPSTREAM_HEALTH_CHECK_INTERVAL", "10.0"))
+UPSTREAM_HEALTH_CHECK_JITTER = float(os.getenv("UPSTREAM_HEALTH_CHECK_JITTER", "0.2"))
+UPSTREAM_HEALTH_CHECK_TIMEOUT = float(os.getenv("UPSTREAM_HEALTH_CHECK_TIMEOUT", "2.0"))
+UPSTREAM_HEALTH_CHECK_PATH = os.getenv("UPSTREAM_HEALTH_CHECK_PATH", "/health")
+UPSTREAM_HEALTH_CHECK_WINDOW = int(os.getenv("UPSTREAM_HEALTH_CHECK_WINDOW", "20"))
+UPSTREAM_UNHEALTHY_THRESHOLD = int(os.getenv("UPSTREAM_UNHEALTHY_THRESHOLD", "2"))
+
+# In-gateway DNS cache for upstream host names: new connections reuse addresses
+# resolved less than DNS_CACHE_TTL seconds ago, hosts in use are re-resolved in
+# the background every DNS_CACHE_REFRESH_INTERVAL seconds, and when the resolver
+# fails the last known addresses are kept for up to DNS_CACHE_STALE_TTL seconds
+DNS_CACHE_ENABLED = os.getenv("DNS_CACHE_ENABLED", "true").lower() == "true"
+DNS_CACHE_TTL = float(os.getenv("DNS_CACHE_TTL", "30"))
+DNS_CACHE_REFRESH_INTERVAL = float(os.getenv("DNS_CACHE_REFRESH_INTERVAL", "15"))
+DNS_CACHE_STALE_TTL = float(os.getenv("DNS_CACHE_STALE_TTL", "300"))
+
+# Optional service-discovery file (JSON, or YAML with PyYAML installed) of the form
+# {"services": {"pdf": {"urls": [...], ...}}}: each entry overrides the keys of the
+# SERVICES entry below with the same name (null removes the service, unknown names
+# add one). The file is polled every SERVICE_DISCOVERY_INTERVAL seconds and each
+# change is swapped in at once; clients of removed replicas are closed
+# SERVICE_DISCOVERY_DRAIN_TIMEOUT seconds later so in-flight requests can finish.
+SERVICE_DISCOVERY_FILE = os.getenv("SERVICE_DISCOVERY_FILE", "")
+SERVICE_DISCOVERY_INTERVAL = float(os.getenv("SERVICE_DISCOVERY_INTERVAL", "2.0"))
+SERVICE_DISCOVERY_DRAIN_TIMEOUT = float(os.getenv("SERVICE_DISCOVERY_DRAIN_TIMEOUT", "120"))
+
+# Per-upstream circuit breaker: trips when, over the last CIRCUIT_BREAKER_WINDOW
+# seconds and at least CIRCUIT_BREAKER_MIN_REQUESTS requests, the share of
+# failures (errors, timeouts, 5xx) or of calls slower than
+# CIRCUIT_BREAKER_SLOW_CALL_DURATION reaches its threshold
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+CIRCUIT_BREAKER_WINDOW = int(os.getenv("CIRCUIT_BREAKER_WINDOW", "10"))
+CIRCUIT_BREAKER_MIN_REQUESTS = int(os.getenv("CIRCUIT_BREAKER_MIN_REQUESTS", "20"))
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5"))
+CIRCUIT_BREAKER_SLOW_CALL_DURATION = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_DURATION", "5.0"))
+CIRCUIT_BREAKER_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_RATE", "0.8"))
+CIRCUIT_BREAKER_OPEN_DURATION = float(os.getenv("CIRCUIT_BREAKER_OPEN_DURATION", "30.0"))
+CIRCUIT_BREAKER_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_PROBES", "3"))
+
+# Per-service bulkheads: an adaptive (AIMD, latency-driven) limit on concurrent
+# upstream calls between BULKHEAD_MIN_LIMIT and BULKHEAD_MAX_LIMIT; requests
+# over it wait in a queue of BULKHEAD_QUEUE_SIZE served earliest deadline first,
+# and are shed with 503 when it is full. Calls slower than
+# BULKHEAD_LATENCY_TOLERANCE times their long-term average, or failing, shrink the
+# limit by BULKHEAD_BACKOFF. Per-service "bulkhead" options override these.
+BULKHEAD_ENABLED = os.getenv("BULKHEAD_ENABLED", "true").lower() == "true"
+BULKHEAD_INITIAL_LIMIT = int(os.getenv("BULKHEAD_INITIAL_LIMIT", "20"))
+BULKHEAD_MIN_LIMIT = int(os.getenv("BULKHEAD_MIN_LIMIT", "4"))
+BULKHEAD_MAX_LIMIT = int(os.getenv("BULKHEAD_MAX_LIMIT", "200"))
+BULKHEAD_QUEUE_SIZE = int(os.getenv("BULKHEAD_QUEUE_SIZE", "50"))
+BULKHEAD_LATENCY_TOLERANCE = float(os.getenv("BULKHEAD_LATENCY_TOLERANCE", "2.0"))
+BULKHEAD_BACKOFF = float(os.getenv("BULKHEAD_BACKOFF", "0.9"))
+
+# Retries for idempotent methods (RETRY_METHODS) after connection errors or a
+# RETRY_ON_STATUS response, with jittered exponential backoff. Every request
+# earns its service RETRY_BUDGET_RATIO retry tokens (capped at
+# RETRY_BUDGET_CAPACITY), every retry or hedge spends one, so retries stay a
+# bounded fraction of traffic and cannot amplify an outage.
+RETRY_ENABLED = os.getenv("RETRY_ENABLED", "true").lower() == "true"
+RETRY_MAX_RETRIES = int(os.getenv("RETRY_MAX_RETRIES", "2"))
+RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "0.05"))
+RETRY_METHODS = frozenset(
+    method.strip().upper() for method in os.getenv("RETRY_METHODS", "GET,HEAD,OPTIONS,PUT,DELETE").split(",")
+)
+RETRY_ON_STATUS = frozenset(int(code) for code in os.getenv("RETRY_ON_STATUS", "502,503,504").split(","))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))
+RETRY_BUDGET_CAPACITY = float(os.getenv("RETRY_BUDGET_CAPACITY", "10"))
+# Request bodies up to this size are buffered so PUTs can be replayed
+RETRY_MAX_BODY_BYTES = int(os.getenv("RETRY_MAX_BODY_BYTES", str(64 * 1024)))
+# Hedged requests: when an idempotent attempt has not answered after the
+# service's recent HEDGE_PERCENTILE latency (at least HEDGE_MIN_DELAY seconds,
+# once HEDGE_MIN_SAMPLES were seen), a second attempt races it; the first
+# answer wins. Hedges spend the same retry budget.
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.01"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "50"))
+
+# Deadline propagation: every request gets a deadline from its route's timeout
+# (a client may only shorten it with the same header), and the milliseconds
+# left are forwarded to the service in DEADLINE_HEADER on every attempt
+DEADLINE_HEADER = os.getenv("DEADLINE_HEADER", "X-Request-Timeout-Ms")
+
+# Proxy body handling: stream bodies through the gateway instead of buffering
+# them, and reject request bodies larger than PROXY_MAX_BODY_SIZE bytes
+PROXY_STREAMING = os.getenv("PROXY_STREAMING", "true").lower() == "true"
+PROXY_MAX_BODY_SIZE = int(os.getenv("PROXY_MAX_BODY_SIZE", str(50 * 1024 * 1024)))
+
+# Gateway response cache for routes marked "cacheable": bounded by bytes (LRU),
+# responses larger than RESPONSE_CACHE_MAX_ENTRY_BYTES are passed through uncached
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+
+# WebSocket pass-through for services marked "websocket" (needs the optional
+# `websockets` package): the handshake is rate limited and authenticated once,
+# then messages are relayed one by one. Each service accepts at most
+# WEBSOCKET_MAX_CONNECTIONS per gateway process, and connections without a
+# message in either direction for WEBSOCKET_IDLE_TIMEOUT seconds are closed.
+# Only WEBSOCKET_MAX_QUEUE upstream messages are buffered before the gateway
+# stops reading, so slow clients slow the service down instead of growing memory.
+WEBSOCKET_MAX_CONNECTIONS = int(os.getenv("WEBSOCKET_MAX_CONNECTIONS", "1000"))
+WEBSOCKET_IDLE_TIMEOUT = float(os.getenv("WEBSOCKET_IDLE_TIMEOUT", "300"))
+WEBSOCKET_MAX_MESSAGE_SIZE = int(os.getenv("WEBSOCKET_MAX_MESSAGE_SIZE", str(1024 * 1024)))
+WEBSOCKET_MAX_QUEUE = int(os.getenv("WEBSOCKET_MAX_QUEUE", "16"))
+
+# Response compression: gzip, plus brotli/zstd when their packages are installed.
+# Only bodies of at least COMPRESSION_MIN_SIZE bytes with an allow-listed content
+# type are compressed; responses the upstream already encoded pass through.
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+COMPRESSION_CONTENT_TYPES = [
+    content_type.strip() for content_type in os.getenv(
+        "COMPRESSION_CONTENT_TYPES",
+        "application/json,application/javascript,application/xml,text/html,text/plain,text/css,text/csv,"
+        "text/xml,image/svg+xml",
+    ).split(",") if content_type.strip()
+]
+
+# Request coalescing for routes marked "coalesce": identical concurrent GETs
+# share one upstream call; bodies above the limit are not shared
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+SINGLE_FLIGHT_MAX_BODY_BYTES = int(os.getenv("SINGLE_FLIGHT_MAX_BODY_BYTES", str(1024 * 1024)))
+
+# Batch endpoint (POST BATCH_PATH): up to BATCH_MAX_REQUESTS service requests in
+# one round trip, run BATCH_CONCURRENCY at a time and streamed back as each
+# completes. Each item is charged to its route's rate-limit class; item response
+# bodies larger than BATCH_MAX_RESPONSE_BYTES are left out of the result.
+BATCH_ENABLED = os.getenv("BATCH_ENABLED", "true").lower() == "true"
+BATCH_PATH = os.getenv("BATCH_PATH", "/batch")
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_BODY_SIZE = int(os.getenv("BATCH_MAX_BODY_SIZE", str(1024 * 1024)))
+BATCH_MAX_RESPONSE_BYTES = int(os.getenv("BATCH_MAX_RESPONSE_BYTES", str(1024 * 1024)))
+
+# Requests per minute per client IP for each rate-limit class used by routes.
+# With quotas enabled, protected routes of the "default" class are charged to the
+# more generous "authenticated" class instead: per IP it is only a pre-auth floor
+# against floods, the per-user quota below is what shapes their traffic.
+RATE_LIMIT_CLASSES = {
+    "default": int(os.getenv("RATE_LIMIT_PER_MINUTE", "60")),
+    "auth": int(os.getenv("AUTH_RATE_LIMIT_PER_MINUTE", "5")),
+    "authenticated": int(os.getenv("AUTHENTICATED_RATE_LIMIT_PER_MINUTE", "600")),
+}
+RATE_LIMIT_PERIOD = float(os.getenv("RATE_LIMIT_PERIOD", "60"))
+# Upper bound on tracked rate-limit keys (idle keys are evicted first)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "1000000"))
+
+# Per-user quotas, checked once the token is verified: keyed by its `sub`, with the
+# limit of the best tier among its `roles` (QUOTA_TIERS, "role=cost units per
+# QUOTA_PERIOD"; roles without a tier get "default"). Each request costs its
+# route's "cost" (1 unless set), so uploads can weigh more than reads.
+QUOTA_ENABLED = os.getenv("QUOTA_ENABLED", "true").lower() == "true"
+QUOTA_PERIOD = float(os.getenv("QUOTA_PERIOD", "60"))
+QUOTA_TIERS = {
+    role.strip(): int(limit)
+    for role, _, limit in (item.partition("=") for item in os.getenv(
+        "QUOTA_TIERS", "default=120,user=120,admin=1200"
+    ).split(","))
+    if role.strip()
+}
+
+# Where rate-limit counters live: "memory" (per process), "shared_memory"
+# (mmap file shared by the workers of one host) or "redis" (shared by replicas)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SHM_PATH = os.getenv("RATE_LIMIT_SHM_PATH", "/dev/shm/api_gateway_ratelimit")
+RATE_LIMIT_SHM_SLOTS = int(os.getenv("RATE_LIMIT_SHM_SLOTS", str(1 << 20)))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_REDIS_TIMEOUT = float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT", "0.1"))
+# Allow requests when the shared backend is unreachable
+RATE_LIMIT_FAIL_OPEN = os.getenv("RATE_LIMIT_FAIL_OPEN", "true").lower() == "true"
+
+# Logging never blocks the event loop: records are queued (at most LOG_QUEUE_SIZE,
+# the rest are dropped and counted) and written by a background thread in batches
+# of up to LOG_BATCH_SIZE lines, as JSON lines ("json") or plain text ("text").
+# Each record class ("access.2xx", "access.5xx" for the access log, otherwise
+# "<logger>.<level>") passes at most LOG_RATE_LIMIT_PER_SECOND records per second;
+# LOG_SAMPLE_RATES keeps only a fraction of some classes, e.g. "access.2xx=0.1".
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+LOG_RATE_LIMIT_PER_SECOND = int(os.getenv("LOG_RATE_LIMIT_PER_SECOND", "1000"))
+LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, _, rate in (item.partition("=") for item in os.getenv("LOG_SAMPLE_RATES", "").split(","))
+    if name.strip()
+}
+# One access-log record per proxied request (method, path, status, durations)
+ACCESS_LOG_ENABLED = os.getenv("ACCESS_LOG_ENABLED", "true").lower() == "true"
+
+
+def _service_urls(name: str, default: str) -> list:
+    """Replica URLs from <NAME>_SERVICE_URLS (comma-separated), else <NAME>_SERVICE_URL"""
+    urls = os.getenv(f"{name}_SERVICE_URLS")
+    if urls:
+        return [url.strip() for url in urls.split(",") if url.strip()]
+    return [os.getenv(f"{name}_SERVICE_URL", default)]
+
+
 # Service configuration
+# "urls" lists the service replicas (plain URLs or {"url": ..., "weight": ...}).
+# "audience" is the `aud` value a token needs to reach the service (None: not checked).
+# "public_routes" are exact paths reachable without a token; "routes" attach
+# metadata (public, rate_limit, cost, timeout, cacheable, coalesce, retry, websocket,
+# stream) to exact ("/token"), parameterized ("/documents/{id}") or prefix ("/admin/*")
+# patterns; "retry", "websocket", "stream" and "cost" may also be set for the whole
+# service. "cost" is a number, or {method: number} with 1 for the other methods.
 SERVICES = {
     "auth": {
-        "url": os.getenv("AUTH_SERVICE_URL", "http://auth-service:8000"),
+        "urls": _service_urls("AUTH", "http://auth-service:8000"),
+        "timeout": float(os.getenv("AUTH_SERVICE_TIMEOUT", "10.0")),
+        "audience": None,
         "public_routes": [
             "/token",
             "/register",
@@ -15,17 +273,36 @@ SERVICES = {
             "/auth/google",
             "/token/refresh"
         ],
+        "public_rate_limit": "auth",
+        "routes": [
+            {"pattern": "/users/me", "cacheable": True, "coalesce": True},
+        ],
     },
     "pdf": {
-        "url": os.getenv("PDF_SERVICE_URL", "http://pdf-service:8001"),
+        "urls": _service_urls("PDF", "http://pdf-service:8001"),
+        "timeout": float(os.getenv("PDF_SERVICE_TIMEOUT", "60.0")),
+        "audience": "pdf-service",
         "public_routes": [],
+        "routes": [
+            # Uploads weigh more than listings against the user's quota
+            {"pattern": "/documents", "coalesce": True, "cost": {"POST": 10}},
+            {"pattern": "/documents/{document_id}", "cacheable": True, "coalesce": True},
+        ],
     },
     "flashcard": {
-        "url": os.getenv("FLASHCARD_SERVICE_URL", "http://flashcard-service:8002"),
+        "urls": _service_urls("FLASHCARD", "http://flashcard-service:8002"),
+        "timeout": float(os.getenv("FLASHCARD_SERVICE_TIMEOUT", "30.0")),
+        "audience": "flashcard-service",
         "public_routes": [],
     },
     "chat": {
-        "url": os.getenv("CHAT_SERVICE_URL", "http://chat-service:8003"),
+        "urls": _service_urls("CHAT", "http://chat-service:8003"),
+        "timeout": float(os.getenv("CHAT_SERVICE_TIMEOUT", "30.0")),
+        "audience": "chat-service",
         "public_routes": [],
+        # Replies are streamed: WebSocket upgrades are relayed, and responses
+        # (Server-Sent Events, chunked) are never buffered
+        "websocket": True,
+        "stream": True,
     },
 }
\ No newline at end of file
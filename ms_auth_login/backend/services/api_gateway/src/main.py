@@ -1,19 +1,40 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .api import router as api_router  # Updated import
-from .middleware.rate_limit import RateLimitMiddleware
-from .middleware.auth import AuthMiddleware
-from .middleware.proxy import ServiceProxyMiddleware
+from .middleware.gateway import GatewayMiddleware
 from .config.logging import setup_logging
+from .upstream import service_discovery, upstream_clients, upstream_prober, upstream_resolver
 
 # Setup logging
 logger = setup_logging()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load service discovery, open pooled upstream clients and start background tasks; stop them on shutdown"""
+    await service_discovery.startup()
+    await upstream_resolver.startup()
+    await upstream_clients.startup()
+    await upstream_prober.startup()
+    try:
+        yield
+    finally:
+        await upstream_prober.shutdown()
+        await service_discovery.shutdown()
+        await upstream_resolver.shutdown()
+        await upstream_clients.shutdown()
+
+
 # Create FastAPI app
-app = FastAPI(title="API Gateway")
+app = FastAPI(title="API Gateway", lifespan=lifespan)
+
+# Gateway pipeline (rate limit, auth, proxy) as a single ASGI middleware
+app.add_middleware(GatewayMiddleware, rate_limit_per_minute=60)
 
-# CORS middleware
+# CORS middleware (outermost, so preflight requests never reach the pipeline)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, specify actual origins
@@ -22,10 +43,5 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add custom middlewares
-app.add_middleware(RateLimitMiddleware, rate_limit_per_minute=60)
-app.add_middleware(AuthMiddleware)
-app.add_middleware(ServiceProxyMiddleware)
-
 # Include API routes
 app.include_router(api_router)  # Using the combined router from api/__init__.py
\ No newline at end of file
@@ -1,73 +1,88 @@
 import logging
-from fastapi import status
+from typing import Optional, Union
+from fastapi import HTTPException, status
 from fastapi.responses import Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 
-from ..config.settings import SERVICES
+from .context import RequestContext
+from ..utils.identity import IdentityAsserter
 from ..utils.jwt import verify_token
 
 logger = logging.getLogger("api_gateway")
 
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Parse path to determine service
-        path = request.url.path
-        path_parts = path.strip("/").split("/")
+class Authenticator:
+    """Authentication stage of the gateway pipeline"""
 
-        if not path_parts:
-            return Response(
-                content="Invalid path",
-                status_code=status.HTTP_404_NOT_FOUND
-            )
+    def __init__(self, asserter: Optional[IdentityAsserter] = None):
+        self.asserter = asserter or IdentityAsserter()
+
+    async def check(self, context: RequestContext) -> Optional[Response]:
+        """
+        Verify the bearer token of a non-public service route
+
+        On success the verified payload is stored in `context.claims`, and
+        the signed identity assertion for the upstream in `context.identity`.
+
+        Returns:
+            Response: A 401/403 response if the request is rejected, None otherwise
+        """
+        if context.is_public:
+            return None
+
+        payload = await self.verify(context.headers.get("Authorization"))
+        if isinstance(payload, Response):
+            return payload
+        return self.authorize(context, payload)
 
-        service_name = path_parts[0]
+    async def verify(self, auth_header: Optional[str]) -> Union[dict, Response]:
+        """
+        Verify a bearer token from an Authorization header
 
-        # Check if service exists
-        if service_name not in SERVICES:
+        Returns:
+            dict: The verified payload, or a 401 response if the token is missing or invalid
+        """
+        # Get token from header
+        if not auth_header or not auth_header.startswith("Bearer "):
             return Response(
-                content="Service not found",
-                status_code=status.HTTP_404_NOT_FOUND
+                content="Missing authentication token",
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                headers={"WWW-Authenticate": "Bearer"}
             )
 
-        # Check if route is public
-        service_path = "/" + "/".join(path_parts[1:])
-        is_public = any(service_path.startswith(route) for route in SERVICES[service_name]["public_routes"])
+        token = auth_header[len("Bearer "):]
 
-        if not is_public:
-            # Get token from header
-            auth_header = request.headers.get("Authorization")
-            if not auth_header or not auth_header.startswith("Bearer "):
-                return Response(
-                    content="Missing authentication token",
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    headers={"WWW-Authenticate": "Bearer"}
-                )
-
-            token = auth_header.split(" ")[1]
+        try:
+            # Verify token (structural pre-checks, caches, then signature)
+            return await verify_token(token)
+        except HTTPException as exc:
+            # Never echo verification details back to the client
+            return Response(
+                content=exc.detail,
+                status_code=exc.status_code,
+                headers=exc.headers
+            )
 
-            try:
-                # Verify token
-                payload = await verify_token(token)
+    def authorize(self, context: RequestContext, payload: dict) -> Optional[Response]:
+        """
+        Check a verified payload against the service of the request and fill in the context
 
-                # Check token audience if needed
-                if "aud" in payload:
-                    audiences = payload["aud"]
-                    if isinstance(audiences, str):
-                        audiences = [audiences]
+        Returns:
+            Response: A 403 response if the token is not meant for the service, None otherwise
+        """
+        # Check token audience if the service requires one
+        audience = context.service.get("audience")
+        if audience and "aud" in payload:
+            audiences = payload["aud"]
+            if isinstance(audiences, str):
+                audiences = [audiences]
 
-                    if service_name not in audiences:
-                        return Response(
-                            content=f"Token not authorized for {service_name}",
-                            status_code=status.HTTP_403_FORBIDDEN
-                        )
-            except Exception as exc:
+            if audience not in audiences:
                 return Response(
-                    content=str(exc),
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    headers={"WWW-Authenticate": "Bearer"}
+                    content=f"Token not authorized for {context.service_name}",
+                    status_code=status.HTTP_403_FORBIDDEN
                 )
 
-        # Continue with the request
-        return await call_next(request)
\ No newline at end of file
+        context.claims = payload
+        if self.asserter.enabled:
+            context.identity = self.asserter.sign(payload, audience or context.service_name)
+        return None
@@ -0,0 +1,296 @@
+import asyncio
+import base64
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import status
+from fastapi.responses import Response, StreamingResponse
+
+from .auth import Authenticator
+from .cache import ResponseCaching
+from .context import RequestContext
+from .metrics import REQUESTS
+from .proxy import BodyTooLarge, filter_headers, limit_body, receive_body
+from .rate_limit import RateLimiter
+from ..config.settings import (
+    BATCH_ENABLED,
+    BATCH_PATH,
+    BATCH_MAX_REQUESTS,
+    BATCH_CONCURRENCY,
+    BATCH_MAX_BODY_SIZE,
+    BATCH_MAX_RESPONSE_BYTES,
+)
+from ..utils.route_table import RouteTable
+
+logger = logging.getLogger("api_gateway")
+
+BATCH_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"})
+
+# Envelope headers items do not inherit: they describe the envelope's own body
+_ENVELOPE_HEADERS = frozenset({b"content-length", b"content-type", b"transfer-encoding", b"accept-encoding"})
+
+# Item headers that are ignored: every item goes out with the envelope's verified credentials
+_ITEM_CREDENTIAL_HEADERS = frozenset({"authorization", "cookie"})
+
+# Item response headers left out of the results, the body is relayed decoded and re-framed
+_RESULT_EXCLUDED_HEADERS = frozenset({"content-length", "content-encoding", "set-cookie"})
+
+
+class BatchError(Exception):
+    """Raised for a malformed batch envelope, answered with 400"""
+
+
+def _error(item_id, status_code: int, message: str) -> dict:
+    return {"id": item_id, "status": status_code, "headers": {}, "body": message}
+
+
+class BatchHandler:
+    """
+    POST /batch: several service requests in one round trip
+
+    The envelope's bearer token is verified once; every item then goes
+    through the per-route part of the pipeline (audience check, response
+    cache, proxy) as if it had been sent alone, and is charged to its
+    route's rate-limit class (one hit per class, costing its item count)
+    and, for protected routes, to the user's quota (one hit for the sum of
+    the items' route costs).
+    Items run concurrently, BATCH_CONCURRENCY at a time, over the pooled
+    upstream clients, and the results are streamed back as
+    newline-delimited JSON in completion order:
+
+        {"id": ..., "status": 200, "headers": {...}, "body": ...}
+
+    JSON bodies are embedded as JSON, other bodies as text, or as base64
+    with "body_encoding": "base64" when they are not UTF-8.
+    """
+
+    def __init__(
+            self,
+            routes: RouteTable,
+            rate_limiter: RateLimiter,
+            authenticator: Authenticator,
+            cache: ResponseCaching,
+            proxy,
+            enabled: bool = BATCH_ENABLED,
+            max_requests: int = BATCH_MAX_REQUESTS,
+            concurrency: int = BATCH_CONCURRENCY,
+            max_response_bytes: int = BATCH_MAX_RESPONSE_BYTES,
+    ):
+        self.routes = routes
+        self.rate_limiter = rate_limiter
+        self.authenticator = authenticator
+        self.cache = cache
+        self.proxy = proxy
+        self.enabled = enabled
+        self.max_requests = max_requests
+        self.concurrency = concurrency
+        self.max_response_bytes = max_response_bytes
+
+    def applies(self, context: RequestContext) -> bool:
+        return self.enabled and context.path == BATCH_PATH and context.scope["method"] == "POST"
+
+    async def handle(self, context: RequestContext, receive, send):
+        """Answer a batch envelope, streaming each item's result as it completes"""
+        try:
+            items = await self._read_items(receive)
+            contexts = [self._item_context(context, item) for item in items]
+        except BatchError as exc:
+            response = Response(
+                content=json.dumps({"detail": str(exc)}),
+                status_code=status.HTTP_400_BAD_REQUEST,
+                media_type="application/json"
+            )
+            await response(context.scope, receive, send)
+            return
+
+        response = StreamingResponse(self._results(context, items, contexts), media_type="application/x-ndjson")
+        await response(context.scope, receive, send)
+
+    async def _read_items(self, receive) -> List[dict]:
+        try:
+            body = b"".join([chunk async for chunk in limit_body(receive_body(receive), BATCH_MAX_BODY_SIZE)])
+        except BodyTooLarge:
+            raise BatchError("Batch body too large")
+        try:
+            envelope = json.loads(body)
+        except ValueError:
+            raise BatchError("Batch body must be JSON")
+
+        items = envelope.get("requests") if isinstance(envelope, dict) else None
+        if not isinstance(items, list) or not items:
+            raise BatchError('Batch body must be {"requests": [...]} with at least one request')
+        if len(items) > self.max_requests:
+            raise BatchError(f"At most {self.max_requests} requests per batch")
+
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not isinstance(item.get("path"), str) or not item["path"].startswith("/"):
+                raise BatchError(f"Request {index} needs a path starting with /")
+            if str(item.get("method", "GET")).upper() not in BATCH_METHODS:
+                raise BatchError(f"Request {index} has an unsupported method")
+            if not isinstance(item.get("headers", {}), dict):
+                raise BatchError(f"Request {index} headers must be an object")
+        return items
+
+    def _item_context(self, envelope: RequestContext, item: dict) -> Tuple[RequestContext, bytes]:
+        """Build the context of one item as if it had been sent on its own, and its body"""
+        path, _, query = item["path"].partition("?")
+        headers = [(name, value) for name, value in envelope.scope["headers"] if name not in _ENVELOPE_HEADERS]
+        item_headers = {
+            name.lower(): str(value) for name, value in item.get("headers", {}).items()
+            if name.lower() not in _ITEM_CREDENTIAL_HEADERS
+        }
+        headers = [(name, value) for name, value in headers if name.decode("latin-1") not in item_headers]
+        try:
+            headers.extend((name.encode("latin-1"), value.encode("latin-1")) for name, value in item_headers.items())
+        except UnicodeEncodeError:
+            raise BatchError("Request headers must be latin-1")
+        # Bodies are embedded in the results, so they must arrive unencoded
+        headers.append((b"accept-encoding", b"identity"))
+
+        body = b""
+        if "body" in item:
+            if isinstance(item["body"], str) and "content-type" in item_headers:
+                body = item["body"].encode("utf-8")
+            else:
+                body = json.dumps(item["body"]).encode("utf-8")
+                if "content-type" not in item_headers:
+                    headers.append((b"content-type", b"application/json"))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+        scope = {
+            **envelope.scope,
+            "method": str(item.get("method", "GET")).upper(),
+            "path": path,
+            "raw_path": path.encode("utf-8"),
+            "query_string": query.encode("latin-1"),
+            "headers": headers,
+        }
+        return RequestContext(scope, self.routes), body
+
+    async def _results(self, envelope: RequestContext, items: List[dict],
+                       contexts: List[Tuple[RequestContext, bytes]]):
+        results: Dict[int, dict] = {}
+
+        # The token is verified once for the whole batch, and only if an item needs it
+        payload = None
+        if any(context.service_name is not None and not context.is_public for context, _ in contexts):
+            payload = await self.authenticator.verify(envelope.headers.get("Authorization"))
+
+        # One rate-limit hit per class, charging all of its items at once
+        classes: Dict[str, List[int]] = {}
+        for index, (context, _) in enumerate(contexts):
+            item_id = items[index].get("id", index)
+            if context.service_name is None:
+                results[index] = _error(item_id, status.HTTP_404_NOT_FOUND, "Not a service route")
+                continue
+            rejected = None
+            if not context.is_public:
+                rejected = payload if isinstance(payload, Response) else self.authenticator.authorize(context, payload)
+            if rejected is not None:
+                results[index] = await self._result(item_id, rejected)
+            else:
+                classes.setdefault(self.rate_limiter.ip_class(context), []).append(index)
+        for indexes in classes.values():
+            rejected = await self.rate_limiter.check(contexts[indexes[0]][0], cost=len(indexes))
+            if rejected is not None:
+                for index in indexes:
+                    results[index] = await self._result(items[index].get("id", index), rejected)
+
+        # One quota hit for the protected items left, costing their routes' weights
+        charged = [index for index, (context, _) in enumerate(contexts)
+                   if index not in results and context.claims is not None]
+        if charged:
+            first = contexts[charged[0]][0]
+            cost = sum(contexts[index][0].route.cost_of(contexts[index][0].scope["method"]) for index in charged)
+            rejected = await self.rate_limiter.check_quota(first, cost=cost)
+            if rejected is not None:
+                for index in charged:
+                    results[index] = await self._result(items[index].get("id", index), rejected)
+
+        for result in results.values():
+            yield self._line(result)
+
+        slots = asyncio.Semaphore(self.concurrency)
+        done: asyncio.Queue = asyncio.Queue()
+
+        async def run(index: int):
+            item_id = items[index].get("id", index)
+            try:
+                async with slots:
+                    result = await self._dispatch(item_id, *contexts[index])
+            except Exception:
+                logger.exception(f"Batch item {item_id} failed")
+                result = _error(item_id, status.HTTP_502_BAD_GATEWAY, "Batch item failed")
+            done.put_nowait(result)
+
+        tasks = [asyncio.ensure_future(run(index)) for index in range(len(items)) if index not in results]
+        try:
+            for _ in tasks:
+                yield self._line(await done.get())
+        finally:
+            # The client went away: stop the items still running
+            for task in tasks:
+                task.cancel()
+
+    async def _dispatch(self, item_id, context: RequestContext, body: bytes) -> dict:
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        if self.cache.applies(context):
+            response = await self.cache.handle(context, receive)
+        else:
+            response = await self.proxy.forward(context, receive)
+        REQUESTS.inc(context.service_name, context.route.pattern, f"{response.status_code // 100}xx")
+        return await self._result(item_id, response)
+
+    async def _result(self, item_id, response: Response) -> dict:
+        """Turn an item's response into its result line, reading at most max_response_bytes of the body"""
+        headers = {
+            name: value for name, value in filter_headers(
+                [(name.decode("latin-1"), value.decode("latin-1")) for name, value in response.raw_headers]
+            ) if name not in _RESULT_EXCLUDED_HEADERS
+        }
+        result = {"id": item_id, "status": response.status_code, "headers": headers}
+
+        body = await self._read_body(response)
+        if body is None:
+            result["body"] = None
+            result["error"] = "Response too large for a batch, request it on its own"
+            return result
+
+        if "json" in headers.get("content-type", ""):
+            try:
+                result["body"] = json.loads(body) if body else None
+                return result
+            except ValueError:
+                pass
+        try:
+            result["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            result["body"] = base64.b64encode(body).decode("ascii")
+            result["body_encoding"] = "base64"
+        return result
+
+    async def _read_body(self, response: Response) -> Optional[bytes]:
+        """The body, None (and the upstream released) if it exceeds max_response_bytes"""
+        if not isinstance(response, StreamingResponse):
+            return response.body if len(response.body) <= self.max_response_bytes else None
+
+        chunks, size = [], 0
+        iterator = response.body_iterator
+        try:
+            async for chunk in iterator:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > self.max_response_bytes:
+                    return None
+        finally:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+        return b"".join(chunks)
+
+    @staticmethod
+    def _line(result: dict) -> bytes:
+        return json.dumps(result, separators=(",", ":")).encode("utf-8") + b"\n"
+
@@ -0,0 +1,200 @@
+import logging
+import time
+from email.utils import parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+from fastapi import status
+from fastapi.responses import Response, StreamingResponse
+
+from .context import RequestContext
+from .proxy import buffer_response
+from ..config.settings import RESPONSE_CACHE_ENABLED
+from ..utils.response_cache import CachedResponse, ResponseCache, freshness, parse_cache_control
+
+logger = logging.getLogger("api_gateway")
+
+# Methods that never change the resource; anything else invalidates cached copies
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Response headers that are recomputed for each cached reply
+_UNSTORED_HEADERS = frozenset({b"content-length", b"transfer-encoding", b"age", b"x-cache"})
+
+# Headers a 304 Not Modified may update on the stored response
+_REVALIDATION_HEADERS = frozenset({b"cache-control", b"etag", b"expires", b"last-modified", b"date"})
+
+# Cached responses shared by all requests of this process
+response_cache = ResponseCache()
+
+
+def _header(raw_headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    for key, value in raw_headers:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _expires_in(raw_headers: List[Tuple[bytes, bytes]]) -> Optional[float]:
+    """Seconds from the response Date (or now) until its Expires header, if any"""
+    expires = _header(raw_headers, b"expires")
+    if expires is None:
+        return None
+    try:
+        expires_at = parsedate_to_datetime(expires).timestamp()
+        date = _header(raw_headers, b"date")
+        return expires_at - (parsedate_to_datetime(date).timestamp() if date else time.time())
+    except (TypeError, ValueError):
+        # Invalid dates mean "already expired" (RFC 9111 section 5.3)
+        return 0.0
+
+
+def _etag_matches(if_none_match: str, etag: Optional[str]) -> bool:
+    """Weak comparison of an If-None-Match list against a stored ETag"""
+    if etag is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+class ResponseCaching:
+    """
+    Response cache stage of the gateway pipeline, wraps the proxy for cacheable routes
+
+    `proxy` is the next stage: anything with ServiceProxy's `forward`.
+
+    GETs to routes marked "cacheable" are answered from `response_cache`
+    while fresh, per Cache-Control (s-maxage, max-age, no-cache, no-store,
+    private) and Expires. Authenticated responses are keyed by the token
+    subject, so users never see each other's data; tokens without a subject
+    bypass the cache. Stale entries with an
+    ETag or Last-Modified are revalidated with a conditional request, so
+    an unchanged resource costs the upstream only a 304. Successful writes
+    to a cached path invalidate it for everyone.
+    """
+
+    def __init__(self, proxy, cache: ResponseCache = response_cache, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.proxy = proxy
+        self.cache = cache
+        self.enabled = enabled
+
+    def applies(self, context: RequestContext) -> bool:
+        return self.enabled and context.route.cacheable
+
+    async def handle(self, context: RequestContext, receive) -> Response:
+        method = context.scope["method"]
+        if method != "GET":
+            response = await self.proxy.forward(context, receive)
+            if method not in SAFE_METHODS and response.status_code < 400:
+                self.cache.invalidate(context.service_name, context.service_path)
+            return response
+
+        request_directives = parse_cache_control(context.headers.get("cache-control"))
+        if "no-store" in request_directives:
+            return await self.proxy.forward(context, receive)
+
+        subject = context.claims.get("sub", "") if context.claims else ""
+        if not subject and not context.is_public:
+            # A token without a subject cannot be told apart from other such tokens
+            return await self.proxy.forward(context, receive)
+        primary = (context.service_name, context.service_path, context.query_string, subject)
+        now = time.monotonic()
+
+        entry = self.cache.lookup(primary, context.headers)
+        if (entry is not None and entry.is_fresh(now)
+                and "no-cache" not in request_directives and request_directives.get("max-age") != "0"):
+            self.cache.hits += 1
+            return self._reply(entry, context, now, b"HIT")
+
+        conditional = []
+        if entry is not None:
+            if entry.etag is not None:
+                conditional.append(("if-none-match", entry.etag))
+            if entry.last_modified is not None:
+                conditional.append(("if-modified-since", entry.last_modified))
+
+        response = await self.proxy.forward(context, receive, conditional_headers=conditional or None)
+
+        if entry is not None and conditional and response.status_code == status.HTTP_304_NOT_MODIFIED:
+            await self._discard(response)
+            self.cache.revalidations += 1
+            headers = [(name, value) for name, value in response.raw_headers if name in _REVALIDATION_HEADERS]
+            directives = parse_cache_control(_header(headers, b"cache-control"))
+            ttl = freshness(directives, _expires_in(headers))
+            entry.refresh(headers, ttl, "no-cache" in directives, time.monotonic())
+            return self._reply(entry, context, time.monotonic(), b"REVALIDATED")
+
+        self.cache.misses += 1
+        return await self._store(primary, context, response)
+
+    async def _store(self, primary, context: RequestContext, response: Response) -> Response:
+        """Store a cacheable upstream response and return the response to send"""
+        raw_headers = response.raw_headers
+        directives = parse_cache_control(_header(raw_headers, b"cache-control"))
+        vary = _header(raw_headers, b"vary")
+        etag = _header(raw_headers, b"etag")
+        last_modified = _header(raw_headers, b"last-modified")
+        ttl = freshness(directives, _expires_in(raw_headers))
+        always_revalidate = "no-cache" in directives or ttl == 0
+
+        if (response.status_code != status.HTTP_200_OK
+                or "no-store" in directives
+                or ("private" in directives and not primary[3])
+                or _header(raw_headers, b"set-cookie") is not None
+                or (vary is not None and "*" in vary)
+                or (always_revalidate and etag is None and last_modified is None)):
+            return response
+
+        vary_names = sorted({name.strip().lower() for name in vary.split(",") if name.strip()} if vary else ())
+        if primary[3]:
+            # Entries are already per subject, so varying on the token itself adds nothing
+            vary_names = [name for name in vary_names if name != "authorization"]
+
+        age = _header(raw_headers, b"age")
+        body = await buffer_response(response, self.cache.max_entry_bytes)
+        if not isinstance(body, bytes):
+            # Too large to cache, `body` is the response with its stream replayed
+            return body
+
+        entry = CachedResponse(
+            status_code=response.status_code,
+            headers=[(name, value) for name, value in raw_headers if name not in _UNSTORED_HEADERS],
+            body=body,
+            etag=etag,
+            last_modified=last_modified,
+            age=float(age) if age and age.isdigit() else 0.0,
+            ttl=ttl,
+            always_revalidate=always_revalidate,
+            now=time.monotonic(),
+        )
+        self.cache.store(primary, tuple(vary_names), context.headers, entry)
+        return self._reply(entry, context, entry.stored_at, b"MISS")
+
+    @staticmethod
+    async def _discard(response: Response):
+        """Release the upstream connection of a response that is not relayed"""
+        if isinstance(response, StreamingResponse):
+            async for _ in response.body_iterator:
+                pass
+
+    @staticmethod
+    def _reply(entry: CachedResponse, context: RequestContext, now: float, source: bytes) -> Response:
+        if_none_match = context.headers.get("if-none-match")
+        if if_none_match is not None and _etag_matches(if_none_match, entry.etag):
+            response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+            response.raw_headers = [
+                (name, value) for name, value in entry.headers if name in _REVALIDATION_HEADERS
+            ] + [(b"x-cache", source)]
+            return response
+
+        response = Response(content=entry.body, status_code=entry.status_code)
+        response.raw_headers = entry.headers + [
+            (b"content-length", str(len(entry.body)).encode()),
+            (b"age", str(entry.current_age(now)).encode()),
+            (b"x-cache", source),
+        ]
+        return response
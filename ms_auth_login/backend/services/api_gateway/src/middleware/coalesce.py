@@ -0,0 +1,111 @@
+import logging
+from typing import List, Optional, Tuple
+
+from fastapi.responses import Response
+
+from .context import RequestContext
+from .proxy import ServiceProxy, buffer_response
+from ..config.settings import SINGLE_FLIGHT_ENABLED, SINGLE_FLIGHT_MAX_BODY_BYTES
+from ..utils.single_flight import SingleFlight
+
+logger = logging.getLogger("api_gateway")
+
+# Request headers that can change the upstream response, part of the coalescing key
+_VARIANT_HEADERS = ("accept", "accept-encoding", "accept-language", "range")
+_VALIDATOR_HEADERS = ("if-none-match", "if-modified-since")
+
+# In-flight upstream calls shared by all requests of this process
+single_flight = SingleFlight()
+
+
+class _SharedResponse:
+    """A buffered upstream response that several clients are answered with"""
+
+    __slots__ = ("status_code", "raw_headers", "body")
+
+    def __init__(self, status_code: int, raw_headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.status_code = status_code
+        self.raw_headers = raw_headers
+        self.body = body
+
+    def response(self) -> Response:
+        response = Response(content=self.body, status_code=self.status_code)
+        response.raw_headers = self.raw_headers
+        return response
+
+
+class RequestCoalescing:
+    """
+    Single-flight stage of the gateway pipeline, in front of the proxy
+
+    Concurrent identical GETs to routes marked "coalesce" share one upstream
+    call: the key is (method, service, path, query, token subject, and the
+    request headers that can change the response). The first request is
+    forwarded; the others wait for its response and get a copy. Responses
+    larger than SINGLE_FLIGHT_MAX_BODY_BYTES cannot be shared, waiters then
+    make their own call, as they do if the first request is aborted.
+    """
+
+    def __init__(
+            self,
+            proxy: ServiceProxy,
+            flights: SingleFlight = single_flight,
+            enabled: bool = SINGLE_FLIGHT_ENABLED,
+            max_body_size: int = SINGLE_FLIGHT_MAX_BODY_BYTES,
+    ):
+        self.proxy = proxy
+        self.flights = flights
+        self.enabled = enabled
+        self.max_body_size = max_body_size
+
+    async def forward(
+            self,
+            context: RequestContext,
+            receive,
+            conditional_headers: Optional[List[Tuple[str, str]]] = None,
+    ) -> Response:
+        """Same contract as ServiceProxy.forward"""
+        method = context.scope["method"]
+        if (not self.enabled or not context.route.coalesce or method not in ("GET", "HEAD")
+                or "content-length" in context.headers or "transfer-encoding" in context.headers):
+            return await self.proxy.forward(context, receive, conditional_headers)
+
+        headers = context.headers
+        if conditional_headers is not None:
+            validators = tuple(conditional_headers)
+        else:
+            validators = tuple(headers.get(name) for name in _VALIDATOR_HEADERS)
+        subject = context.claims.get("sub") if context.claims else None
+        key = (
+            method, context.service_name, context.service_path, context.query_string, subject,
+            tuple(headers.get(name) for name in _VARIANT_HEADERS), validators,
+        )
+
+        led = False
+        # The leader's own response when it is a stream too large to share
+        leader_response = None
+
+        async def call():
+            nonlocal led, leader_response
+            led = True
+            response = await self.proxy.forward(context, receive, conditional_headers)
+            body = await buffer_response(response, self.max_body_size)
+            if not isinstance(body, bytes):
+                leader_response = body
+                return None
+            return _SharedResponse(response.status_code, response.raw_headers, body)
+
+        try:
+            shared, _ = await self.flights.do(key, call)
+        except Exception as exc:
+            if led:
+                raise
+            logger.debug(f"Shared upstream call failed ({exc!r}), retrying on its own")
+            return await self.proxy.forward(context, receive, conditional_headers)
+
+        if shared is not None:
+            return shared.response()
+        if leader_response is not None:
+            return leader_response
+        # Too large to share: make our own call
+        return await self.proxy.forward(context, receive, conditional_headers)
@@ -0,0 +1,240 @@
+import logging
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from ..config.settings import (
+    COMPRESSION_ENABLED,
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_ZSTD_LEVEL,
+    COMPRESSION_CONTENT_TYPES,
+)
+
+logger = logging.getLogger("api_gateway")
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: pip install zstandard
+    zstandard = None
+
+
+class _GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        # Sync flush so each streamed chunk reaches the client without waiting for the next
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+def available_encoders() -> Dict[str, type]:
+    """Encodings this process can produce, in order of preference"""
+    encoders = {}
+    if brotli is not None:
+        encoders["br"] = _BrotliEncoder
+    if zstandard is not None:
+        encoders["zstd"] = _ZstdEncoder
+    encoders["gzip"] = _GzipEncoder
+    return encoders
+
+
+def negotiate_encoding(accept_encoding: Optional[str], encoders) -> Optional[str]:
+    """
+    Pick the encoding for a response from the client's Accept-Encoding
+
+    Highest q-value wins, ties go to the server's preference order.
+
+    Returns:
+        str: The encoding, or None to send the body as is
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encoders:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class ResponseCompressor:
+    """
+    Compression stage of the gateway pipeline, applied to the ASGI send channel
+
+    The encoding is negotiated from Accept-Encoding. Responses are left
+    alone when the upstream already encoded them, when their content type
+    is not allow-listed, or when they are smaller than COMPRESSION_MIN_SIZE
+    (known from Content-Length, or from a body that arrives in one piece).
+    Streamed bodies are compressed chunk by chunk and flushed after each
+    one, so streaming keeps working.
+    """
+
+    def __init__(
+            self,
+            enabled: bool = COMPRESSION_ENABLED,
+            min_size: int = COMPRESSION_MIN_SIZE,
+            content_types: List[str] = COMPRESSION_CONTENT_TYPES,
+    ):
+        self.enabled = enabled
+        self.min_size = min_size
+        self.content_types = frozenset(content_types)
+        self.encoders = available_encoders()
+
+    def _compressible(self, content_type: Optional[str]) -> bool:
+        if not content_type:
+            return False
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        return (media_type in self.content_types
+                or media_type.endswith("+json") or media_type.endswith("+xml"))
+
+    def wrap(self, send, scope: dict, accept_encoding: Optional[str]):
+        """
+        Wrap `send` to compress the response body if the client accepts it
+
+        Returns:
+            The `send` callable to use for the response
+        """
+        if not self.enabled or scope["method"] == "HEAD":
+            return send
+        encoding = negotiate_encoding(accept_encoding, self.encoders)
+        if encoding is None:
+            return send
+
+        encoder_class = self.encoders[encoding]
+        state = {"start": None, "encoder": None, "passthrough": False}
+
+        async def send_compressed(message):
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                headers = message.get("headers", [])
+                if self._skip(message["status"], headers):
+                    state["passthrough"] = True
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether to compress
+                    state["start"] = message
+                return
+
+            if message_type != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            start = state["start"]
+
+            if start is not None:
+                state["start"] = None
+                declared = _header(start.get("headers", []), b"content-length")
+                if declared is not None and declared.isdigit():
+                    size = int(declared)
+                else:
+                    # Unknown for a stream, which is always compressed
+                    size = None if more_body else len(body)
+                if size is not None and size < self.min_size:
+                    state["passthrough"] = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                state["encoder"] = encoder_class()
+                if not more_body:
+                    compressed = state["encoder"].finish(body)
+                    await send({**start, "headers": _encoded_headers(start["headers"], encoding, len(compressed))})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+                await send({**start, "headers": _encoded_headers(start["headers"], encoding, None)})
+
+            encoder = state["encoder"]
+            chunk = encoder.compress(body) if more_body else encoder.finish(body)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        return send_compressed
+
+    def _skip(self, status_code: int, headers: List[Tuple[bytes, bytes]]) -> bool:
+        if status_code < 200 or status_code in (204, 206, 304):
+            return True
+        if _header(headers, b"content-range") is not None:
+            # Range offsets refer to the unencoded representation
+            return True
+        if _header(headers, b"content-encoding") not in (None, "identity"):
+            # Already encoded by the upstream, never compress twice
+            return True
+        return not self._compressible(_header(headers, b"content-type"))
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _encoded_headers(headers: List[Tuple[bytes, bytes]], encoding: str, length: Optional[int]) -> list:
+    """Response headers for the compressed body"""
+    result = []
+    vary_seen = False
+    for name, value in headers:
+        lower = name.lower()
+        if lower in (b"content-length", b"content-encoding"):
+            continue
+        if lower == b"etag" and not value.startswith(b"W/"):
+            # The compressed body is not byte-identical to the one the strong ETag names
+            value = b"W/" + value
+        elif lower == b"vary":
+            vary_seen = True
+            if b"accept-encoding" not in value.lower() and value.strip() != b"*":
+                value = value + b", Accept-Encoding"
+        result.append((name, value))
+
+    result.append((b"content-encoding", encoding.encode()))
+    if not vary_seen:
+        result.append((b"vary", b"Accept-Encoding"))
+    if length is not None:
+        result.append((b"content-length", str(length).encode()))
+    return result
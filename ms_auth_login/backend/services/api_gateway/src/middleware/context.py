@@ -0,0 +1,90 @@
+import time
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+
+from ..config.settings import DEADLINE_HEADER, SERVICES
+from ..utils.route_table import Route, RouteTable
+
+
+class RequestContext:
+    """
+    Per-request state shared by the gateway pipeline stages
+
+    The route is resolved exactly once, when the context is created; the
+    rate-limit, auth and proxy stages then read (and the auth stage fills in
+    `claims`) instead of re-parsing the path themselves.
+    """
+
+    __slots__ = (
+        "scope",
+        "path",
+        "headers",
+        "client_ip",
+        "service_name",
+        "service",
+        "service_path",
+        "route",
+        "path_params",
+        "is_public",
+        "claims",
+        "identity",
+        "rate_limit",
+        "quota",
+        "upstream_time",
+        "deadline",
+    )
+
+    def __init__(self, scope: dict, routes: RouteTable):
+        self.scope = scope
+        self.path: str = scope["path"]
+        self.headers = Headers(scope=scope)
+        client = scope.get("client")
+        self.client_ip: str = client[0] if client else "unknown"
+
+        self.service_name: Optional[str] = None
+        self.service: Optional[dict] = None
+        self.service_path: str = self.path
+        self.route: Optional[Route] = None
+        self.path_params: Dict[str, str] = {}
+        self.is_public = False
+        self.claims: Optional[dict] = None
+        # Signed identity assertion forwarded upstream, set by the auth stage
+        self.identity: Optional[str] = None
+        self.rate_limit = None
+        # Result of the per-user quota check, set once the token was verified
+        self.quota = None
+        # Seconds spent waiting for upstream response headers
+        self.upstream_time = 0.0
+        # time.monotonic() by which the response must have started (service routes only)
+        self.deadline: Optional[float] = None
+
+        self._resolve(routes)
+
+    def _resolve(self, routes: RouteTable):
+        # "/pdf/documents/1" -> service "pdf", service path "/documents/1"
+        service_name, _, rest = self.path.lstrip("/").partition("/")
+        match = routes.match(service_name, rest)
+        if match is None:
+            return
+
+        self.service_name = service_name
+        self.service = SERVICES[service_name]
+        self.service_path = "/" + rest
+        self.route, self.path_params = match
+        self.is_public = self.route.public
+
+        timeout = self.route.timeout
+        requested = self.headers.get(DEADLINE_HEADER)
+        if requested is not None and requested.isdigit():
+            # Callers may ask for less time than the route allows, never more
+            timeout = min(timeout, int(requested) / 1000)
+        self.deadline = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """Seconds left until the request's deadline"""
+        return self.deadline - time.monotonic()
+
+    @property
+    def query_string(self) -> str:
+        return self.scope.get("query_string", b"").decode("latin-1")
@@ -0,0 +1,155 @@
+import logging
+import time
+from typing import Dict, Optional
+
+from starlette.websockets import WebSocket
+
+from .auth import Authenticator
+from .batch import BatchHandler
+from .cache import ResponseCaching
+from .coalesce import RequestCoalescing
+from .compression import ResponseCompressor
+from .context import RequestContext
+from .metrics import GATEWAY_OVERHEAD, IN_FLIGHT, REQUEST_DURATION, REQUESTS
+from .proxy import ServiceProxy
+from .rate_limit import RateLimiter
+from .websocket import WebSocketProxy, promote_query_token
+from ..config.settings import ACCESS_LOG_ENABLED
+from ..upstream import service_routes
+
+logger = logging.getLogger("api_gateway")
+access_logger = logging.getLogger("api_gateway.access")
+
+
+class GatewayMiddleware:
+    """
+    Pure ASGI gateway pipeline: rate limit -> auth -> quota -> (response cache) -> (coalescing) -> proxy
+
+    The route is resolved once into a RequestContext shared by all stages.
+    Requests for paths that do not belong to a service (health, info, docs)
+    fall through to the FastAPI app after rate limiting. Per-IP limits apply
+    before the token is verified, per-user quotas right after. Every response,
+    proxied or not, goes out through the compression stage. WebSocket
+    handshakes are rate limited and authenticated the same way, once, and
+    the connection is then relayed by the WebSocket stage. POST /batch
+    envelopes are taken apart by the batch stage, which runs each item
+    through the per-route stages.
+    """
+
+    def __init__(self, app, rate_limit_per_minute: int = 60, quota_tiers: Optional[Dict[str, int]] = None):
+        self.app = app
+        # Compiled once at startup, shared by every request (replaced in place by service discovery)
+        self.routes = service_routes
+        self.rate_limiter = RateLimiter(rate_limit_per_minute, quota_tiers=quota_tiers)
+        self.authenticator = Authenticator()
+        self.proxy = RequestCoalescing(ServiceProxy())
+        self.cache = ResponseCaching(self.proxy)
+        self.compressor = ResponseCompressor()
+        self.websockets = WebSocketProxy()
+        self.batch = BatchHandler(self.routes, self.rate_limiter, self.authenticator, self.cache, self.proxy)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        context = RequestContext(scope, self.routes)
+
+        # Batch items are rate limited and authenticated one by one, not the envelope
+        if self.batch.applies(context):
+            send = self.compressor.wrap(send, scope, context.headers.get("accept-encoding"))
+            await self.batch.handle(context, receive, send)
+            return
+
+        response = await self.rate_limiter.check(context)
+        if context.rate_limit is not None and context.rate_limit.allowed:
+            send = self._with_headers(send, context.rate_limit.headers())
+        send = self.compressor.wrap(send, scope, context.headers.get("accept-encoding"))
+
+        service_name = context.service_name
+        if service_name is None:
+            if response is None:
+                await self.app(scope, receive, send)
+            else:
+                await response(scope, receive, send)
+            return
+
+        IN_FLIGHT.inc(service_name)
+        try:
+            if response is None:
+                response = await self.authenticator.check(context)
+            if response is None:
+                response = await self.rate_limiter.check_quota(context)
+                if context.quota is not None and context.quota.allowed:
+                    send = self._with_headers(send, context.quota.headers(prefix="X-Quota"))
+            if response is None:
+                if self.cache.applies(context):
+                    response = await self.cache.handle(context, receive)
+                else:
+                    response = await self.proxy.forward(context, receive)
+
+            elapsed = time.perf_counter() - started
+            REQUEST_DURATION.observe(elapsed, service_name)
+            GATEWAY_OVERHEAD.observe(max(0.0, elapsed - context.upstream_time), service_name)
+            REQUESTS.inc(service_name, context.route.pattern, f"{response.status_code // 100}xx")
+
+            await response(scope, receive, send)
+            if ACCESS_LOG_ENABLED:
+                self._access_log(context, response.status_code, time.perf_counter() - started)
+        finally:
+            IN_FLIGHT.dec(service_name)
+
+    async def _websocket(self, scope, receive, send):
+        """Check a WebSocket handshake once, then hand the connection to the WebSocket stage"""
+        scope = promote_query_token(scope)
+        context = RequestContext(scope, self.routes)
+        if context.service_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        websocket = WebSocket(scope, receive, send)
+        response = await self.rate_limiter.check(context)
+        if response is None:
+            response = await self.authenticator.check(context)
+        if response is None:
+            response = await self.rate_limiter.check_quota(context)
+        if response is not None:
+            await self.websockets.deny(websocket, response)
+            return
+
+        await self.websockets.forward(context, websocket)
+
+    @staticmethod
+    def _access_log(context: RequestContext, status_code: int, elapsed: float):
+        """One structured record per proxied request, sampled and rate limited by status class"""
+        method = context.scope["method"]
+        access_logger.info(
+            f"{method} {context.path} {status_code}",
+            extra={
+                "log_class": f"access.{status_code // 100}xx",
+                "method": method,
+                "path": context.path,
+                "status": status_code,
+                "service": context.service_name,
+                "route": context.route.pattern,
+                "client_ip": context.client_ip,
+                "duration_ms": round(elapsed * 1000, 2),
+                "upstream_ms": round(context.upstream_time * 1000, 2),
+            },
+        )
+
+    @staticmethod
+    def _with_headers(send, headers: dict):
+        """Wrap `send` to append headers to the response start message"""
+        raw = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + raw}
+            await send(message)
+
+        return send_with_headers
@@ -0,0 +1,50 @@
+from ..utils.metrics import MetricsRegistry
+
+# Metrics of the gateway hot path, rendered by routes/metrics.py
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter(
+    "gateway_requests_total",
+    "Requests to upstream services by route pattern and status class",
+    ("service", "route", "status_class"),
+)
+IN_FLIGHT = registry.gauge(
+    "gateway_in_flight_requests",
+    "Requests to upstream services currently being handled",
+    ("service",),
+)
+REQUEST_DURATION = registry.histogram(
+    "gateway_request_duration_seconds",
+    "Time from receiving a request until its response headers are ready",
+    ("service",),
+)
+GATEWAY_OVERHEAD = registry.histogram(
+    "gateway_overhead_seconds",
+    "Part of the request duration spent in the gateway itself (rate limit, auth, caching, proxying)",
+    ("service",),
+)
+UPSTREAM_DURATION = registry.histogram(
+    "gateway_upstream_duration_seconds",
+    "Time until an upstream replica's response headers arrived",
+    ("service",),
+)
+RATE_LIMIT_REJECTIONS = registry.counter(
+    "gateway_rate_limit_rejections_total",
+    "Requests rejected by the rate limiter",
+    ("rate_limit_class",),
+)
+QUOTA_REJECTIONS = registry.counter(
+    "gateway_quota_rejections_total",
+    "Requests rejected because the user's quota was used up, by quota tier",
+    ("tier",),
+)
+WEBSOCKET_CONNECTIONS = registry.gauge(
+    "gateway_websocket_connections",
+    "WebSocket connections currently relayed to upstream services",
+    ("service",),
+)
+WEBSOCKET_MESSAGES = registry.counter(
+    "gateway_websocket_messages_total",
+    "WebSocket messages relayed, by direction",
+    ("service", "direction"),
+)
@@ -1,68 +1,541 @@
+import asyncio
 import logging
+import time
+from typing import AsyncIterator, Callable, List, Optional, Tuple, Union
+
 import httpx
 from fastapi import status
-from fastapi.responses import Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.requests import ClientDisconnect
 
-from ..config.settings import SERVICES
+from .context import RequestContext
+from .metrics import UPSTREAM_DURATION
+from ..config.settings import (
+    DEADLINE_HEADER,
+    GATEWAY_IDENTITY_HEADER,
+    PROXY_STREAMING,
+    PROXY_MAX_BODY_SIZE,
+    RETRY_ENABLED,
+    RETRY_MAX_RETRIES,
+    RETRY_METHODS,
+    RETRY_ON_STATUS,
+    RETRY_MAX_BODY_BYTES,
+    HEDGE_ENABLED,
+)
+from ..upstream import (
+    Bulkhead,
+    LoadBalancer,
+    RetryPolicy,
+    RetryPolicyRegistry,
+    UnknownReplica,
+    bulkheads,
+    circuit_breakers,
+    retry_policies,
+    upstream_balancers,
+    upstream_clients,
+)
 
 logger = logging.getLogger("api_gateway")
 
+# Headers that only apply to a single connection and must not be forwarded (RFC 7230 section 6.1)
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+})
+
+# Only the gateway may assert an identity to the services
+IDENTITY_HEADER = GATEWAY_IDENTITY_HEADER.lower()
+
+# Set by the gateway from the request's deadline, never passed through
+DEADLINE_HEADER_NAME = DEADLINE_HEADER.lower()
+
+# Request validators the response cache manages itself
+CONDITIONAL_HEADERS = frozenset({"if-none-match", "if-modified-since"})
+
+
+class BodyTooLarge(Exception):
+    """Raised while streaming a request body that exceeds PROXY_MAX_BODY_SIZE"""
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of sending an attempt once the request's deadline has passed"""
+
+
+class ServiceOverloaded(Exception):
+    """Raised when the service's bulkhead queue is full and the attempt is shed"""
 
-class ServiceProxyMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Parse path to determine service
-        path = request.url.path
-        path_parts = path.strip("/").split("/")
 
-        if not path_parts:
-            return await call_next(request)
+def filter_headers(headers: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    Drop hop-by-hop headers, including any named in the Connection header
 
-        service_name = path_parts[0]
+    Args:
+        headers: (name, value) pairs, duplicates allowed
 
-        # Check if service exists
-        if service_name not in SERVICES:
-            return await call_next(request)
+    Returns:
+        list: The end-to-end headers safe to forward
+    """
+    excluded = set(HOP_BY_HOP_HEADERS)
+    for name, value in headers:
+        if name.lower() == "connection":
+            excluded.update(token.strip().lower() for token in value.split(","))
 
-        # Get service URL
-        service_url = SERVICES[service_name]["url"]
-        service_path = "/" + "/".join(path_parts[1:])
+    return [(name, value) for name, value in headers if name.lower() not in excluded]
 
-        # Forward request to service
-        url = f"{service_url}{service_path}"
 
-        # Read request body
-        body = await request.body()
+async def receive_body(receive) -> AsyncIterator[bytes]:
+    """Yield request body chunks straight from the ASGI receive channel"""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnect()
+
+        yield message.get("body", b"")
+        if not message.get("more_body", False):
+            return
+
+
+async def limit_body(stream: AsyncIterator[bytes], max_size: int) -> AsyncIterator[bytes]:
+    """Relay body chunks, aborting as soon as more than max_size bytes were received"""
+    received = 0
+    async for chunk in stream:
+        received += len(chunk)
+        if received > max_size:
+            raise BodyTooLarge()
+        if chunk:
+            yield chunk
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Upstream body stream that runs `release` once, when it is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self.stream = stream
+        self._release: Optional[Callable[[], None]] = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
 
-        # Get query parameters
-        params = dict(request.query_params)
+class RelayedResponse(StreamingResponse):
+    """Streamed upstream response that is closed even if sending it fails before the body is read"""
 
-        # Get headers (excluding host)
-        headers = dict(request.headers)
-        headers.pop("host", None)
+    def __init__(self, upstream: httpx.Response):
+        super().__init__(relay_response(upstream), status_code=upstream.status_code)
+        self.upstream = upstream
 
+    async def __call__(self, scope, receive, send):
         try:
-            # Create httpx client
-            async with httpx.AsyncClient() as client:
-                response = await client.request(
-                    method=request.method,
-                    url=url,
-                    content=body,
-                    headers=headers,
-                    params=params,
-                    timeout=30.0
-                )
-
-                # Return the response from the service
-                return Response(
-                    content=response.content,
-                    status_code=response.status_code,
-                    headers=dict(response.headers)
-                )
-        except httpx.RequestError as exc:
-            logger.error(f"Request error while proxying to {service_name}: {str(exc)}")
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.upstream.aclose()
+
+
+async def relay_response(response: httpx.Response) -> AsyncIterator[bytes]:
+    """Relay the raw (still encoded) upstream body and release the connection afterwards"""
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+async def _replay(chunks: List[bytes], rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+    async for chunk in rest:
+        yield chunk
+
+
+async def buffer_response(response: Response, max_size: int) -> Union[bytes, Response]:
+    """
+    Buffer a (possibly streamed) response body up to max_size bytes
+
+    Returns:
+        bytes: The body, or a response with the same body when it is larger than max_size
+    """
+    if not isinstance(response, StreamingResponse):
+        return response.body if len(response.body) <= max_size else response
+
+    chunks, size = [], 0
+    iterator = response.body_iterator.__aiter__()
+    async for chunk in iterator:
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > max_size:
+            replay = StreamingResponse(_replay(chunks, iterator), status_code=response.status_code)
+            replay.raw_headers = response.raw_headers
+            return replay
+    return b"".join(chunks)
+
+
+def _payload_too_large() -> Response:
+    return Response(
+        content="Request body too large",
+        # Literal: the constant was renamed across Starlette releases (REQUEST_ENTITY_TOO_LARGE, CONTENT_TOO_LARGE)
+        status_code=413
+    )
+
+
+def _gateway_timeout(service_name: str) -> Response:
+    return Response(
+        content=f"{service_name} service did not answer in time",
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT
+    )
+
+
+def _overloaded(service_name: str) -> Response:
+    return Response(
+        content=f"{service_name} service is overloaded, try again later",
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"}
+    )
+
+
+def _service_gone(service_name: str) -> Response:
+    return Response(
+        content=f"{service_name} service is no longer available",
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+def _circuit_open(service_name: str, retry_after: int) -> Response:
+    return Response(
+        content=f"{service_name} service is temporarily unavailable",
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+class ServiceProxy:
+    """
+    Proxy stage of the gateway pipeline, forwards the request to its upstream service
+
+    Idempotent requests (RETRY_METHODS, on routes that allow it) whose body
+    can be replayed are retried after connection errors and RETRY_ON_STATUS
+    responses, and hedged when HEDGE_ENABLED; both spend the service's
+    retry budget, so a failing upstream sees at most a bounded share of
+    extra traffic.
+
+    The service's bulkhead, balancer and retry policy are resolved once per
+    request, so a service discovery reload cannot pull them away from an
+    attempt that is queued, backing off or hedging; an attempt whose
+    replica was retired in the meantime is answered with 503.
+    """
+
+    def __init__(self, policies: RetryPolicyRegistry = retry_policies, hedge: bool = HEDGE_ENABLED):
+        self.policies = policies
+        self.hedge = hedge
+
+    async def forward(
+            self,
+            context: RequestContext,
+            receive,
+            conditional_headers: Optional[List[Tuple[str, str]]] = None,
+    ) -> Response:
+        """
+        Forward the request to a replica of its service and relay the response
+
+        Args:
+            context: The request context
+            receive: ASGI receive channel the request body is read from
+            conditional_headers: If given, replace the client's If-None-Match /
+                If-Modified-Since headers (used by the response cache)
+        """
+        service_name = context.service_name
+        method = context.scope["method"]
+
+        # Forward request to service (the pooled client is bound to the service base URL)
+        url = context.service_path
+        if context.query_string:
+            url = f"{url}?{context.query_string}"
+
+        # Reject oversized bodies up front when the client announces their size
+        content_length = context.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > PROXY_MAX_BODY_SIZE:
+            return _payload_too_large()
+
+        # Get end-to-end headers (excluding host, and the identity and deadline the gateway sets itself)
+        headers = [
+            (name, value) for name, value in filter_headers(context.headers.items())
+            if name != "host" and name != IDENTITY_HEADER and name != DEADLINE_HEADER_NAME
+        ]
+        # Without Accept-Encoding any coding would be acceptable upstream, and streamed
+        # bodies are relayed as they are, so ask for the client's codings only
+        if "accept-encoding" not in context.headers:
+            headers.append(("accept-encoding", "identity"))
+        if context.identity is not None:
+            headers.append((IDENTITY_HEADER, context.identity))
+        if conditional_headers is not None:
+            headers = [(name, value) for name, value in headers if name not in CONDITIONAL_HEADERS]
+            headers.extend(conditional_headers)
+
+        retryable = RETRY_ENABLED and context.route.retry and method in RETRY_METHODS
+
+        # Only send a body when the client sent one, so GETs are not turned into chunked requests
+        has_body = content_length is not None or "transfer-encoding" in context.headers
+        body = None
+        if has_body:
+            body = limit_body(receive_body(receive), PROXY_MAX_BODY_SIZE)
+            # Small bodies of retryable requests are buffered so they can be sent again
+            replayable = (retryable and content_length is not None and content_length.isdigit()
+                          and int(content_length) <= RETRY_MAX_BODY_BYTES)
+            if not PROXY_STREAMING or replayable:
+                try:
+                    body = b"".join([chunk async for chunk in body])
+                except BodyTooLarge:
+                    return _payload_too_large()
+            else:
+                retryable = False
+
+        try:
+            bulkhead = bulkheads.get(service_name)
+            balancer = upstream_balancers.get(service_name)
+            policy = self.policies.get(service_name) if retryable else None
+        except KeyError:
+            # Removed by service discovery since the route was resolved
+            return _service_gone(service_name)
+
+        # Fail fast instead of queueing behind an upstream that is known to be failing
+        breaker = circuit_breakers.get(service_name)
+        if breaker is not None and not breaker.allow():
+            return _circuit_open(service_name, breaker.retry_after())
+
+        if policy is not None:
+            policy.budget.deposit()
+
+        attempt = (context, method, url, body, headers, breaker, policy, bulkhead, balancer)
+        retries = 0
+        while True:
+            response, error = None, None
+            try:
+                if policy is not None and self.hedge:
+                    response = await self._send_hedged(*attempt)
+                else:
+                    response = await self._send(*attempt)
+            except BodyTooLarge:
+                return _payload_too_large()
+            except DeadlineExceeded:
+                return _gateway_timeout(service_name)
+            except ServiceOverloaded:
+                return _overloaded(service_name)
+            except UnknownReplica:
+                return _service_gone(service_name)
+            except httpx.RequestError as exc:
+                error = exc
+
+            if (policy is None or retries >= RETRY_MAX_RETRIES
+                    or (response is not None and response.status_code not in RETRY_ON_STATUS)):
+                break
+            delay = policy.backoff_delay(retries + 1)
+            # A retry that cannot start before the deadline is wasted work
+            if delay >= context.remaining() or not self._allow_extra_attempt(breaker, policy):
+                break
+
+            retries += 1
+            policy.retries += 1
+            if response is not None:
+                await response.aclose()
+            logger.info(f"Retrying {method} {context.path} ({retries}/{RETRY_MAX_RETRIES}): "
+                        f"{response.status_code if response is not None else type(error).__name__}")
+            await asyncio.sleep(delay)
+
+        if response is None:
+            logger.error(f"Request error while proxying to {service_name}: {str(error)}")
+            if isinstance(error, httpx.TimeoutException):
+                return _gateway_timeout(service_name)
             return Response(
                 content=f"Error communicating with {service_name} service",
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE
-            )
\ No newline at end of file
+            )
+
+        response_headers = filter_headers(response.headers.multi_items())
+
+        if PROXY_STREAMING or context.route.stream:
+            proxied = RelayedResponse(response)
+        else:
+            proxied = Response(content=response.content, status_code=response.status_code)
+            # The buffered body is already decoded, so its original length/encoding no longer apply
+            response_headers = [
+                (name, value) for name, value in response_headers
+                if name.lower() not in ("content-length", "content-encoding")
+            ]
+            response_headers.append(("content-length", str(len(response.content))))
+
+        # Keep repeated headers such as Set-Cookie intact
+        proxied.raw_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in response_headers
+        ]
+        return proxied
+
+    @staticmethod
+    def _allow_extra_attempt(breaker, policy: RetryPolicy) -> bool:
+        """Admit a retry or hedge through the circuit breaker and the retry budget"""
+        if breaker is not None and not breaker.allow():
+            return False
+        if not policy.budget.withdraw():
+            if breaker is not None:
+                breaker.release()
+            return False
+        return True
+
+    async def _send(self, context: RequestContext, method: str, url: str, body, headers, breaker,
+                    policy: Optional[RetryPolicy], bulkhead: Optional[Bulkhead],
+                    balancer: LoadBalancer) -> httpx.Response:
+        """
+        Send one attempt to the least loaded available replica and record its outcome
+
+        The attempt first takes a slot of the service's bulkhead, waiting
+        for one if needed. It gets the time left until the request's
+        deadline as its timeout, and tells the service about it in
+        DEADLINE_HEADER. Latency and outcome are recorded when the headers
+        arrive; a streamed body keeps the bulkhead slot and counts as
+        outstanding on its replica until it is closed.
+
+        Raises:
+            httpx.RequestError: If the replica could not be reached or timed out
+            DeadlineExceeded: If no time is left for the attempt
+            ServiceOverloaded: If the bulkhead shed the attempt
+            UnknownReplica: If the picked replica was retired by service discovery
+        """
+        service_name = context.service_name
+        try:
+            if bulkhead is not None and not await bulkhead.acquire(context.deadline):
+                raise DeadlineExceeded() if context.remaining() <= 0 else ServiceOverloaded()
+            timeout = context.remaining()
+            if timeout <= 0:
+                if bulkhead is not None:
+                    bulkhead.release()
+                raise DeadlineExceeded()
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
+
+        replica = balancer.pick()
+        balancer.start(replica)
+
+        started = time.monotonic()
+        success = None
+        streamed = False
+        try:
+            # Reuse the pooled, keep-alive client for this replica
+            client = upstream_clients.get(service_name, replica.url)
+            upstream_request = client.build_request(
+                method=method,
+                url=url,
+                content=body,
+                headers=headers + [(DEADLINE_HEADER_NAME, str(int(timeout * 1000)))],
+                timeout=timeout,
+            )
+            stream = PROXY_STREAMING or context.route.stream
+            response = await client.send(upstream_request, stream=stream)
+            success = response.status_code < 500
+            streamed = stream and not response.is_closed
+            return response
+        except httpx.RequestError:
+            success = False
+            raise
+        finally:
+            # Client-side aborts (and cancelled hedges) say nothing about the upstream's health
+            if success is None:
+                balancer.release(replica)
+                if breaker is not None:
+                    breaker.release()
+                if bulkhead is not None:
+                    bulkhead.release()
+            else:
+                duration = time.monotonic() - started
+                context.upstream_time += duration
+                UPSTREAM_DURATION.observe(duration, service_name)
+                if breaker is not None:
+                    breaker.record(success, duration)
+                if success and policy is not None:
+                    policy.latency.observe(duration)
+                if streamed:
+                    # The body transfer still holds the connection: keep the slot until it is closed
+                    balancer.record(replica, success, duration)
+                    response.stream = _ReleasingStream(
+                        response.stream, self._release_later(balancer, replica, bulkhead, duration, success)
+                    )
+                else:
+                    balancer.finish(replica, success, duration)
+                    if bulkhead is not None:
+                        bulkhead.release(duration, success)
+
+    @staticmethod
+    def _release_later(balancer: LoadBalancer, replica, bulkhead: Optional[Bulkhead], duration: float,
+                       success: bool) -> Callable[[], None]:
+        """What `_send` gives back once a streamed response body is closed"""
+        def release():
+            balancer.release(replica)
+            if bulkhead is not None:
+                bulkhead.release(duration, success)
+
+        return release
+
+    async def _send_hedged(self, context: RequestContext, method: str, url: str, body, headers, breaker,
+                           policy: RetryPolicy, bulkhead: Optional[Bulkhead],
+                           balancer: LoadBalancer) -> httpx.Response:
+        """
+        Send an attempt and, if it is slower than the service's recent p95, race a second one
+
+        The first successful answer wins and the other attempt is cancelled.
+        """
+        attempt = (context, method, url, body, headers, breaker, policy, bulkhead, balancer)
+        delay = policy.hedge_delay()
+        first = asyncio.ensure_future(self._send(*attempt))
+        if delay is None:
+            return await first
+
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done or not self._allow_extra_attempt(breaker, policy):
+                return await first
+        except BaseException:
+            first.cancel()
+            raise
+
+        policy.hedges += 1
+        second = asyncio.ensure_future(self._send(*attempt))
+        pending = {first, second}
+        outcome = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done
+                               if task.exception() is None and task.result().status_code < 500), None)
+                if winner is not None:
+                    # Both attempts may have answered in the same round, close every other response
+                    for task in done | ({outcome} if outcome is not None else set()):
+                        if task is not winner and task.exception() is None:
+                            await task.result().aclose()
+                    if winner is second:
+                        policy.hedge_wins += 1
+                    return winner.result()
+                for task in done:
+                    if outcome is not None and outcome.exception() is None:
+                        await outcome.result().aclose()
+                    outcome = task
+            # Neither attempt succeeded: answer with the last one, as without hedging
+            return outcome.result()
+        finally:
+            for task in pending:
+                task.cancel()
@@ -1,62 +1,144 @@
-import time
-from typing import Dict, List
+from typing import Dict, Optional, Tuple
 import logging
 from fastapi import status
 from fastapi.responses import Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 
-from ..config.settings import SERVICES
+from .context import RequestContext
+from .metrics import QUOTA_REJECTIONS, RATE_LIMIT_REJECTIONS
+from ..config.settings import QUOTA_ENABLED, QUOTA_PERIOD, QUOTA_TIERS, RATE_LIMIT_CLASSES, RATE_LIMIT_PERIOD
+from ..ratelimit import RateLimitBackend, create_rate_limit_backend
+from ..utils.log_throttle import ThrottledLogger
 
 logger = logging.getLogger("api_gateway")
+throttled_logger = ThrottledLogger(logger)
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, rate_limit_per_minute: int = 60):
-        super().__init__(app)
-        self.rate_limit = rate_limit_per_minute
-        self.clients: Dict[str, List[float]] = {}
+class RateLimiter:
+    """
+    Rate-limit stage of the gateway pipeline
 
-    async def dispatch(self, request: Request, call_next):
-        # Get client IP
-        client_ip = request.client.host
+    Every request is first limited per client IP and rate-limit class, before
+    its token is looked at. Once the auth stage verified the token, requests
+    to protected routes are also charged to the user's quota: keyed by `sub`,
+    sized by the best tier among the token's roles, and costing the route's
+    weight, so users behind one NAT no longer share a budget and an upload
+    can cost more than a read.
+    """
 
+    def __init__(
+            self,
+            rate_limit_per_minute: int = 60,
+            backend: RateLimitBackend = None,
+            quota_tiers: Optional[Dict[str, int]] = None,
+    ):
+        # Requests per period for each rate-limit class, "default" is overridable
+        self.limits = {**RATE_LIMIT_CLASSES, "default": rate_limit_per_minute}
+        # The per-IP floor of authenticated traffic is never stricter than the default class
+        self.limits["authenticated"] = max(self.limits.get("authenticated", 0), rate_limit_per_minute)
+        self.period = RATE_LIMIT_PERIOD
+        self.backend = backend or create_rate_limit_backend()
+        # Quota units per QUOTA_PERIOD by role, no tiers disables quotas
+        self.quota_tiers = dict(QUOTA_TIERS if quota_tiers is None else quota_tiers)
+        self.quotas_enabled = QUOTA_ENABLED and bool(self.quota_tiers)
+        self.quota_period = QUOTA_PERIOD
+
+    def ip_class(self, context: RequestContext) -> str:
+        """The rate-limit class a request is charged to per client IP"""
+        # Routes pick their class, e.g. the stricter "auth" class for login/register
+        rate_limit_class = context.route.rate_limit if context.route else "default"
+        # Protected routes are shaped by the user's quota, per IP they only need a flood floor
+        if self.quotas_enabled and rate_limit_class == "default" and context.route and not context.is_public:
+            return "authenticated"
+        return rate_limit_class
+
+    def tier(self, claims: dict) -> Optional[Tuple[str, int]]:
+        """
+        The quota tier of a verified token
+
+        Returns:
+            tuple: (tier name, quota units per period), the largest among the
+                token's roles, else the "default" tier; None if neither applies
+        """
+        roles = claims.get("roles") or []
+        if isinstance(roles, str):
+            roles = [roles]
+        tiers = [(role, self.quota_tiers[role]) for role in roles if role in self.quota_tiers]
+        if tiers:
+            return max(tiers, key=lambda tier: tier[1])
+        if "default" in self.quota_tiers:
+            return "default", self.quota_tiers["default"]
+        return None
+
+    async def check(self, context: RequestContext, cost: int = 1) -> Optional[Response]:
+        """
+        Return a 429 response if the client is over its limit, None otherwise
+
+        The result is kept in `context.rate_limit` so the gateway can add the
+        X-RateLimit-* headers to the final response.
+
+        Args:
+            context: The request context
+            cost: Requests to charge at once, e.g. the items of a batch using this route's class
+        """
         # Skip rate limiting for certain paths
-        path = request.url.path
-        if path.startswith("/docs") or path.startswith("/openapi.json"):
-            return await call_next(request)
-
-        # Check if this is an auth endpoint
-        path_parts = path.strip("/").split("/")
-        if path_parts and path_parts[0] == "auth":
-            service_path = "/" + "/".join(path_parts[1:])
-            is_auth_endpoint = any(service_path.startswith(route) for route in SERVICES["auth"]["public_routes"])
-        else:
-            is_auth_endpoint = False
-
-        # Apply stricter rate limiting to auth endpoints
-        limit = 5 if is_auth_endpoint else self.rate_limit
-
-        # Get current timestamp
-        now = time.time()
-
-        # Initialize client if not exists
-        if client_ip not in self.clients:
-            self.clients[client_ip] = []
-
-        # Remove timestamps older than 1 minute
-        self.clients[client_ip] = [ts for ts in self.clients[client_ip] if now - ts < 60]
-
-        # Check if rate limit exceeded
-        if len(self.clients[client_ip]) >= limit:
-            logger.warning(f"Rate limit exceeded for {client_ip}")
+        path = context.path
+        if path.startswith("/docs") or path.startswith("/openapi.json") or path == "/metrics":
+            return None
+
+        rate_limit_class = self.ip_class(context)
+        limit = self.limits.get(rate_limit_class, self.limits["default"])
+
+        result = await self.backend.hit(f"{rate_limit_class}:{context.client_ip}", limit, self.period, cost)
+        context.rate_limit = result
+
+        if not result.allowed:
+            RATE_LIMIT_REJECTIONS.inc(rate_limit_class)
+            throttled_logger.warning(
+                f"rate_limited:{rate_limit_class}",
+                f"Rate limit exceeded for {context.client_ip} ({rate_limit_class})"
+            )
             return Response(
                 content="Rate limit exceeded. Please try again later.",
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers=result.headers()
             )
 
-        # Add current timestamp
-        self.clients[client_ip].append(now)
+        return None
+
+    async def check_quota(self, context: RequestContext, cost: Optional[int] = None) -> Optional[Response]:
+        """
+        Return a 429 response if the user is over their quota, None otherwise
+
+        Only requests whose token was verified (`context.claims` with a `sub`)
+        are charged. The result is kept in `context.quota` so the gateway can
+        add the X-Quota-* headers to the final response.
+
+        Args:
+            context: The request context, after the auth stage
+            cost: Quota units to charge, default the route's cost for the request method
+        """
+        if not self.quotas_enabled or not context.claims or not context.claims.get("sub"):
+            return None
+        tier = self.tier(context.claims)
+        if tier is None:
+            return None
+        tier_name, limit = tier
+        if cost is None:
+            cost = context.route.cost_of(context.scope.get("method", "GET"))
+
+        result = await self.backend.hit(f"quota:{context.claims['sub']}", limit, self.quota_period, cost)
+        context.quota = result
+
+        if not result.allowed:
+            QUOTA_REJECTIONS.inc(tier_name)
+            throttled_logger.warning(
+                f"quota_exceeded:{tier_name}",
+                f"Quota exceeded for user {context.claims['sub']} ({tier_name} tier)"
+            )
+            return Response(
+                content="Quota exceeded. Please try again later.",
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers=result.headers(prefix="X-Quota")
+            )
 
-        # Continue with the request
-        return await call_next(request)
\ No newline at end of file
+        return None
@@ -0,0 +1,374 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import status
+from fastapi.responses import Response
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from .context import RequestContext
+from .metrics import WEBSOCKET_CONNECTIONS, WEBSOCKET_MESSAGES
+from .proxy import (
+    DEADLINE_HEADER_NAME,
+    IDENTITY_HEADER,
+    _circuit_open,
+    _gateway_timeout,
+    _overloaded,
+    filter_headers,
+)
+from ..config.settings import (
+    WEBSOCKET_MAX_CONNECTIONS,
+    WEBSOCKET_IDLE_TIMEOUT,
+    WEBSOCKET_MAX_MESSAGE_SIZE,
+    WEBSOCKET_MAX_QUEUE,
+)
+from ..upstream import circuit_breakers, upstream_balancers
+
+logger = logging.getLogger("api_gateway")
+
+try:
+    from websockets.asyncio.client import connect as websockets_connect
+    from websockets.exceptions import ConnectionClosed, InvalidStatus, WebSocketException
+except ImportError:  # Optional: pip install websockets
+    websockets_connect = None
+
+# Handshake headers the upstream connection negotiates itself
+HANDSHAKE_HEADERS = frozenset({
+    "sec-websocket-key",
+    "sec-websocket-version",
+    "sec-websocket-extensions",
+    "sec-websocket-protocol",
+    "sec-websocket-accept",
+})
+
+# Close codes that describe a local condition and must never be sent (RFC 6455 section 7.4.1)
+_RESERVED_CLOSE_CODES = frozenset({1005, 1006, 1015})
+
+CLOSE_NORMAL = 1000
+CLOSE_GOING_AWAY = 1001
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_MESSAGE_TOO_BIG = 1009
+CLOSE_BAD_GATEWAY = 1014
+
+
+class UpstreamHandshakeError(Exception):
+    """Raised when the upstream WebSocket handshake fails, with the status to deny the client with"""
+
+    def __init__(self, status_code: int):
+        super().__init__(status_code)
+        self.status_code = status_code
+
+
+class UpstreamSocket:
+    """
+    Upstream side of a relayed WebSocket, wrapping a `websockets` client connection
+
+    Only the operations the relay needs: `receive` returns None once the
+    connection is closed (its code is then in `close_code`), and `send` on
+    a closed connection is ignored, the receiving side reports the close.
+    """
+
+    __slots__ = ("_connection",)
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    @property
+    def subprotocol(self) -> Optional[str]:
+        return self._connection.subprotocol
+
+    @property
+    def close_code(self) -> Optional[int]:
+        return self._connection.close_code
+
+    @property
+    def close_reason(self) -> Optional[str]:
+        return self._connection.close_reason
+
+    async def send(self, data: Union[str, bytes]):
+        try:
+            await self._connection.send(data)
+        except ConnectionClosed:
+            pass
+
+    async def receive(self) -> Optional[Union[str, bytes]]:
+        try:
+            return await self._connection.recv()
+        except ConnectionClosed:
+            return None
+
+    async def close(self, code: int = CLOSE_NORMAL, reason: str = ""):
+        await self._connection.close(code, reason)
+
+
+async def connect_upstream(url: str, headers: List[Tuple[str, str]], subprotocols: List[str],
+                           timeout: float) -> UpstreamSocket:
+    """
+    Open a WebSocket to an upstream replica
+
+    Args:
+        url: ws:// URL of the replica, including path and query
+        headers: Headers to send with the handshake
+        subprotocols: Subprotocols the client offered
+        timeout: Seconds the handshake may take
+
+    Raises:
+        UpstreamHandshakeError: If the replica refused the handshake, could not be reached or did not answer in time
+    """
+    try:
+        connection = await websockets_connect(
+            url,
+            additional_headers=headers,
+            subprotocols=subprotocols or None,
+            open_timeout=timeout,
+            max_size=WEBSOCKET_MAX_MESSAGE_SIZE,
+            max_queue=WEBSOCKET_MAX_QUEUE,
+            # Not worth the CPU inside the cluster, clients negotiate their own compression
+            compression=None,
+        )
+    except InvalidStatus as exc:
+        raise UpstreamHandshakeError(exc.response.status_code) from exc
+    except TimeoutError as exc:
+        raise UpstreamHandshakeError(status.HTTP_504_GATEWAY_TIMEOUT) from exc
+    except (OSError, WebSocketException) as exc:
+        raise UpstreamHandshakeError(status.HTTP_503_SERVICE_UNAVAILABLE) from exc
+    return UpstreamSocket(connection)
+
+
+def promote_query_token(scope: dict) -> dict:
+    """
+    Move the `access_token` query parameter of a WebSocket handshake into an Authorization header
+
+    Browsers cannot set headers on WebSocket handshakes, so clients pass the
+    token in the query string instead. Moving it lets the auth stage check
+    the handshake like any request, and keeps the token out of the URL the
+    service (and its access log) sees.
+    """
+    query = scope.get("query_string", b"")
+    if b"access_token=" not in query or any(name == b"authorization" for name, _ in scope["headers"]):
+        return scope
+
+    params = parse_qsl(query.decode("latin-1"), keep_blank_values=True)
+    token = next((value for name, value in params if name == "access_token"), None)
+    if not token:
+        return scope
+
+    return {
+        **scope,
+        "headers": list(scope["headers"]) + [(b"authorization", f"Bearer {token}".encode("latin-1"))],
+        "query_string": urlencode([(name, value) for name, value in params if name != "access_token"]).encode("latin-1"),
+    }
+
+
+def _close_code(code: Optional[int], fallback: int) -> int:
+    """A close code that may be sent on, `fallback` for the reserved ones"""
+    return fallback if code is None or code in _RESERVED_CLOSE_CODES else code
+
+
+class WebSocketProxy:
+    """
+    WebSocket stage of the gateway pipeline, relays an authenticated connection to its service
+
+    The handshake goes through rate limiting and authentication like any
+    request, once; afterwards messages are relayed one at a time in each
+    direction. Nothing is buffered beyond the message in transit and the
+    upstream connection's small receive queue, so a slow reader on either
+    side slows down the writer on the other instead of growing memory.
+    """
+
+    def __init__(
+            self,
+            connect=None,
+            max_connections: int = WEBSOCKET_MAX_CONNECTIONS,
+            idle_timeout: float = WEBSOCKET_IDLE_TIMEOUT,
+            max_message_size: int = WEBSOCKET_MAX_MESSAGE_SIZE,
+    ):
+        # Opens the upstream connection, see connect_upstream (None: `websockets` is not installed)
+        self.connect = connect or (connect_upstream if websockets_connect is not None else None)
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.max_message_size = max_message_size
+        # Open connections per service
+        self.connections: Dict[str, int] = {}
+
+    @staticmethod
+    async def deny(websocket: WebSocket, response: Response):
+        """Reject the handshake with an HTTP response, or a policy violation close if the server cannot send one"""
+        if "websocket.http.response" in (websocket.scope.get("extensions") or {}):
+            await websocket.send_denial_response(response)
+        else:
+            await websocket.close(CLOSE_POLICY_VIOLATION)
+
+    async def forward(self, context: RequestContext, websocket: WebSocket):
+        """
+        Open a WebSocket to a replica of the service and relay messages until either side closes
+
+        Args:
+            context: The handshake's request context, already rate limited and authenticated
+            websocket: The client connection, not yet accepted
+        """
+        service_name = context.service_name
+        if not context.route.websocket:
+            await self.deny(websocket, Response(
+                content="WebSocket connections are not supported on this route",
+                status_code=status.HTTP_404_NOT_FOUND
+            ))
+            return
+
+        if self.connect is None:
+            logger.error("WebSocket upgrade received but the 'websockets' package is not installed")
+            await self.deny(websocket, Response(
+                content="WebSocket connections are not supported",
+                status_code=status.HTTP_501_NOT_IMPLEMENTED
+            ))
+            return
+
+        if self.connections.get(service_name, 0) >= self.max_connections:
+            await self.deny(websocket, _overloaded(service_name))
+            return
+
+        breaker = circuit_breakers.get(service_name)
+        if breaker is not None and not breaker.allow():
+            await self.deny(websocket, _circuit_open(service_name, breaker.retry_after()))
+            return
+
+        self.connections[service_name] = self.connections.get(service_name, 0) + 1
+        WEBSOCKET_CONNECTIONS.inc(service_name)
+        try:
+            await self._open_and_relay(context, websocket, breaker)
+        finally:
+            self.connections[service_name] -= 1
+            WEBSOCKET_CONNECTIONS.dec(service_name)
+
+    async def _open_and_relay(self, context: RequestContext, websocket: WebSocket, breaker):
+        service_name = context.service_name
+        balancer = upstream_balancers.get(service_name)
+        replica = balancer.pick()
+        balancer.start(replica)
+
+        url = "ws" + replica.url[len("http"):] if replica.url.startswith("http") else replica.url
+        url += context.service_path
+        if context.query_string:
+            url = f"{url}?{context.query_string}"
+
+        # End-to-end headers, without the ones the handshake and the gateway set themselves
+        headers = [
+            (name, value) for name, value in filter_headers(context.headers.items())
+            if name not in HANDSHAKE_HEADERS and name not in ("host", IDENTITY_HEADER, DEADLINE_HEADER_NAME)
+        ]
+        if context.identity is not None:
+            headers.append((IDENTITY_HEADER, context.identity))
+        subprotocols = [
+            protocol.strip() for protocol in context.headers.get("sec-websocket-protocol", "").split(",")
+            if protocol.strip()
+        ]
+
+        started = time.monotonic()
+        try:
+            upstream = await self.connect(url, headers, subprotocols, max(0.0, context.remaining()))
+        except UpstreamHandshakeError as exc:
+            success = exc.status_code < 500
+            duration = time.monotonic() - started
+            balancer.finish(replica, success, duration)
+            if breaker is not None:
+                breaker.record(success, duration)
+            logger.warning(f"WebSocket handshake with {service_name} failed: {exc.status_code}")
+            if exc.status_code == status.HTTP_504_GATEWAY_TIMEOUT:
+                response = _gateway_timeout(service_name)
+            elif exc.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+                response = Response(
+                    content=f"Error communicating with {service_name} service",
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+            else:
+                response = Response(status_code=exc.status_code)
+            await self.deny(websocket, response)
+            return
+        except BaseException:
+            balancer.release(replica)
+            if breaker is not None:
+                breaker.release()
+            raise
+
+        duration = time.monotonic() - started
+        balancer.finish(replica, True, duration)
+        if breaker is not None:
+            breaker.record(True, duration)
+
+        # The open connection counts as outstanding on its replica until it is closed
+        balancer.start(replica)
+        try:
+            await websocket.accept(upstream.subprotocol)
+            await self._relay(websocket, upstream, service_name)
+        except BaseException:
+            # Client gone during the accept, or the gateway shutting down
+            await upstream.close(CLOSE_GOING_AWAY, "")
+            raise
+        finally:
+            balancer.release(replica)
+
+    async def _relay(self, websocket: WebSocket, upstream, service_name: str):
+        """Pump messages in both directions until either side closes or the connection idles out"""
+        last_activity = [time.monotonic()]
+        pumps = {
+            asyncio.ensure_future(self._client_to_upstream(websocket, upstream, service_name, last_activity)),
+            asyncio.ensure_future(self._upstream_to_client(websocket, upstream, service_name, last_activity)),
+        }
+        try:
+            while True:
+                idle_left = last_activity[0] + self.idle_timeout - time.monotonic()
+                done, _ = await asyncio.wait(pumps, timeout=max(0.0, idle_left), return_when=asyncio.FIRST_COMPLETED)
+                if done:
+                    code, reason, client_open = done.pop().result()
+                    break
+                if time.monotonic() - last_activity[0] >= self.idle_timeout:
+                    code, reason, client_open = CLOSE_GOING_AWAY, "Idle timeout", True
+                    break
+        finally:
+            for pump in pumps:
+                pump.cancel()
+
+        try:
+            await upstream.close(_close_code(code, CLOSE_GOING_AWAY), reason)
+        finally:
+            if client_open:
+                await websocket.close(_close_code(code, CLOSE_BAD_GATEWAY), reason)
+
+    async def _client_to_upstream(self, websocket: WebSocket, upstream, service_name: str,
+                                  last_activity: List[float]) -> Tuple[int, str, bool]:
+        """Relay client messages, returns (close code, reason, whether the client is still connected)"""
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return message.get("code", CLOSE_NORMAL), message.get("reason") or "", False
+
+            data = message.get("text")
+            if data is None:
+                data = message.get("bytes") or b""
+            if len(data) > self.max_message_size:
+                return CLOSE_MESSAGE_TOO_BIG, "Message too big", True
+
+            last_activity[0] = time.monotonic()
+            WEBSOCKET_MESSAGES.inc(service_name, "upstream")
+            # Waits while the upstream's write buffer is full, so the client is not read meanwhile
+            await upstream.send(data)
+
+    async def _upstream_to_client(self, websocket: WebSocket, upstream, service_name: str,
+                                  last_activity: List[float]) -> Tuple[int, str, bool]:
+        """Relay upstream messages, returns (close code, reason, whether the client is still connected)"""
+        while True:
+            data = await upstream.receive()
+            if data is None:
+                return upstream.close_code, upstream.close_reason or "", True
+
+            last_activity[0] = time.monotonic()
+            WEBSOCKET_MESSAGES.inc(service_name, "client")
+            try:
+                if isinstance(data, str):
+                    await websocket.send_text(data)
+                else:
+                    await websocket.send_bytes(data)
+            except WebSocketDisconnect as exc:
+                return exc.code, "", False
@@ -0,0 +1,28 @@
+# File: backend/services/api_gateway/src/ratelimit/__init__.py
+from .base import RateLimitBackend, RateLimitResult
+from .memory import InMemoryRateLimiter, gcra
+from .shared_memory import SharedMemoryRateLimiter
+from .redis import RedisRateLimiter
+from ..config.settings import RATE_LIMIT_BACKEND
+
+
+def create_rate_limit_backend(name: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    """Create the rate-limit backend selected by RATE_LIMIT_BACKEND"""
+    if name == "memory":
+        return InMemoryRateLimiter()
+    if name == "shared_memory":
+        return SharedMemoryRateLimiter()
+    if name == "redis":
+        return RedisRateLimiter()
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+
+__all__ = [
+    "RateLimitBackend",
+    "RateLimitResult",
+    "InMemoryRateLimiter",
+    "SharedMemoryRateLimiter",
+    "RedisRateLimiter",
+    "create_rate_limit_backend",
+    "gcra",
+]
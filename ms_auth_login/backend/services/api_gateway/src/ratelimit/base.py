@@ -0,0 +1,44 @@
+# File: backend/services/api_gateway/src/ratelimit/base.py
+import math
+from abc import ABC, abstractmethod
+
+
+class RateLimitResult:
+    """Outcome of a rate-limit check, with the values for the X-RateLimit-* headers"""
+
+    __slots__ = ("allowed", "limit", "remaining", "retry_after", "reset_after")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, retry_after: float, reset_after: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        # Seconds until the request would be allowed (0 if allowed)
+        self.retry_after = retry_after
+        # Seconds until the full limit is available again
+        self.reset_after = reset_after
+
+    def headers(self, prefix: str = "X-RateLimit") -> dict:
+        headers = {
+            f"{prefix}-Limit": str(self.limit),
+            f"{prefix}-Remaining": str(self.remaining),
+            f"{prefix}-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class RateLimitBackend(ABC):
+    """
+    Storage for rate-limit counters
+
+    Implementations must apply each hit atomically and answer with at most
+    one round trip to shared storage, so the check stays cheap per request.
+    """
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, period: float, cost: int = 1) -> RateLimitResult:
+        """Record `cost` requests for `key` and report whether they are within `limit` per `period` seconds"""
+
+    async def close(self):
+        """Release connections or mapped memory"""
@@ -0,0 +1,86 @@
+# File: backend/services/api_gateway/src/ratelimit/memory.py
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from .base import RateLimitBackend, RateLimitResult
+from ..config.settings import RATE_LIMIT_MAX_KEYS
+
+
+def gcra(tat: float, now: float, limit: int, period: float, cost: int = 1):
+    """
+    Generic Cell Rate Algorithm step
+
+    A key's whole state is its theoretical arrival time (TAT): the time at
+    which its bucket would be empty again. Each request pushes the TAT by
+    period / limit; it is allowed while the TAT stays within one period
+    of now, which permits bursts of up to `limit` requests.
+
+    Returns:
+        tuple: (RateLimitResult, new TAT or None if the request was rejected)
+    """
+    interval = period / limit
+    start = tat if tat > now else now
+    new_tat = start + interval * cost
+    backlog = new_tat - now
+
+    if backlog > period:
+        return RateLimitResult(False, limit, 0, backlog - period, start - now), None
+
+    remaining = int((period - backlog) // interval)
+    return RateLimitResult(True, limit, remaining, 0.0, backlog), new_tat
+
+
+class InMemoryRateLimiter(RateLimitBackend):
+    """
+    GCRA rate limiter for a single process (the "memory" rate-limit backend)
+
+    O(1) time and one float of state per key. Keys are kept in LRU order;
+    idle keys (whose bucket has fully drained, which is equivalent to no
+    state at all) are evicted from the cold end as keys are updated, and
+    the total number of keys is capped at `max_keys`.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self.evictions = 0
+
+    async def hit(self, key: str, limit: int, period: float, cost: int = 1) -> RateLimitResult:
+        return self.acquire(key, limit, period, cost)
+
+    async def close(self):
+        self.clear()
+
+    def acquire(self, key: str, limit: int, period: float, cost: int = 1, now: Optional[float] = None) -> RateLimitResult:
+        now = now if now is not None else time.monotonic()
+        tats = self._tats
+
+        result, new_tat = gcra(tats.get(key, now), now, limit, period, cost)
+        if new_tat is not None:
+            tats[key] = new_tat
+            tats.move_to_end(key)
+            self._evict(now)
+
+        return result
+
+    def _evict(self, now: float):
+        tats = self._tats
+        if len(tats) > self.max_keys:
+            tats.popitem(last=False)
+            self.evictions += 1
+
+        # Drop up to two drained keys from the least recently used end per
+        # update: bounded work, yet faster than new keys can be inserted
+        for _ in range(2):
+            key = next(iter(tats))
+            if tats[key] > now:
+                break
+            del tats[key]
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def clear(self):
+        self._tats.clear()
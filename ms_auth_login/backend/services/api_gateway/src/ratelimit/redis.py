@@ -0,0 +1,210 @@
+# File: backend/services/api_gateway/src/ratelimit/redis.py
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from .base import RateLimitBackend, RateLimitResult
+from ..config.settings import RATE_LIMIT_REDIS_URL, RATE_LIMIT_REDIS_TIMEOUT, RATE_LIMIT_FAIL_OPEN
+from ..utils.log_throttle import ThrottledLogger
+
+logger = logging.getLogger("api_gateway")
+throttled_logger = ThrottledLogger(logger)
+
+Command = Tuple[str, ...]
+
+
+class RedisError(Exception):
+    """Error reply from the server"""
+
+
+def encode_command(command: Sequence[str]) -> bytes:
+    """Encode a command as a RESP array of bulk strings"""
+    parts = [b"*%d\r\n" % len(command)]
+    for argument in command:
+        data = argument.encode() if isinstance(argument, str) else argument
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader):
+    """Read one RESP reply; error replies are returned as RedisError instances"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+
+    prefix, rest = line[:1], line[1:-2]
+    if prefix == b"+":
+        return rest.decode()
+    if prefix == b"-":
+        return RedisError(rest.decode())
+    if prefix == b":":
+        return int(rest)
+    if prefix == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Unexpected reply: {line!r}")
+
+
+class RedisRateLimiter(RateLimitBackend):
+    """
+    Sliding-window-counter rate limiter backed by a Redis-protocol server
+
+    Each hit is one pipelined round trip: INCRBY on the current window's
+    counter (atomic on the server), PEXPIRE to let it age out, and GET of the
+    previous window. The estimate weights the previous window by how much of
+    it still overlaps the sliding period. Rejected hits are rolled back with
+    a DECRBY that rides along with the next pipeline instead of costing a
+    round trip of its own. Concurrent requests share one connection and are
+    pipelined back to back; replies are matched in order by a reader task.
+
+    If the server cannot be reached the limiter fails open (or closed, see
+    RATE_LIMIT_FAIL_OPEN) rather than blocking requests.
+    """
+
+    def __init__(
+            self,
+            url: str = RATE_LIMIT_REDIS_URL,
+            timeout: float = RATE_LIMIT_REDIS_TIMEOUT,
+            fail_open: bool = RATE_LIMIT_FAIL_OPEN,
+            prefix: str = "ratelimit:",
+    ):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.fail_open = fail_open
+        self.prefix = prefix
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        # (future, replies to discard first, replies to deliver) in send order
+        self._pending: Deque[Tuple[asyncio.Future, int, int]] = deque()
+        # Fire-and-forget commands sent ahead of the next pipeline
+        self._deferred: List[Command] = []
+
+        self.round_trips = 0
+        self.errors = 0
+
+    async def hit(self, key: str, limit: int, period: float, cost: int = 1) -> RateLimitResult:
+        now = time.time()
+        window = int(now // period)
+        elapsed = (now % period) / period
+        current = f"{self.prefix}{key}:{window}"
+        previous = f"{self.prefix}{key}:{window - 1}"
+
+        try:
+            count, _, previous_count = await asyncio.wait_for(
+                self.execute([
+                    ("INCRBY", current, str(cost)),
+                    ("PEXPIRE", current, str(int(period * 2000))),
+                    ("GET", previous),
+                ]),
+                self.timeout,
+            )
+            if isinstance(count, RedisError):
+                raise count
+        except (OSError, ConnectionError, asyncio.TimeoutError, RedisError) as exc:
+            self.errors += 1
+            throttled_logger.error("ratelimit_redis", f"Rate limit backend unavailable: {exc!r}")
+            if self.fail_open:
+                return RateLimitResult(True, limit, limit, 0.0, 0.0)
+            return RateLimitResult(False, limit, 0, 1.0, 1.0)
+
+        previous_count = int(previous_count or 0)
+        window_left = (1 - elapsed) * period
+        estimated = previous_count * (1 - elapsed) + count
+
+        if estimated > limit:
+            # Undo the increment so rejected requests do not consume quota
+            self._deferred.append(("DECRBY", current, str(cost)))
+            if count > limit or previous_count == 0:
+                retry_after = window_left
+            else:
+                # Wait until enough of the previous window has slid out
+                retry_after = (estimated - limit) / previous_count * period
+            return RateLimitResult(False, limit, 0, retry_after, window_left)
+
+        return RateLimitResult(True, limit, int(limit - estimated), 0.0, window_left)
+
+    async def execute(self, commands: List[Command]) -> list:
+        """Send commands as one pipeline and return their replies (one round trip)"""
+        await self._connect()
+
+        deferred, self._deferred = self._deferred, []
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((future, len(deferred), len(commands)))
+        self._writer.write(b"".join(encode_command(command) for command in deferred + commands))
+        self.round_trips += 1
+        return await future
+
+    async def _connect(self):
+        if self._writer is not None and not self._writer.is_closing():
+            return
+
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            self._reader, self._writer = reader, writer
+            self._reader_task = asyncio.create_task(self._read_replies(reader))
+
+            setup = []
+            if self.password:
+                setup.append(("AUTH", self.password))
+            if self.db:
+                setup.append(("SELECT", str(self.db)))
+            if setup:
+                for reply in await self.execute(setup):
+                    if isinstance(reply, RedisError):
+                        raise reply
+
+    async def _read_replies(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                reply = await read_reply(reader)
+                future, skip, count = self._pending[0]
+                if skip:
+                    self._pending[0] = (future, skip - 1, count)
+                    continue
+
+                replies = [reply]
+                for _ in range(count - 1):
+                    replies.append(await read_reply(reader))
+                self._pending.popleft()
+                if not future.done():
+                    future.set_result(replies)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, IndexError) as exc:
+            self._fail_pending(ConnectionError(f"Rate limit backend connection lost: {exc!r}"))
+        finally:
+            if self._reader is reader and self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def _fail_pending(self, exc: Exception):
+        while self._pending:
+            future, _, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(exc)
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+        self._fail_pending(ConnectionError("Rate limit backend closed"))
@@ -0,0 +1,83 @@
+# File: backend/services/api_gateway/src/ratelimit/shared_memory.py
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+from .base import RateLimitBackend, RateLimitResult
+from .memory import gcra
+from ..config.settings import RATE_LIMIT_SHM_PATH, RATE_LIMIT_SHM_SLOTS
+
+# Slot: 64-bit key hash (0 = empty) + theoretical arrival time as a double
+_SLOT = struct.Struct("<Qd")
+_SLOTS_PER_BUCKET = 8
+_BUCKET_SIZE = _SLOT.size * _SLOTS_PER_BUCKET
+
+
+def _hash_key(key: str) -> int:
+    value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+    return value or 1
+
+
+class SharedMemoryRateLimiter(RateLimitBackend):
+    """
+    GCRA rate limiter shared by all worker processes on one host
+
+    State lives in a fixed-size, mmap-backed table (by default under
+    /dev/shm) of 8-slot buckets. A hit locks only its bucket's byte range
+    with fcntl, so workers contend only when their keys share a bucket.
+    When a bucket is full the slot with the oldest TAT is reused, which is
+    a drained key unless the table is over capacity. Memory is constant:
+    16 bytes per slot. Times are wall-clock so all processes agree.
+    """
+
+    def __init__(self, path: str = RATE_LIMIT_SHM_PATH, slots: int = RATE_LIMIT_SHM_SLOTS):
+        self.path = path
+        self.buckets = max(1, slots // _SLOTS_PER_BUCKET)
+        self.evictions = 0
+
+        size = self.buckets * _BUCKET_SIZE
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        # Every worker opens the same file; only grow it, never truncate live state
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    async def hit(self, key: str, limit: int, period: float, cost: int = 1) -> RateLimitResult:
+        return self.acquire(key, limit, period, cost)
+
+    def acquire(self, key: str, limit: int, period: float, cost: int = 1, now: float = None) -> RateLimitResult:
+        now = now if now is not None else time.time()
+        key_hash = _hash_key(key)
+        offset = (key_hash % self.buckets) * _BUCKET_SIZE
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, _BUCKET_SIZE, offset)
+        try:
+            slot, tat = None, now
+            victim, victim_tat = offset, float("inf")
+            for position in range(offset, offset + _BUCKET_SIZE, _SLOT.size):
+                slot_hash, slot_tat = _SLOT.unpack_from(self._map, position)
+                if slot_hash == key_hash:
+                    slot, tat = position, slot_tat
+                    break
+                if slot_tat < victim_tat:
+                    victim, victim_tat = position, slot_tat
+
+            if slot is None:
+                slot = victim
+                if victim_tat > now:
+                    self.evictions += 1
+
+            result, new_tat = gcra(tat, now, limit, period, cost)
+            if new_tat is not None:
+                _SLOT.pack_into(self._map, slot, key_hash, new_tat)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, _BUCKET_SIZE, offset)
+
+        return result
+
+    async def close(self):
+        self._map.close()
+        os.close(self._fd)
@@ -1,6 +1,26 @@
 # File: backend/services/api_gateway/src/routes/health.py
 from fastapi import APIRouter
+from ..config.logging import log_handler
 from ..config.settings import SERVICES
+from ..middleware.cache import response_cache
+from ..middleware.coalesce import single_flight
+from ..upstream import (
+    bulkheads,
+    circuit_breakers,
+    retry_policies,
+    service_discovery,
+    upstream_balancers,
+    upstream_clients,
+    upstream_prober,
+    upstream_resolver,
+)
+from ..utils.jwt import token_cache, rejected_tokens
+
+# Service status while its circuit breaker is not closed
+_BREAKER_STATUS = {"half_open": "recovering", "open": "down"}
+
+# Service statuses that do not make the gateway report itself degraded
+_OK_STATUSES = ("up", "unknown")
 
 router = APIRouter(
     prefix="/health",
@@ -14,16 +34,41 @@ async def health_check():
 
 @router.get("/detailed")
 async def detailed_health():
-    """More detailed health information"""
-    # You could expand this with actual service health checks
-    return {
-        "status": "healthy",
-        "services": {
-            service: {"status": "up", "url": details["url"]}
-            for service, details in SERVICES.items()
-        },
-        "system": {
-            "memory": "ok",
-            "cpu": "ok"
+    """
+    More detailed health information
+
+    Served from state kept up to date in the background (probe results,
+    breaker and balancer state), so calling it never triggers upstream requests.
+    """
+    breakers = circuit_breakers.stats()
+    retries = retry_policies.stats()
+    limits = bulkheads.stats()
+    services = {}
+    for service in SERVICES:
+        breaker = breakers.get(service, {"state": "closed"})
+        probes = {probe["url"]: probe for probe in upstream_prober.stats(service)}
+        replicas = upstream_balancers.get(service).stats()
+        for replica in replicas:
+            replica["probe"] = probes.get(replica["url"])
+
+        services[service] = {
+            "status": _BREAKER_STATUS.get(breaker["state"]) or upstream_prober.service_status(service),
+            "replicas": replicas,
+            "circuit_breaker": breaker,
+            "retries": retries.get(service),
+            "bulkhead": limits.get(service),
         }
-    }
\ No newline at end of file
+
+    return {
+        "status": "healthy" if all(s["status"] in _OK_STATUSES for s in services.values()) else "degraded",
+        "services": services,
+        "upstream_pools": upstream_clients.stats(),
+        "dns_cache": upstream_resolver.stats(),
+        "service_discovery": service_discovery.stats(),
+        "token_cache": token_cache.stats(),
+        "rejected_tokens": rejected_tokens.stats(),
+        "response_cache": response_cache.stats(),
+        "coalescing": single_flight.stats(),
+        "system": upstream_prober.process.stats(),
+        "logging": log_handler.stats(),
+    }
@@ -0,0 +1,116 @@
+# File: backend/services/api_gateway/src/routes/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from ..config.logging import log_handler
+from ..middleware.cache import response_cache
+from ..middleware.coalesce import single_flight
+from ..middleware.metrics import registry
+from ..upstream import bulkheads, circuit_breakers, retry_policies, upstream_balancers, upstream_clients
+from ..utils.jwt import token_cache, rejected_tokens
+from ..utils.metrics import CallbackMetric
+
+router = APIRouter(tags=["metrics"])
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_BREAKER_STATE = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _pool_stat(name: str):
+    return lambda: {(service,): stats[name] for service, stats in upstream_clients.stats().items()}
+
+
+def _bulkhead_stat(name: str):
+    return lambda: {(service,): stats[name] for service, stats in bulkheads.stats().items()}
+
+
+def _retry_stat(name: str):
+    return lambda: {(service,): stats[name] for service, stats in retry_policies.stats().items()}
+
+
+def _replica_stat(name: str):
+    return lambda: {
+        (service, replica["url"]): replica[name]
+        for service, replicas in upstream_balancers.stats().items()
+        for replica in replicas
+    }
+
+
+# State the gateway already keeps, read only when scraped
+for _metric in (
+    CallbackMetric("gateway_token_cache_hits_total", "Verified-token cache hits", (),
+                   lambda: {(): token_cache.hits}, "counter"),
+    CallbackMetric("gateway_token_cache_misses_total", "Verified-token cache misses", (),
+                   lambda: {(): token_cache.misses}, "counter"),
+    CallbackMetric("gateway_token_cache_hit_ratio", "Verified-token cache hit ratio since start", (),
+                   lambda: {(): token_cache.stats()["hit_ratio"]}),
+    CallbackMetric("gateway_rejected_token_cache_hits_total", "Requests rejected from the rejected-token cache", (),
+                   lambda: {(): rejected_tokens.hits}, "counter"),
+    CallbackMetric("gateway_response_cache_hits_total", "Responses served from the gateway cache", (),
+                   lambda: {(): response_cache.hits}, "counter"),
+    CallbackMetric("gateway_response_cache_revalidations_total", "Cached responses revalidated with a 304", (),
+                   lambda: {(): response_cache.revalidations}, "counter"),
+    CallbackMetric("gateway_response_cache_misses_total", "Cacheable requests fetched in full", (),
+                   lambda: {(): response_cache.misses}, "counter"),
+    CallbackMetric("gateway_response_cache_bytes", "Bytes held by the response cache", (),
+                   lambda: {(): response_cache.current_bytes}),
+    CallbackMetric("gateway_coalesced_requests_total", "Upstream calls saved by request coalescing", (),
+                   lambda: {(): single_flight.shared}, "counter"),
+    CallbackMetric("gateway_upstream_pool_connections_in_use", "Upstream connections serving a request",
+                   ("service",), _pool_stat("in_use")),
+    CallbackMetric("gateway_upstream_pool_connections_idle", "Idle keep-alive upstream connections",
+                   ("service",), _pool_stat("idle")),
+    CallbackMetric("gateway_upstream_pool_requests_waiting", "Requests waiting for an upstream connection",
+                   ("service",), _pool_stat("waiting")),
+    CallbackMetric("gateway_upstream_pool_max_connections", "Upstream connection limit",
+                   ("service",), _pool_stat("max_connections")),
+    CallbackMetric("gateway_upstream_replica_outstanding_requests", "In-flight requests per upstream replica",
+                   ("service", "replica"), _replica_stat("outstanding")),
+    CallbackMetric("gateway_upstream_replica_failures_total", "Failed requests per upstream replica",
+                   ("service", "replica"), _replica_stat("failures"), "counter"),
+    CallbackMetric("gateway_bulkhead_limit", "Current adaptive concurrency limit per service",
+                   ("service",), _bulkhead_stat("limit")),
+    CallbackMetric("gateway_bulkhead_in_flight", "Upstream calls holding a bulkhead slot",
+                   ("service",), _bulkhead_stat("in_flight")),
+    CallbackMetric("gateway_bulkhead_queue_depth", "Requests waiting for a bulkhead slot",
+                   ("service",), _bulkhead_stat("queue_depth")),
+    CallbackMetric("gateway_bulkhead_shed_total", "Requests shed because the bulkhead queue was full",
+                   ("service",), _bulkhead_stat("shed"), "counter"),
+    CallbackMetric("gateway_bulkhead_expired_total", "Requests whose deadline passed while queued",
+                   ("service",), _bulkhead_stat("expired"), "counter"),
+    CallbackMetric("gateway_upstream_retries_total", "Retried upstream requests",
+                   ("service",), _retry_stat("retries"), "counter"),
+    CallbackMetric("gateway_upstream_hedges_total", "Hedged upstream requests",
+                   ("service",), _retry_stat("hedges"), "counter"),
+    CallbackMetric("gateway_upstream_hedge_wins_total", "Hedged requests answered first by the hedge",
+                   ("service",), _retry_stat("hedge_wins"), "counter"),
+    CallbackMetric("gateway_upstream_retry_budget_tokens", "Retries the retry budget currently allows",
+                   ("service",), lambda: {
+                       (service,): stats["budget"]["tokens"] for service, stats in retry_policies.stats().items()
+                   }),
+    CallbackMetric("gateway_upstream_retry_budget_exhausted_total", "Retries or hedges refused by the retry budget",
+                   ("service",), lambda: {
+                       (service,): stats["budget"]["exhausted"] for service, stats in retry_policies.stats().items()
+                   }, "counter"),
+    CallbackMetric("gateway_log_records_dropped_total", "Log records not written, by reason", ("reason",),
+                   lambda: {
+                       (reason,): log_handler.stats()[name]
+                       for reason, name in (("queue_full", "dropped"), ("sampled", "sampled"),
+                                            ("rate_limited", "rate_limited"))
+                   }, "counter"),
+    CallbackMetric("gateway_log_queue_depth", "Log records waiting for the writer thread", (),
+                   lambda: {(): log_handler.queue.qsize()}),
+    CallbackMetric("gateway_circuit_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+                   ("service",), lambda: {
+                       (service,): _BREAKER_STATE[stats["state"]] for service, stats in circuit_breakers.stats().items()
+                   }),
+):
+    registry.register(_metric)
+
+
+@router.get("/metrics")
+async def metrics():
+    """Gateway metrics in the Prometheus text format"""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,42 @@
+# File: backend/services/api_gateway/src/upstream/__init__.py
+from .balancer import LoadBalancer, LoadBalancerRegistry, Replica, upstream_balancers
+from .bulkhead import AdaptiveLimit, Bulkhead, BulkheadRegistry, bulkheads
+from .circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, circuit_breakers
+from .clients import UnknownReplica, UpstreamClientRegistry, service_replicas, upstream_clients
+from .discovery import DiscoveryError, ServiceDiscovery, service_discovery, service_routes
+from .prober import ProcessMonitor, UpstreamProber, upstream_prober
+from .resolver import CachingNetworkBackend, DNSCache, upstream_resolver
+from .retry import LatencyTracker, RetryBudget, RetryPolicy, RetryPolicyRegistry, retry_policies
+
+__all__ = [
+    "LoadBalancer",
+    "LoadBalancerRegistry",
+    "Replica",
+    "upstream_balancers",
+    "AdaptiveLimit",
+    "Bulkhead",
+    "BulkheadRegistry",
+    "bulkheads",
+    "CircuitBreaker",
+    "CircuitBreakerRegistry",
+    "circuit_breakers",
+    "UnknownReplica",
+    "UpstreamClientRegistry",
+    "service_replicas",
+    "upstream_clients",
+    "DiscoveryError",
+    "ServiceDiscovery",
+    "service_discovery",
+    "service_routes",
+    "ProcessMonitor",
+    "UpstreamProber",
+    "upstream_prober",
+    "CachingNetworkBackend",
+    "DNSCache",
+    "upstream_resolver",
+    "LatencyTracker",
+    "RetryBudget",
+    "RetryPolicy",
+    "RetryPolicyRegistry",
+    "retry_policies",
+]
@@ -0,0 +1,281 @@
+# File: backend/services/api_gateway/src/upstream/balancer.py
+import logging
+import random
+import time
+from typing import Dict, List
+
+from .clients import service_replicas
+from ..config.settings import (
+    SERVICES,
+    UPSTREAM_BALANCER,
+    UPSTREAM_SLOW_START,
+    UPSTREAM_EJECT_CONSECUTIVE_FAILURES,
+    UPSTREAM_EJECTION_TIME,
+    UPSTREAM_MAX_EJECTION_PERCENT,
+    UPSTREAM_UNHEALTHY_THRESHOLD,
+)
+
+logger = logging.getLogger("api_gateway")
+
+# Share of its weight a replica gets at the start of slow start
+_SLOW_START_FLOOR = 0.1
+# Repeated ejections grow the ejection time up to this factor
+_MAX_EJECTION_FACTOR = 10
+# Smoothing factor of the per-replica latency average
+_LATENCY_ALPHA = 0.2
+
+
+class Replica:
+    """One upstream endpoint of a service, with its load and health state"""
+
+    __slots__ = (
+        "url", "weight", "outstanding", "healthy", "failed_checks",
+        "ejected_until", "ejections", "consecutive_failures", "warm_from",
+        "requests", "failures", "latency",
+    )
+
+    def __init__(self, url: str, weight: float = 1.0, now: float = 0.0):
+        self.url = url
+        self.weight = weight
+        self.outstanding = 0
+        # Active health, from periodic checks
+        self.healthy = True
+        self.failed_checks = 0
+        # Passive health (outlier ejection), from proxied traffic
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.consecutive_failures = 0
+        # Start of the current slow-start ramp
+        self.warm_from = now
+
+        self.requests = 0
+        self.failures = 0
+        self.latency = 0.0
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def load(self, now: float, slow_start: float) -> float:
+        """Outstanding requests relative to the replica's (ramping) weight, lower is better"""
+        weight = self.weight
+        if slow_start > 0:
+            warmed = (now - self.warm_from) / slow_start
+            if warmed < 1:
+                weight *= max(_SLOW_START_FLOOR, warmed)
+        return (self.outstanding + 1) / weight
+
+    def stats(self, now: float) -> dict:
+        if not self.healthy:
+            state = "unhealthy"
+        elif now < self.ejected_until:
+            state = "ejected"
+        else:
+            state = "up"
+        return {
+            "url": self.url,
+            "state": state,
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "latency_ms": round(self.latency * 1000, 2),
+        }
+
+
+class LoadBalancer:
+    """
+    Client-side load balancer over the replicas of one service
+
+    "least_outstanding" sends each request to the replica with the fewest
+    in-flight requests per unit of weight; "power_of_two" compares two
+    random replicas only, which avoids herding when several gateway
+    processes see the same stale counts. Replicas that fail their active
+    health checks or return UPSTREAM_EJECT_CONSECUTIVE_FAILURES failures in a
+    row are skipped (at most UPSTREAM_MAX_EJECTION_PERCENT of them are
+    ejected at once); when they come back their weight ramps up over
+    the slow-start period so a cold replica is not flooded.
+    """
+
+    def __init__(
+            self,
+            service_name: str,
+            replicas: List[dict],
+            strategy: str = UPSTREAM_BALANCER,
+            slow_start: float = UPSTREAM_SLOW_START,
+            eject_consecutive_failures: int = UPSTREAM_EJECT_CONSECUTIVE_FAILURES,
+            ejection_time: float = UPSTREAM_EJECTION_TIME,
+            max_ejection_percent: int = UPSTREAM_MAX_EJECTION_PERCENT,
+            now: float = None,
+    ):
+        if strategy not in ("least_outstanding", "power_of_two"):
+            raise ValueError(f"Unknown load balancing strategy: {strategy}")
+
+        now = now if now is not None else time.monotonic()
+        self.service_name = service_name
+        self.strategy = strategy
+        self.slow_start = slow_start
+        self.eject_consecutive_failures = eject_consecutive_failures
+        self.ejection_time = ejection_time
+        self.max_ejection_percent = max_ejection_percent
+        # Replicas present at startup are considered warm
+        self.replicas = [Replica(replica["url"], replica["weight"], now - slow_start) for replica in replicas]
+        self._by_url = {replica.url: replica for replica in self.replicas}
+        self._next = 0
+
+    def update(self, replicas: List[dict], now: float = None):
+        """
+        Replace the replica set (service discovery)
+
+        Replicas that remain keep their load and health state; added ones
+        start their slow-start ramp. Requests still running on a removed
+        replica finish normally, it is just never picked again.
+        """
+        now = now if now is not None else time.monotonic()
+        updated = []
+        for config in replicas:
+            replica = self._by_url.get(config["url"])
+            if replica is None:
+                replica = Replica(config["url"], config["weight"], now)
+            else:
+                replica.weight = config["weight"]
+            updated.append(replica)
+        self.replicas = updated
+        self._by_url = {replica.url: replica for replica in updated}
+
+    def pick(self, now: float = None) -> Replica:
+        """
+        Choose the replica for the next request
+
+        Falls back to all replicas when none is available, so a fully
+        failing service still gets traffic (and a chance to recover)
+        instead of none at all.
+        """
+        replicas = self.replicas
+        if len(replicas) == 1:
+            return replicas[0]
+
+        now = now if now is not None else time.monotonic()
+        candidates = [replica for replica in replicas if replica.available(now)] or replicas
+
+        if self.strategy == "power_of_two" and len(candidates) > 2:
+            first, second = random.sample(candidates, 2)
+            return first if first.load(now, self.slow_start) <= second.load(now, self.slow_start) else second
+
+        # Rotate the starting point so ties are spread evenly
+        self._next = (self._next + 1) % len(candidates)
+        best, best_load = None, float("inf")
+        for index in range(len(candidates)):
+            replica = candidates[(self._next + index) % len(candidates)]
+            load = replica.load(now, self.slow_start)
+            if load < best_load:
+                best, best_load = replica, load
+        return best
+
+    def start(self, replica: Replica):
+        """Count a request sent to the replica until `finish` or `release`"""
+        replica.outstanding += 1
+
+    def finish(self, replica: Replica, success: bool, duration: float, now: float = None):
+        """
+        Record the outcome of a request and update passive health
+
+        Args:
+            success: False for connection errors, timeouts and 5xx responses
+            duration: Seconds until the upstream response headers arrived
+        """
+        replica.outstanding -= 1
+        self.record(replica, success, duration, now)
+
+    def record(self, replica: Replica, success: bool, duration: float, now: float = None):
+        """Like `finish`, but the request stays outstanding until `release` (streamed bodies)"""
+        now = now if now is not None else time.monotonic()
+        replica.requests += 1
+        replica.latency += _LATENCY_ALPHA * (duration - replica.latency)
+
+        if success:
+            replica.consecutive_failures = 0
+            return
+
+        replica.failures += 1
+        replica.consecutive_failures += 1
+        if replica.consecutive_failures >= self.eject_consecutive_failures and now >= replica.ejected_until:
+            self._eject(replica, now)
+
+    def release(self, replica: Replica):
+        """End a request that produced no upstream verdict (e.g. the client went away)"""
+        replica.outstanding -= 1
+
+    def mark_health(self, url: str, healthy: bool, unhealthy_threshold: int = UPSTREAM_UNHEALTHY_THRESHOLD,
+                    now: float = None):
+        """Record the result of an active health check of one replica"""
+        now = now if now is not None else time.monotonic()
+        replica = self._by_url.get(url)
+        if replica is None:
+            return
+
+        if healthy:
+            replica.failed_checks = 0
+            if not replica.healthy:
+                replica.healthy = True
+                replica.warm_from = now
+                logger.info(f"Replica {url} of {self.service_name} is healthy again")
+            return
+
+        replica.failed_checks += 1
+        if replica.healthy and replica.failed_checks >= unhealthy_threshold:
+            replica.healthy = False
+            logger.warning(f"Replica {url} of {self.service_name} failed {replica.failed_checks} health checks")
+
+    def _eject(self, replica: Replica, now: float):
+        ejected = sum(1 for other in self.replicas if now < other.ejected_until)
+        if (ejected + 1) * 100 > len(self.replicas) * self.max_ejection_percent:
+            return
+
+        replica.ejections += 1
+        duration = self.ejection_time * min(replica.ejections, _MAX_EJECTION_FACTOR)
+        replica.ejected_until = now + duration
+        replica.consecutive_failures = 0
+        # Ramp back up once the ejection ends
+        replica.warm_from = replica.ejected_until
+        logger.warning(f"Ejected replica {replica.url} of {self.service_name} for {duration:.0f}s")
+
+    def stats(self, now: float = None) -> List[dict]:
+        now = now if now is not None else time.monotonic()
+        return [replica.stats(now) for replica in self.replicas]
+
+
+class LoadBalancerRegistry:
+    """One load balancer per service, created on first use"""
+
+    def __init__(self, services: Dict[str, dict]):
+        self.services = services
+        self._balancers: Dict[str, LoadBalancer] = {}
+
+    def get(self, service_name: str) -> LoadBalancer:
+        balancer = self._balancers.get(service_name)
+        if balancer is None:
+            config = self.services[service_name]
+            balancer = LoadBalancer(service_name, service_replicas(config), **config.get("balancer", {}))
+            self._balancers[service_name] = balancer
+        return balancer
+
+    def reset(self):
+        self._balancers.clear()
+
+    def discard(self, service_name: str):
+        """Forget a service's state, it is recreated from the current config on next use"""
+        self._balancers.pop(service_name, None)
+
+    def update(self, service_name: str):
+        """Apply the service's current replica list to its balancer, if it has one"""
+        balancer = self._balancers.get(service_name)
+        if balancer is not None:
+            balancer.update(service_replicas(self.services[service_name]))
+
+    def stats(self) -> Dict[str, List[dict]]:
+        return {name: balancer.stats() for name, balancer in self._balancers.items()}
+
+
+# Balancers shared by the proxy, the prober and the health routes
+upstream_balancers = LoadBalancerRegistry(SERVICES)
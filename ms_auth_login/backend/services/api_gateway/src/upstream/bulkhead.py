@@ -0,0 +1,199 @@
+# File: backend/services/api_gateway/src/upstream/bulkhead.py
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ..config.settings import (
+    SERVICES,
+    BULKHEAD_ENABLED,
+    BULKHEAD_INITIAL_LIMIT,
+    BULKHEAD_MIN_LIMIT,
+    BULKHEAD_MAX_LIMIT,
+    BULKHEAD_QUEUE_SIZE,
+    BULKHEAD_LATENCY_TOLERANCE,
+    BULKHEAD_BACKOFF,
+)
+
+# Smoothing factor of the long-term latency average the limit is judged against
+_BASELINE_ALPHA = 0.01
+
+
+class AdaptiveLimit:
+    """
+    AIMD concurrency limit driven by observed latency
+
+    Each completion within `tolerance` times the long-term average latency
+    grows the limit by 1/limit, so about one per round of requests; a
+    failure or a slower completion multiplies it by `backoff`. Queueing inside the upstream shows up as
+    latency before it shows up as errors, so the limit settles close to
+    the concurrency the service can actually absorb.
+    """
+
+    __slots__ = ("value", "min_limit", "max_limit", "tolerance", "backoff", "baseline")
+
+    def __init__(
+            self,
+            initial: int = BULKHEAD_INITIAL_LIMIT,
+            min_limit: int = BULKHEAD_MIN_LIMIT,
+            max_limit: int = BULKHEAD_MAX_LIMIT,
+            tolerance: float = BULKHEAD_LATENCY_TOLERANCE,
+            backoff: float = BULKHEAD_BACKOFF,
+    ):
+        self.value = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.baseline: Optional[float] = None
+
+    def update(self, latency: float, success: bool, in_flight: int):
+        """
+        Adjust the limit after a completed call
+
+        Args:
+            latency: Seconds until the upstream response headers arrived
+            success: False for connection errors, timeouts and 5xx responses
+            in_flight: Calls still in flight, the limit only grows while it is used
+        """
+        if self.baseline is None:
+            self.baseline = latency
+
+        if not success or latency > self.baseline * self.tolerance:
+            self.value = max(self.min_limit, self.value * self.backoff)
+        elif in_flight + 1 >= self.value / 2:
+            self.value = min(self.max_limit, self.value + 1 / self.value)
+
+        if success:
+            self.baseline += _BASELINE_ALPHA * (latency - self.baseline)
+
+    @property
+    def current(self) -> int:
+        return int(self.value)
+
+
+class Bulkhead:
+    """
+    Concurrency limit and waiting queue of one upstream service
+
+    Requests over the limit wait in a bounded queue served earliest
+    deadline first; when the queue is full they are shed at once. A slow
+    service therefore only ties up its own slots and queue, never the
+    capacity other services need.
+    """
+
+    def __init__(self, service_name: str, queue_size: int = BULKHEAD_QUEUE_SIZE, **limit_options):
+        self.service_name = service_name
+        self.limit = AdaptiveLimit(**limit_options)
+        self.queue_size = queue_size
+        self.in_flight = 0
+        # (deadline, sequence, future) heap; cancelled waiters are skipped lazily
+        self._queue: List[Tuple[float, int, asyncio.Future]] = []
+        self._waiting = 0
+        self._sequence = itertools.count()
+
+        self.shed = 0
+        self.expired = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    async def acquire(self, deadline: float) -> bool:
+        """
+        Take a slot, waiting in the queue until `deadline` (time.monotonic()) if none is free
+
+        Every successful acquire must be followed by `release`.
+
+        Returns:
+            bool: False if the request was shed (queue full) or its deadline passed while queued
+        """
+        if self.in_flight < self.limit.current and not self._waiting:
+            self.in_flight += 1
+            return True
+
+        if self._waiting >= self.queue_size:
+            self.shed += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (deadline, next(self._sequence), future))
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(future, max(0.0, deadline - time.monotonic()))
+            return True
+        except asyncio.TimeoutError:
+            self.expired += 1
+            return False
+        except BaseException:
+            # The slot may have been handed over just before the caller went away
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if not future.done() or future.cancelled():
+                self._waiting -= 1
+
+    def release(self, latency: Optional[float] = None, success: Optional[bool] = None):
+        """
+        Give back a slot and hand it to the waiter with the earliest deadline
+
+        Args:
+            latency: Seconds the call took, None if it produced no upstream verdict
+            success: Outcome of the call, as for the circuit breaker
+        """
+        self.in_flight -= 1
+        if latency is not None:
+            self.limit.update(latency, success, self.in_flight)
+
+        while self._queue and self.in_flight < self.limit.current:
+            _, _, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self._waiting -= 1
+            self.in_flight += 1
+            future.set_result(True)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit.current,
+            "in_flight": self.in_flight,
+            "queue_depth": self._waiting,
+            "queue_size": self.queue_size,
+            "baseline_latency_ms": round(self.limit.baseline * 1000, 2) if self.limit.baseline is not None else None,
+            "shed": self.shed,
+            "expired": self.expired,
+        }
+
+
+class BulkheadRegistry:
+    """One bulkhead per service, created on first use (None when bulkheads are disabled)"""
+
+    def __init__(self, services: Dict[str, dict], enabled: bool = BULKHEAD_ENABLED):
+        self.services = services
+        self.enabled = enabled
+        self._bulkheads: Dict[str, Bulkhead] = {}
+
+    def get(self, service_name: str) -> Optional[Bulkhead]:
+        if not self.enabled:
+            return None
+        bulkhead = self._bulkheads.get(service_name)
+        if bulkhead is None:
+            bulkhead = Bulkhead(service_name, **self.services[service_name].get("bulkhead", {}))
+            self._bulkheads[service_name] = bulkhead
+        return bulkhead
+
+    def reset(self):
+        self._bulkheads.clear()
+
+    def discard(self, service_name: str):
+        """Forget a service's state, it is recreated from the current config on next use"""
+        self._bulkheads.pop(service_name, None)
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: bulkhead.stats() for name, bulkhead in self._bulkheads.items()}
+
+
+# Bulkheads shared by the proxy and the health/metrics routes
+bulkheads = BulkheadRegistry(SERVICES)
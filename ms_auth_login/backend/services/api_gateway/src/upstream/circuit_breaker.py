@@ -0,0 +1,231 @@
+# File: backend/services/api_gateway/src/upstream/circuit_breaker.py
+import logging
+import math
+import time
+from typing import Dict, List, Optional
+
+from ..config.settings import (
+    SERVICES,
+    CIRCUIT_BREAKER_ENABLED,
+    CIRCUIT_BREAKER_WINDOW,
+    CIRCUIT_BREAKER_MIN_REQUESTS,
+    CIRCUIT_BREAKER_FAILURE_RATE,
+    CIRCUIT_BREAKER_SLOW_CALL_DURATION,
+    CIRCUIT_BREAKER_SLOW_CALL_RATE,
+    CIRCUIT_BREAKER_OPEN_DURATION,
+    CIRCUIT_BREAKER_HALF_OPEN_PROBES,
+)
+
+logger = logging.getLogger("api_gateway")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Consecutive trips without recovering grow the open period up to this factor
+_MAX_BACKOFF = 8
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for one upstream
+
+    Outcomes are counted in one-second buckets over a rolling window. The
+    breaker opens once the window holds enough requests and either the
+    failure rate or the slow-call rate reaches its threshold. While open,
+    calls are rejected immediately. After the open period a limited number
+    of probe calls are let through (half-open): if they all succeed the
+    breaker closes, a single failure reopens it for a longer period.
+    """
+
+    __slots__ = (
+        "name", "window", "min_requests", "failure_rate", "slow_call_duration",
+        "slow_call_rate", "open_duration", "half_open_probes",
+        "state", "opened_at", "open_until", "trips",
+        "_buckets", "_probes_in_flight", "_probe_successes", "_backoff",
+    )
+
+    def __init__(
+            self,
+            name: str,
+            window: int = CIRCUIT_BREAKER_WINDOW,
+            min_requests: int = CIRCUIT_BREAKER_MIN_REQUESTS,
+            failure_rate: float = CIRCUIT_BREAKER_FAILURE_RATE,
+            slow_call_duration: float = CIRCUIT_BREAKER_SLOW_CALL_DURATION,
+            slow_call_rate: float = CIRCUIT_BREAKER_SLOW_CALL_RATE,
+            open_duration: float = CIRCUIT_BREAKER_OPEN_DURATION,
+            half_open_probes: int = CIRCUIT_BREAKER_HALF_OPEN_PROBES,
+    ):
+        self.name = name
+        self.window = max(1, window)
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.open_duration = open_duration
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.open_until = 0.0
+        self.trips = 0
+        # [second, requests, failures, slow calls] per slot, indexed by second % window
+        self._buckets: List[List[int]] = [[-1, 0, 0, 0] for _ in range(self.window)]
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._backoff = 1
+
+    def allow(self, now: float = None) -> bool:
+        """
+        Ask to send a call to the upstream
+
+        Every allowed call must be followed by `record` or `release`.
+
+        Returns:
+            bool: False if the call should be failed fast
+        """
+        now = now if now is not None else time.monotonic()
+
+        if self.state == OPEN:
+            if now < self.open_until:
+                return False
+            self.state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info(f"Circuit breaker for {self.name} half-open, probing")
+
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                return False
+            self._probes_in_flight += 1
+
+        return True
+
+    def record(self, success: bool, duration: float, now: float = None):
+        """
+        Record the outcome of an allowed call
+
+        Args:
+            success: False for connection errors, timeouts and 5xx responses
+            duration: Seconds until the upstream response headers arrived
+        """
+        now = now if now is not None else time.monotonic()
+        slow = duration >= self.slow_call_duration
+
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if not success or slow:
+                self._open(now)
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._close()
+            return
+
+        if self.state == OPEN:
+            # A call that started before the breaker opened
+            return
+
+        second = int(now)
+        bucket = self._buckets[second % self.window]
+        if bucket[0] != second:
+            bucket[:] = [second, 0, 0, 0]
+        bucket[1] += 1
+        bucket[2] += not success
+        bucket[3] += slow
+
+        if not success or slow:
+            requests, failures, slow_calls = self._totals(second)
+            if requests >= self.min_requests and (
+                failures >= requests * self.failure_rate
+                or slow_calls >= requests * self.slow_call_rate
+            ):
+                self._open(now)
+
+    def release(self):
+        """Give back an allowed call that ended without an upstream verdict (e.g. the client went away)"""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def retry_after(self, now: float = None) -> int:
+        """Whole seconds until the breaker lets probe calls through again"""
+        now = now if now is not None else time.monotonic()
+        return max(1, math.ceil(self.open_until - now))
+
+    def _totals(self, second: int):
+        requests = failures = slow_calls = 0
+        oldest = second - self.window
+        for bucket_second, bucket_requests, bucket_failures, bucket_slow in self._buckets:
+            if bucket_second > oldest:
+                requests += bucket_requests
+                failures += bucket_failures
+                slow_calls += bucket_slow
+        return requests, failures, slow_calls
+
+    def _open(self, now: float):
+        if self.state == HALF_OPEN:
+            self._backoff = min(self._backoff * 2, _MAX_BACKOFF)
+        self.state = OPEN
+        self.opened_at = now
+        self.open_until = now + self.open_duration * self._backoff
+        self.trips += 1
+        logger.warning(f"Circuit breaker for {self.name} opened for {self.open_until - now:.0f}s")
+
+    def _close(self):
+        self.state = CLOSED
+        self._backoff = 1
+        for bucket in self._buckets:
+            bucket[:] = [-1, 0, 0, 0]
+        logger.info(f"Circuit breaker for {self.name} closed")
+
+    def stats(self, now: float = None) -> dict:
+        now = now if now is not None else time.monotonic()
+        requests, failures, slow_calls = self._totals(int(now))
+        stats = {
+            "state": self.state,
+            "trips": self.trips,
+            "window_requests": requests,
+            "window_failures": failures,
+            "window_slow_calls": slow_calls,
+        }
+        if self.state == OPEN:
+            stats["retry_after"] = self.retry_after(now)
+        return stats
+
+
+class CircuitBreakerRegistry:
+    """One circuit breaker per upstream, created on first use"""
+
+    def __init__(self, services: Dict[str, dict], enabled: bool = CIRCUIT_BREAKER_ENABLED):
+        self.services = services
+        self.enabled = enabled
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> Optional[CircuitBreaker]:
+        """
+        Get the breaker for an upstream
+
+        Returns:
+            CircuitBreaker: The breaker, or None when circuit breaking is disabled
+        """
+        if not self.enabled:
+            return None
+
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            overrides = self.services.get(name, {}).get("circuit_breaker", {})
+            breaker = self._breakers[name] = CircuitBreaker(name, **overrides)
+        return breaker
+
+    def reset(self):
+        self._breakers.clear()
+
+    def discard(self, service_name: str):
+        """Forget a service's state, it is recreated from the current config on next use"""
+        self._breakers.pop(service_name, None)
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: breaker.stats() for name, breaker in self._breakers.items()}
+
+
+circuit_breakers = CircuitBreakerRegistry(SERVICES)
@@ -0,0 +1,197 @@
+# File: backend/services/api_gateway/src/upstream/clients.py
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from ..config.settings import (
+    SERVICES,
+    UPSTREAM_MAX_CONNECTIONS,
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+    UPSTREAM_KEEPALIVE_EXPIRY,
+    UPSTREAM_CONNECT_TIMEOUT,
+    UPSTREAM_POOL_TIMEOUT,
+    UPSTREAM_DEFAULT_TIMEOUT,
+    UPSTREAM_HTTP2,
+    DNS_CACHE_ENABLED,
+)
+from .resolver import CachingNetworkBackend, DNSCache, upstream_resolver
+
+logger = logging.getLogger("api_gateway")
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (pip install httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class UnknownReplica(LookupError):
+    """Raised for a service or replica that is not (or no longer) configured"""
+
+
+def service_replicas(config: dict) -> List[dict]:
+    """
+    Normalize a service's replicas
+
+    Args:
+        config: A SERVICES entry with "urls" (strings or {"url", "weight"} dicts) or a single "url"
+
+    Returns:
+        list: {"url": ..., "weight": ...} per replica
+    """
+    replicas = []
+    for replica in config.get("urls") or [config["url"]]:
+        if isinstance(replica, str):
+            replica = {"url": replica}
+        replicas.append({"url": replica["url"].rstrip("/"), "weight": float(replica.get("weight", 1.0))})
+    return replicas
+
+
+class UpstreamClientRegistry:
+    """
+    One long-lived, pooled httpx.AsyncClient per upstream replica
+
+    Clients are created at application startup and closed on shutdown so
+    that connections to each replica are kept alive and reused across
+    proxied requests.
+    """
+
+    def __init__(self, services: Dict[str, dict], transport: Optional[httpx.AsyncBaseTransport] = None,
+                 resolver: Optional[DNSCache] = None):
+        self.services = services
+        # Custom transport (e.g. httpx.MockTransport) used instead of the network, mainly for tests
+        self.transport = transport
+        # Host names of new connections are resolved through this cache (None: system resolver)
+        self.resolver = resolver
+        self._clients: Dict[Tuple[str, str], httpx.AsyncClient] = {}
+
+    def _create_client(self, service_name: str, url: str) -> httpx.AsyncClient:
+        config = self.services[service_name]
+
+        limits = httpx.Limits(
+            max_connections=config.get("max_connections", UPSTREAM_MAX_CONNECTIONS),
+            max_keepalive_connections=config.get("max_keepalive_connections", UPSTREAM_MAX_KEEPALIVE_CONNECTIONS),
+            keepalive_expiry=config.get("keepalive_expiry", UPSTREAM_KEEPALIVE_EXPIRY),
+        )
+        timeout = httpx.Timeout(
+            config.get("timeout", UPSTREAM_DEFAULT_TIMEOUT),
+            connect=UPSTREAM_CONNECT_TIMEOUT,
+            pool=UPSTREAM_POOL_TIMEOUT,
+        )
+
+        http2 = config.get("http2", UPSTREAM_HTTP2)
+        if http2 and not _http2_available():
+            logger.warning(f"HTTP/2 requested for {service_name} but 'h2' is not installed, using HTTP/1.1")
+            http2 = False
+
+        if self.transport is not None:
+            transport = self.transport
+        else:
+            transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+            if self.resolver is not None:
+                # httpx has no public hook for name resolution, it goes into httpcore's pool
+                transport._pool._network_backend = CachingNetworkBackend(self.resolver)
+
+        client = httpx.AsyncClient(
+            base_url=url,
+            timeout=timeout,
+            transport=transport,
+        )
+        # Forward only what the client sent, not httpx's Accept-Encoding, User-Agent, ...
+        client.headers.clear()
+        return client
+
+    async def startup(self):
+        """Create a client for every replica of every configured service"""
+        for service_name, config in self.services.items():
+            for replica in service_replicas(config):
+                key = (service_name, replica["url"])
+                if key not in self._clients:
+                    self._clients[key] = self._create_client(service_name, replica["url"])
+        logger.info(f"Upstream clients ready for: {', '.join(url for _, url in self._clients)}")
+
+    async def shutdown(self):
+        """Close all clients and their pooled connections"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def discard(self, service_name: str, url: Optional[str] = None) -> List[httpx.AsyncClient]:
+        """
+        Stop handing out the clients of a service (or of one of its replicas)
+
+        The clients are returned, not closed: requests still using them must
+        be allowed to finish first.
+        """
+        keys = [key for key in self._clients if key[0] == service_name and url in (None, key[1])]
+        return [self._clients.pop(key) for key in keys]
+
+    def get(self, service_name: str, url: Optional[str] = None) -> httpx.AsyncClient:
+        """
+        Get the pooled client for a service replica, creating it lazily if startup was skipped
+
+        Args:
+            service_name: Name of the service in SERVICES
+            url: Replica base URL (default: the service's first replica)
+
+        Raises:
+            UnknownReplica: The service or replica is not configured (any more); the
+                client of a retired replica is never recreated, nothing would close it
+        """
+        config = self.services.get(service_name)
+        if config is None:
+            raise UnknownReplica(f"Unknown service {service_name}")
+        if url is None:
+            url = service_replicas(config)[0]["url"]
+
+        key = (service_name, url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            if all(replica["url"] != url for replica in service_replicas(config)):
+                raise UnknownReplica(f"{url} is not a replica of {service_name}")
+            client = self._create_client(service_name, url)
+            self._clients[key] = client
+        return client
+
+    def pool_stats(self, client: httpx.AsyncClient) -> dict:
+        """In-use / idle / waiting connection counts and limits of one client's pool"""
+        # httpx does not expose pool internals publicly, read them from httpcore
+        pool = getattr(client._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        requests = list(getattr(pool, "_requests", []))
+
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "in_use": len(connections) - idle,
+            "idle": idle,
+            "waiting": sum(1 for request in requests if request.is_queued()),
+            "max_connections": getattr(pool, "_max_connections", None),
+            "max_keepalive_connections": getattr(pool, "_max_keepalive_connections", None),
+        }
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Connection pool statistics per service, summed over its replicas
+
+        Returns:
+            dict: service -> in_use / idle / waiting connection counts and pool limits
+        """
+        result = {}
+        for (service_name, _), client in self._clients.items():
+            stats = self.pool_stats(client)
+            total = result.get(service_name)
+            if total is None:
+                result[service_name] = stats
+                continue
+            for name, value in stats.items():
+                if value is not None:
+                    total[name] = (total[name] or 0) + value
+        return result
+
+
+# Registry shared by the proxy and the lifespan handler in main.py
+upstream_clients = UpstreamClientRegistry(SERVICES, resolver=upstream_resolver if DNS_CACHE_ENABLED else None)
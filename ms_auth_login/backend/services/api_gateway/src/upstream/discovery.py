@@ -0,0 +1,288 @@
+# File: backend/services/api_gateway/src/upstream/discovery.py
+import asyncio
+import copy
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from .balancer import LoadBalancer, upstream_balancers
+from .bulkhead import bulkheads
+from .circuit_breaker import circuit_breakers
+from .clients import service_replicas, upstream_clients
+from .prober import upstream_prober
+from .retry import retry_policies
+from ..config.settings import (
+    SERVICES,
+    SERVICE_DISCOVERY_FILE,
+    SERVICE_DISCOVERY_INTERVAL,
+    SERVICE_DISCOVERY_DRAIN_TIMEOUT,
+)
+from ..utils.route_table import RouteTable, compile_routes
+
+logger = logging.getLogger("api_gateway")
+
+try:
+    import yaml
+except ImportError:  # Optional: pip install pyyaml
+    yaml = None
+
+# Keys naming a service's replicas; changing only these keeps its breaker, bulkhead and retry state
+_REPLICA_KEYS = ("url", "urls")
+
+
+class DiscoveryError(Exception):
+    """Raised for a discovery file that cannot be applied, the current tables are kept"""
+
+
+def _options(config: dict) -> dict:
+    return {name: value for name, value in config.items() if name not in _REPLICA_KEYS}
+
+
+def parse_discovery_file(path: str, text: str) -> Dict[str, Optional[dict]]:
+    """
+    Service overrides from the text of a discovery file
+
+    Returns:
+        dict: service name -> SERVICES keys to override, or None to remove the service
+
+    Raises:
+        DiscoveryError: Malformed file
+    """
+    try:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise DiscoveryError("YAML discovery files need PyYAML (pip install pyyaml)")
+            document = yaml.safe_load(text)
+        else:
+            document = json.loads(text)
+    except (ValueError, getattr(yaml, "YAMLError", ValueError)) as exc:
+        raise DiscoveryError(f"Cannot parse {path}: {exc}")
+
+    services = document.get("services") if isinstance(document, dict) else None
+    if not isinstance(services, dict):
+        raise DiscoveryError(f'{path} must contain {{"services": {{name: {{...}}}}}}')
+    for name, config in services.items():
+        if config is not None and not isinstance(config, dict):
+            raise DiscoveryError(f"Service {name} must be an object or null")
+    return services
+
+
+class ServiceDiscovery:
+    """
+    Hot reload of the service topology from SERVICE_DISCOVERY_FILE
+
+    The file is polled (its modification time, size and inode) so writers
+    may rewrite it in place or atomically rename a new version over it. A
+    change is parsed and validated completely first (replicas, routes,
+    balancer options); only then is it swapped into SERVICES, the compiled
+    route table and the upstream registries, in one synchronous step with
+    no await in between, so every request sees either the old topology or
+    the new one. A file that cannot be applied is logged and ignored.
+
+    Requests already routed keep the route, service config and client they
+    resolved. Services whose options changed get fresh circuit breakers,
+    bulkheads and retry policies; replica-only changes keep them, and the
+    balancer keeps the load and health state of the replicas that remain.
+    Clients of removed replicas are closed after `drain_timeout` seconds.
+    """
+
+    def __init__(
+            self,
+            services: Dict[str, dict],
+            routes: RouteTable,
+            path: str = SERVICE_DISCOVERY_FILE,
+            interval: float = SERVICE_DISCOVERY_INTERVAL,
+            drain_timeout: float = SERVICE_DISCOVERY_DRAIN_TIMEOUT,
+    ):
+        self.services = services
+        self.routes = routes
+        self.path = path
+        self.interval = interval
+        self.drain_timeout = drain_timeout
+        # The environment configuration the file's entries are applied to
+        self.base = copy.deepcopy(services)
+
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_reload: Optional[float] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._drains: Set[asyncio.Task] = set()
+
+    def merge(self, overrides: Dict[str, Optional[dict]]) -> Dict[str, dict]:
+        """The base configuration with the file's entries applied"""
+        services = copy.deepcopy(self.base)
+        for name, config in overrides.items():
+            if config is None:
+                services.pop(name, None)
+            else:
+                services[name] = {**services.get(name, {}), **copy.deepcopy(config)}
+        return services
+
+    @staticmethod
+    def validate(services: Dict[str, dict]) -> RouteTable:
+        """
+        Check a candidate configuration and compile its routes
+
+        Raises:
+            DiscoveryError: Something a request would only trip over later
+        """
+        for name, config in services.items():
+            try:
+                replicas = service_replicas(config)
+                LoadBalancer(name, replicas, **config.get("balancer", {}))
+            except (KeyError, TypeError, ValueError) as exc:
+                raise DiscoveryError(f"Service {name}: invalid replicas or balancer options ({exc!r})")
+            for replica in replicas:
+                if not replica["url"].startswith(("http://", "https://")):
+                    raise DiscoveryError(f"Service {name}: replica URL {replica['url']} is not http(s)")
+        try:
+            return compile_routes(services)
+        except (KeyError, TypeError, ValueError, AttributeError) as exc:
+            raise DiscoveryError(f"Invalid routes: {exc!r}")
+
+    def apply(self, overrides: Dict[str, Optional[dict]]) -> List[httpx.AsyncClient]:
+        """
+        Swap a new topology in
+
+        Returns:
+            list: Clients of removed replicas, to be closed once in-flight requests are done
+
+        Raises:
+            DiscoveryError: The overrides cannot be applied, nothing was changed
+        """
+        services = self.merge(overrides)
+        routes = self.validate(services)
+
+        # From here on nothing awaits: requests see the old tables or the new ones, never a mix
+        retired: List[httpx.AsyncClient] = []
+        changed = []
+        for name in set(self.services) | set(services):
+            old, new = self.services.get(name), services.get(name)
+            if old == new:
+                # Unchanged services keep their config object
+                services[name] = old
+                continue
+            changed.append(name)
+            upstream_prober.discard(name)
+
+            if old is None or new is None or _options(old) != _options(new):
+                retired.extend(upstream_clients.discard(name))
+                circuit_breakers.discard(name)
+                bulkheads.discard(name)
+                retry_policies.discard(name)
+            else:
+                kept = {replica["url"] for replica in service_replicas(new)}
+                for replica in service_replicas(old):
+                    if replica["url"] not in kept:
+                        retired.extend(upstream_clients.discard(name, replica["url"]))
+            if new is None or old is None or old.get("balancer") != new.get("balancer"):
+                upstream_balancers.discard(name)
+
+        self.services.clear()
+        self.services.update(services)
+        self.routes.replace(routes)
+        for name in changed:
+            if name in services:
+                upstream_balancers.update(name)
+
+        if changed:
+            logger.info(f"Service discovery updated: {', '.join(sorted(changed))}")
+        return retired
+
+    async def reload(self) -> bool:
+        """
+        Read the discovery file and apply it
+
+        Returns:
+            bool: Whether the file was applied
+        """
+        try:
+            with open(self.path) as file:
+                overrides = parse_discovery_file(self.path, file.read())
+            retired = self.apply(overrides)
+        except (OSError, DiscoveryError) as exc:
+            self.failures += 1
+            self.last_error = str(exc)
+            logger.error(f"Service discovery file {self.path} not applied, keeping the current services: {exc}")
+            return False
+
+        self.reloads += 1
+        self.last_error = None
+        self.last_reload = time.time()
+        if retired:
+            task = asyncio.create_task(self._close_later(retired))
+            self._drains.add(task)
+            task.add_done_callback(self._drains.discard)
+        return True
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    async def check(self):
+        """Reload the file if it changed since it was last read"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return
+        # Recorded even if the reload fails: a broken file is reported once, not on every poll
+        self._signature = signature
+        await self.reload()
+
+    async def startup(self):
+        """Apply the file before the first request and start watching it (nothing to do without a file)"""
+        if not self.path or self._task is not None:
+            return
+        if self._stat() is None:
+            logger.warning(f"Service discovery file {self.path} not found, using the configured services")
+        await self.check()
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._watch_loop())
+
+    async def shutdown(self):
+        """Stop watching, and close the clients of removed replicas now"""
+        tasks = [task for task in (self._task, *self._drains) if task is not None]
+        self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _watch_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as exc:
+                logger.error(f"Service discovery check failed: {exc!r}")
+
+    async def _close_later(self, clients: List[httpx.AsyncClient]):
+        try:
+            await asyncio.sleep(self.drain_timeout)
+        finally:
+            for client in clients:
+                await client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "file": self.path or None,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_reload": self.last_reload,
+            "pending_drains": len(self._drains),
+        }
+
+
+# Routes compiled from SERVICES, shared by the gateway pipeline and replaced on reload
+service_routes = compile_routes(SERVICES)
+
+# Watcher started by the lifespan handler in main.py
+service_discovery = ServiceDiscovery(SERVICES, service_routes)
@@ -0,0 +1,248 @@
+# File: backend/services/api_gateway/src/upstream/prober.py
+import asyncio
+import logging
+import os
+import random
+import resource
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .balancer import LoadBalancerRegistry, upstream_balancers
+from .clients import UnknownReplica, UpstreamClientRegistry, service_replicas, upstream_clients
+from ..config.settings import (
+    SERVICES,
+    UPSTREAM_HEALTH_CHECK_INTERVAL,
+    UPSTREAM_HEALTH_CHECK_JITTER,
+    UPSTREAM_HEALTH_CHECK_TIMEOUT,
+    UPSTREAM_HEALTH_CHECK_PATH,
+    UPSTREAM_HEALTH_CHECK_WINDOW,
+)
+
+logger = logging.getLogger("api_gateway")
+
+# How often the event loop's scheduling delay is sampled
+_LOOP_LAG_INTERVAL = 0.5
+
+
+class ProbeHistory:
+    """Rolling results of the last probes of one replica"""
+
+    __slots__ = ("url", "results", "last_checked", "last_status", "last_error")
+
+    def __init__(self, url: str, window: int):
+        self.url = url
+        # (healthy, latency in seconds) per probe, newest last
+        self.results: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self.last_checked: Optional[float] = None
+        self.last_status: Optional[int] = None
+        self.last_error: Optional[str] = None
+
+    def record(self, healthy: bool, latency: float, status_code: Optional[int], error: Optional[str]):
+        self.results.append((healthy, latency))
+        self.last_checked = time.time()
+        self.last_status = status_code
+        self.last_error = error
+
+    @property
+    def healthy(self) -> Optional[bool]:
+        return self.results[-1][0] if self.results else None
+
+    def stats(self) -> dict:
+        if not self.results:
+            return {"url": self.url, "probed": False}
+
+        latencies = sorted(latency for _, latency in self.results)
+        return {
+            "url": self.url,
+            "probed": True,
+            "healthy": self.results[-1][0],
+            "availability": round(sum(ok for ok, _ in self.results) / len(self.results), 4),
+            "latency_ms": {
+                "avg": round(sum(latencies) / len(latencies) * 1000, 2),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2),
+            },
+            "last_checked": self.last_checked,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+        }
+
+
+class ProcessMonitor:
+    """Resident memory, CPU usage and event-loop lag of the gateway process"""
+
+    def __init__(self):
+        self.loop_lag = 0.0
+        self.max_loop_lag = 0.0
+        self.cpu_percent = 0.0
+        self._cpu_sample = (time.monotonic(), self._cpu_time())
+
+    @staticmethod
+    def _cpu_time() -> float:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+
+    @staticmethod
+    def rss_bytes() -> Optional[int]:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def sample_cpu(self):
+        """Update the CPU usage over the time since the previous sample"""
+        now, cpu = time.monotonic(), self._cpu_time()
+        previous_now, previous_cpu = self._cpu_sample
+        if now > previous_now:
+            self.cpu_percent = round((cpu - previous_cpu) / (now - previous_now) * 100, 1)
+        self._cpu_sample = (now, cpu)
+
+    async def watch_loop_lag(self, interval: float = _LOOP_LAG_INTERVAL):
+        """Measure how late the event loop wakes up from a sleep, forever"""
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.monotonic() - expected)
+            self.loop_lag = lag
+            self.max_loop_lag = max(self.max_loop_lag, lag)
+
+    def stats(self) -> dict:
+        return {
+            "rss_bytes": self.rss_bytes(),
+            "cpu_percent": self.cpu_percent,
+            "loop_lag_ms": round(self.loop_lag * 1000, 2),
+            "max_loop_lag_ms": round(self.max_loop_lag * 1000, 2),
+        }
+
+
+class UpstreamProber:
+    """
+    Background health prober for every upstream replica
+
+    Every replica's health path is probed concurrently, each probe with its
+    own timeout, on a jittered interval so several gateway processes do not
+    probe in lockstep. Results feed the load balancers (active health) and a
+    rolling latency/availability history; the health endpoint only reads
+    the cached results, so it costs the same however often it is called.
+    """
+
+    def __init__(
+            self,
+            services: Dict[str, dict],
+            clients: UpstreamClientRegistry,
+            balancers: LoadBalancerRegistry,
+            interval: float = UPSTREAM_HEALTH_CHECK_INTERVAL,
+            jitter: float = UPSTREAM_HEALTH_CHECK_JITTER,
+            timeout: float = UPSTREAM_HEALTH_CHECK_TIMEOUT,
+            path: str = UPSTREAM_HEALTH_CHECK_PATH,
+            window: int = UPSTREAM_HEALTH_CHECK_WINDOW,
+    ):
+        self.services = services
+        self.clients = clients
+        self.balancers = balancers
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.path = path
+        self.window = window
+        self.process = ProcessMonitor()
+
+        self._history: Dict[str, Dict[str, ProbeHistory]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def history(self, service_name: str) -> Dict[str, ProbeHistory]:
+        histories = self._history.get(service_name)
+        if histories is None:
+            histories = self._history[service_name] = {
+                replica["url"]: ProbeHistory(replica["url"], self.window)
+                for replica in service_replicas(self.services[service_name])
+            }
+        return histories
+
+    async def startup(self):
+        """Start the probe and loop-lag tasks (probing is skipped when the interval is 0)"""
+        if self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self.process.watch_loop_lag()))
+        if self.interval > 0:
+            self._tasks.append(asyncio.create_task(self._probe_loop()))
+
+    async def shutdown(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def probe_all(self):
+        """Probe every replica of every service concurrently"""
+        await asyncio.gather(*(
+            self._probe(service_name, url)
+            for service_name in self.services
+            for url in self.history(service_name)
+        ))
+        self.process.sample_cpu()
+
+    async def _probe(self, service_name: str, url: str):
+        started = time.perf_counter()
+        status_code, error = None, None
+        try:
+            response = await asyncio.wait_for(
+                self.clients.get(service_name, url).get(self.path, timeout=self.timeout),
+                self.timeout,
+            )
+            status_code = response.status_code
+            healthy = status_code < 500
+        except UnknownReplica:
+            # Retired by service discovery since the probe round started
+            return
+        except Exception as exc:
+            healthy, error = False, type(exc).__name__
+
+        if service_name not in self.services or url not in self.history(service_name):
+            return
+        self.history(service_name)[url].record(healthy, time.perf_counter() - started, status_code, error)
+        self.balancers.get(service_name).mark_health(url, healthy)
+
+    def _next_delay(self) -> float:
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def _probe_loop(self):
+        # Desynchronize from other gateway processes started at the same time
+        await asyncio.sleep(random.uniform(0, min(1.0, self.interval)))
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as exc:
+                logger.error(f"Upstream health probes failed: {exc!r}")
+            await asyncio.sleep(self._next_delay())
+
+    def service_status(self, service_name: str) -> str:
+        """
+        Service status from its latest probes
+
+        Returns:
+            str: "up", "degraded" (some replicas failing), "down" (all failing)
+                 or "unknown" (not probed yet)
+        """
+        results = [history.healthy for history in self.history(service_name).values()]
+        if any(result is None for result in results):
+            return "unknown"
+        if all(results):
+            return "up"
+        return "degraded" if any(results) else "down"
+
+    def stats(self, service_name: str) -> List[dict]:
+        return [history.stats() for history in self.history(service_name).values()]
+
+    def reset(self):
+        self._history.clear()
+
+    def discard(self, service_name: str):
+        """Forget a service's probe history, it is rebuilt from its current replicas"""
+        self._history.pop(service_name, None)
+
+
+# Prober shared by the health routes and the lifespan handler in main.py
+upstream_prober = UpstreamProber(SERVICES, upstream_clients, upstream_balancers)
@@ -0,0 +1,213 @@
+# File: backend/services/api_gateway/src/upstream/resolver.py
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpcore
+
+from ..config.settings import (
+    DNS_CACHE_TTL,
+    DNS_CACHE_REFRESH_INTERVAL,
+    DNS_CACHE_STALE_TTL,
+)
+from ..utils.single_flight import SingleFlight
+
+logger = logging.getLogger("api_gateway")
+
+
+async def system_resolve(host: str) -> List[str]:
+    """Addresses of a host from the system resolver, in its preference order"""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class _Entry:
+    __slots__ = ("addresses", "resolved_at", "used_at")
+
+    def __init__(self, addresses: List[str], now: float):
+        self.addresses = addresses
+        self.resolved_at = now
+        self.used_at = now
+
+
+class DNSCache:
+    """
+    Cache of upstream host name resolutions
+
+    Connections to a host resolved less than `ttl` seconds ago reuse its
+    addresses instead of calling the system resolver. The background task
+    re-resolves every cached host each `refresh_interval`, so requests only
+    wait for the resolver the first time a host is seen. When a lookup fails
+    the previous addresses are kept for up to `stale_ttl` seconds, a DNS
+    outage then does not take the upstreams down with it. Concurrent
+    lookups of one host share a single resolver call.
+    """
+
+    def __init__(
+            self,
+            ttl: float = DNS_CACHE_TTL,
+            refresh_interval: float = DNS_CACHE_REFRESH_INTERVAL,
+            stale_ttl: float = DNS_CACHE_STALE_TTL,
+            resolve: Callable[[str], Awaitable[List[str]]] = system_resolve,
+    ):
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.stale_ttl = stale_ttl
+        # Injectable for tests, like the transport of the client registry
+        self.lookup = resolve
+        self._entries: Dict[str, _Entry] = {}
+        self._lookups = SingleFlight()
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.stale = 0
+
+    async def resolve(self, host: str, timeout: Optional[float] = None, now: float = None) -> List[str]:
+        """
+        Addresses to connect to for a host
+
+        Raises:
+            OSError: The host could not be resolved and no stale addresses are left
+            asyncio.TimeoutError: The resolver did not answer within `timeout`
+        """
+        if _is_ip(host):
+            return [host]
+
+        now = now if now is not None else time.monotonic()
+        entry = self._entries.get(host)
+        if entry is not None and now - entry.resolved_at < self.ttl:
+            self.hits += 1
+            entry.used_at = now
+            return entry.addresses
+
+        self.misses += 1
+        try:
+            # Shielded: a caller giving up does not abort the lookup the others share
+            addresses, _ = await asyncio.wait_for(
+                asyncio.shield(self._lookups.do(host, lambda: self._lookup(host))), timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            if entry is None or now - entry.resolved_at >= self.stale_ttl:
+                raise
+            self.stale += 1
+            return entry.addresses
+        entry = self._entries.get(host)
+        if entry is not None:
+            entry.used_at = now
+        return addresses
+
+    async def _lookup(self, host: str) -> List[str]:
+        try:
+            addresses = await self.lookup(host)
+            if not addresses:
+                raise socket.gaierror(f"No addresses for {host}")
+        except OSError:
+            self.failures += 1
+            raise
+
+        entry = self._entries.get(host)
+        if entry is None:
+            self._entries[host] = _Entry(addresses, time.monotonic())
+        else:
+            if addresses != entry.addresses:
+                logger.info(f"Upstream host {host} now resolves to {', '.join(addresses)}")
+            entry.addresses, entry.resolved_at = addresses, time.monotonic()
+        return addresses
+
+    async def refresh(self, now: float = None):
+        """Re-resolve every cached host, dropping hosts unused for longer than stale_ttl"""
+        now = now if now is not None else time.monotonic()
+        for host, entry in list(self._entries.items()):
+            if now - entry.used_at >= self.stale_ttl:
+                del self._entries[host]
+
+        async def refresh_host(host: str):
+            try:
+                await self._lookups.do(host, lambda: self._lookup(host))
+            except Exception as exc:
+                logger.warning(f"Refreshing the addresses of {host} failed, keeping the cached ones: {exc!r}")
+
+        await asyncio.gather(*(refresh_host(host) for host in list(self._entries)))
+
+    async def startup(self):
+        """Start the background refresh (skipped when the interval is 0)"""
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def shutdown(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hosts": {host: entry.addresses for host, entry in self._entries.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+            "stale": self.stale,
+        }
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    httpcore network backend resolving host names through a DNSCache
+
+    Only the TCP connect is changed: TLS still verifies the certificate
+    against the host name (httpcore passes it to start_tls separately),
+    and the addresses of a host are tried in order until one accepts.
+    """
+
+    def __init__(self, resolver: DNSCache, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self.resolver = resolver
+        self.backend = backend if backend is not None else httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None,
+                          local_address: Optional[str] = None, socket_options=None) -> httpcore.AsyncNetworkStream:
+        try:
+            addresses = await self.resolver.resolve(host, timeout)
+        except asyncio.TimeoutError as exc:
+            raise httpcore.ConnectTimeout(f"Resolving {host} timed out") from exc
+        except OSError as exc:
+            raise httpcore.ConnectError(f"Resolving {host} failed: {exc}") from exc
+
+        error = None
+        for address in addresses:
+            try:
+                return await self.backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                error = exc
+        raise error
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None,
+                                  socket_options=None) -> httpcore.AsyncNetworkStream:
+        return await self.backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float):
+        await self.backend.sleep(seconds)
+
+
+# Cache shared by the upstream clients and the lifespan handler in main.py
+upstream_resolver = DNSCache()
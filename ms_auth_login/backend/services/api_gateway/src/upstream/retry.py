@@ -0,0 +1,161 @@
+# File: backend/services/api_gateway/src/upstream/retry.py
+import math
+import random
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from ..config.settings import (
+    SERVICES,
+    RETRY_BACKOFF,
+    RETRY_BUDGET_RATIO,
+    RETRY_BUDGET_CAPACITY,
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_DELAY,
+    HEDGE_MIN_SAMPLES,
+)
+
+# Recent upstream latencies kept per service for the hedge delay
+_LATENCY_SAMPLES = 512
+# The percentile is recomputed after this many new samples, not on every request
+_PERCENTILE_REFRESH = 32
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of a service's traffic
+
+    Every original request deposits `ratio` tokens, every retry or hedge
+    withdraws a whole one. While a service is failing, retries therefore
+    stop once they exceed `ratio` of the requests (plus the `capacity`
+    saved up while it was healthy), instead of multiplying the load.
+    """
+
+    __slots__ = ("ratio", "capacity", "tokens", "spent", "exhausted")
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, capacity: float = RETRY_BUDGET_CAPACITY):
+        self.ratio = ratio
+        self.capacity = capacity
+        # Start full so the first failures after startup can be retried
+        self.tokens = capacity
+        self.spent = 0
+        self.exhausted = 0
+
+    def deposit(self):
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take one token for a retry or hedge, False if the budget is spent"""
+        # Tolerate float error from adding up fractional deposits
+        if self.tokens < 1 - 1e-9:
+            self.exhausted += 1
+            return False
+        self.tokens = max(0.0, self.tokens - 1)
+        self.spent += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "tokens": round(self.tokens, 2),
+            "capacity": self.capacity,
+            "spent": self.spent,
+            "exhausted": self.exhausted,
+        }
+
+
+class LatencyTracker:
+    """Rolling upstream latency samples and their (periodically refreshed) percentile"""
+
+    __slots__ = ("percentile", "min_samples", "samples", "_pending", "_value")
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.samples: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._pending = 0
+        self._value: Optional[float] = None
+
+    def observe(self, duration: float):
+        self.samples.append(duration)
+        self._pending += 1
+        if self._pending >= _PERCENTILE_REFRESH or len(self.samples) == self.min_samples:
+            self._pending = 0
+            ordered = sorted(self.samples)
+            # Nearest-rank percentile
+            self._value = ordered[max(0, math.ceil(len(ordered) * self.percentile) - 1)]
+
+    def value(self) -> Optional[float]:
+        """The percentile, None until `min_samples` were observed"""
+        return self._value if len(self.samples) >= self.min_samples else None
+
+
+class RetryPolicy:
+    """Retry budget, latency and counters of one service"""
+
+    __slots__ = ("service_name", "budget", "latency", "backoff", "min_hedge_delay", "retries", "hedges", "hedge_wins")
+
+    def __init__(
+            self,
+            service_name: str,
+            budget_ratio: float = RETRY_BUDGET_RATIO,
+            budget_capacity: float = RETRY_BUDGET_CAPACITY,
+            backoff: float = RETRY_BACKOFF,
+            hedge_percentile: float = HEDGE_PERCENTILE,
+            min_hedge_delay: float = HEDGE_MIN_DELAY,
+            hedge_min_samples: int = HEDGE_MIN_SAMPLES,
+    ):
+        self.service_name = service_name
+        self.budget = RetryBudget(budget_ratio, budget_capacity)
+        self.latency = LatencyTracker(hedge_percentile, hedge_min_samples)
+        self.backoff = backoff
+        self.min_hedge_delay = min_hedge_delay
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def backoff_delay(self, retry: int) -> float:
+        """Full-jitter exponential backoff before the given retry (1-based)"""
+        return random.uniform(0, self.backoff * (2 ** (retry - 1)))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, None while there is too little latency data"""
+        value = self.latency.value()
+        return None if value is None else max(self.min_hedge_delay, value)
+
+    def stats(self) -> dict:
+        hedge_delay = self.hedge_delay()
+        return {
+            "budget": self.budget.stats(),
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_ms": round(hedge_delay * 1000, 2) if hedge_delay is not None else None,
+        }
+
+
+class RetryPolicyRegistry:
+    """One retry policy per service, created on first use"""
+
+    def __init__(self, services: Dict[str, dict]):
+        self.services = services
+        self._policies: Dict[str, RetryPolicy] = {}
+
+    def get(self, service_name: str) -> RetryPolicy:
+        policy = self._policies.get(service_name)
+        if policy is None:
+            policy = RetryPolicy(service_name, **self.services[service_name].get("retry_policy", {}))
+            self._policies[service_name] = policy
+        return policy
+
+    def reset(self):
+        self._policies.clear()
+
+    def discard(self, service_name: str):
+        """Forget a service's state, it is recreated from the current config on next use"""
+        self._policies.pop(service_name, None)
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: policy.stats() for name, policy in self._policies.items()}
+
+
+# Policies shared by the proxy and the health/metrics routes
+retry_policies = RetryPolicyRegistry(SERVICES)
@@ -1,16 +1,76 @@
+import base64
+import binascii
+import json
+import re
+from typing import Optional
+
 import jwt
 from fastapi import HTTPException, status
 import logging
 
-from ..config.settings import JWT_SECRET_KEY, JWT_ALGORITHM
+from ..config.settings import (
+    JWT_SECRET_KEY,
+    JWT_ALGORITHM,
+    JWT_ALLOWED_ALGORITHMS,
+    TOKEN_CACHE_ENABLED,
+    TOKEN_MAX_LENGTH,
+)
+from .log_throttle import ThrottledLogger
+from .token_cache import TokenCache, RejectedTokenCache
 
 logger = logging.getLogger("api_gateway")
+throttled_logger = ThrottledLogger(logger)
+
+# Verified payloads and recently rejected digests, shared by all requests of this process
+token_cache = TokenCache()
+rejected_tokens = RejectedTokenCache()
+
+# header.payload.signature, each a non-empty base64url segment
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+")
+
+
+def _invalid_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid authentication credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def prevalidate_token(token: str) -> Optional[str]:
+    """
+    Structural checks that reject malformed tokens before any crypto work
+
+    Returns:
+        str: The rejection reason, or None if the token is worth verifying
+    """
+    if len(token) > TOKEN_MAX_LENGTH:
+        return "too long"
+
+    if not _TOKEN_PATTERN.fullmatch(token):
+        return "malformed"
+
+    header_segment = token.split(".", 1)[0]
+    try:
+        header = json.loads(base64.urlsafe_b64decode(header_segment + "=" * (-len(header_segment) % 4)))
+    except (binascii.Error, ValueError):
+        return "undecodable header"
+
+    if not isinstance(header, dict) or header.get("alg") not in JWT_ALLOWED_ALGORITHMS:
+        return "algorithm not allowed"
+
+    return None
 
 
 async def verify_token(token: str) -> dict:
     """
     Verify and decode a JWT token
 
+    Payloads of previously verified tokens are served from `token_cache`
+    until the token expires; the returned dict must not be modified.
+    Structurally invalid tokens are rejected before signature verification,
+    and rejected tokens are remembered for a short time.
+
     Args:
         token: The JWT token to verify
 
@@ -20,17 +80,48 @@ async def verify_token(token: str) -> dict:
     Raises:
         HTTPException: If token is invalid
     """
+    if len(token) > TOKEN_MAX_LENGTH:
+        throttled_logger.warning("token_rejected:too long", "Token rejected before verification: too long")
+        raise _invalid_token()
+
+    key = TokenCache.digest(token)
+    if TOKEN_CACHE_ENABLED:
+        payload = token_cache.get(key)
+        if payload is not None:
+            return payload
+
+    if key in rejected_tokens:
+        raise _invalid_token()
+
+    reason = prevalidate_token(token)
+    if reason is not None:
+        rejected_tokens.add(key)
+        throttled_logger.warning(f"token_rejected:{reason}", f"Token rejected before verification: {reason}")
+        raise _invalid_token()
+
     try:
         payload = jwt.decode(
             token,
             JWT_SECRET_KEY,
-            algorithms=[JWT_ALGORITHM]
+            algorithms=[JWT_ALGORITHM],
+            # The audience is checked per service by the auth stage
+            options={"verify_aud": False}
         )
-        return payload
     except jwt.PyJWTError as e:
-        logger.error(f"Token verification failed: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        rejected_tokens.add(key)
+        throttled_logger.error(f"token_invalid:{type(e).__name__}", f"Token verification failed: {str(e)}")
+        raise _invalid_token()
+
+    if TOKEN_CACHE_ENABLED:
+        token_cache.put(key, payload)
+    return payload
+
+
+def revoke_cached_tokens(sub: str = None, jti: str = None) -> int:
+    """
+    Purge cached verifications for a revoked user (sub) or token (jti)
+
+    Returns:
+        int: Number of cache entries removed
+    """
+    return token_cache.purge(sub=sub, jti=jti)
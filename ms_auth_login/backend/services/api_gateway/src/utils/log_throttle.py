@@ -0,0 +1,38 @@
+import logging
+import time
+from typing import Dict, Tuple
+
+
+class ThrottledLogger:
+    """
+    Rate-limited, aggregating wrapper around a logger
+
+    At most one record per message key is written every `interval` seconds;
+    occurrences in between are counted and reported with the next record,
+    so an error storm costs a dict lookup per event instead of a log write.
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 10.0):
+        self.logger = logger
+        self.interval = interval
+        # key -> (time of last emitted record, occurrences suppressed since)
+        self._state: Dict[str, Tuple[float, int]] = {}
+
+    def log(self, level: int, key: str, message: str):
+        now = time.monotonic()
+        last, suppressed = self._state.get(key, (0.0, 0))
+
+        if last and now - last < self.interval:
+            self._state[key] = (last, suppressed + 1)
+            return
+
+        if suppressed:
+            message = f"{message} ({suppressed} similar suppressed in the last {now - last:.0f}s)"
+        self._state[key] = (now, 0)
+        self.logger.log(level, message)
+
+    def warning(self, key: str, message: str):
+        self.log(logging.WARNING, key, message)
+
+    def error(self, key: str, message: str):
+        self.log(logging.ERROR, key, message)
@@ -0,0 +1,228 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from ..config.settings import RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_ENTRY_BYTES
+
+# Rough per-entry bookkeeping cost (key, entry object, dict/index slots)
+_ENTRY_OVERHEAD = 300
+
+# (service, path, query, subject) - subject is "" for public routes
+PrimaryKey = Tuple[str, str, str, str]
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    Parse a Cache-Control header into lower-cased directives
+
+    Returns:
+        dict: directive -> argument (None for directives without one)
+    """
+    directives = {}
+    if not value:
+        return directives
+
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('" ') or None
+    return directives
+
+
+def _seconds(value: Optional[str]) -> Optional[int]:
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class CachedResponse:
+    """A stored upstream response and its freshness information"""
+
+    __slots__ = (
+        "primary", "key", "status_code", "headers", "body", "etag", "last_modified",
+        "stored_at", "age", "fresh_until", "always_revalidate", "size",
+    )
+
+    def __init__(
+            self,
+            status_code: int,
+            headers: List[Tuple[bytes, bytes]],
+            body: bytes,
+            etag: Optional[str],
+            last_modified: Optional[str],
+            age: float,
+            ttl: float,
+            always_revalidate: bool,
+            now: float,
+    ):
+        self.primary: Optional[PrimaryKey] = None
+        self.key = None
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = now
+        # Age the response already had when it was received (upstream Age header)
+        self.age = age
+        self.fresh_until = now + ttl
+        self.always_revalidate = always_revalidate
+        self.size = len(body) + sum(len(name) + len(value) for name, value in headers) + _ENTRY_OVERHEAD
+
+    def is_fresh(self, now: float) -> bool:
+        return not self.always_revalidate and now < self.fresh_until
+
+    def can_revalidate(self) -> bool:
+        return self.etag is not None or self.last_modified is not None
+
+    def current_age(self, now: float) -> int:
+        return int(self.age + now - self.stored_at)
+
+    def refresh(self, headers: List[Tuple[bytes, bytes]], ttl: float, always_revalidate: bool, now: float):
+        """Apply a 304 Not Modified: new validators/headers and a new freshness lifetime"""
+        updated = {name for name, _ in headers}
+        self.headers = [(name, value) for name, value in self.headers if name not in updated] + headers
+        for name, value in headers:
+            if name == b"etag":
+                self.etag = value.decode("latin-1")
+            elif name == b"last-modified":
+                self.last_modified = value.decode("latin-1")
+        self.stored_at = now
+        self.age = 0
+        self.fresh_until = now + ttl
+        self.always_revalidate = always_revalidate
+
+
+class ResponseCache:
+    """
+    Byte-bounded LRU store of upstream responses
+
+    Entries are found in two steps: the primary key (service, path, query,
+    subject) gives the request header names the response varies on (its
+    `Vary` header), and the primary key plus those header values is the
+    entry key. Entries are kept past their freshness lifetime so they can
+    be revalidated; the least recently used ones are evicted once the byte
+    budget is exceeded.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES, max_entry_bytes: int = RESPONSE_CACHE_MAX_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._vary: Dict[PrimaryKey, Tuple[str, ...]] = {}
+        self._variants: Dict[PrimaryKey, Set[tuple]] = {}
+        # (service, path) -> primary keys, to invalidate every user's copy after a write
+        self._by_path: Dict[Tuple[str, str], Set[PrimaryKey]] = {}
+        self.current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, primary: PrimaryKey, headers) -> Optional[CachedResponse]:
+        """Find the stored variant matching the request headers (fresh or not)"""
+        vary = self._vary.get(primary)
+        if vary is None:
+            return None
+
+        entry = self._entries.get((primary, tuple(headers.get(name, "") for name in vary)))
+        if entry is not None:
+            self._entries.move_to_end(entry.key)
+        return entry
+
+    def store(self, primary: PrimaryKey, vary: Tuple[str, ...], headers, entry: CachedResponse) -> bool:
+        """
+        Store a response for the request headers it varies on
+
+        Returns:
+            bool: False if the response is too large to cache
+        """
+        if entry.size > self.max_entry_bytes or entry.size > self.max_bytes:
+            return False
+
+        if self._vary.get(primary, vary) != vary:
+            # The upstream changed what the resource varies on, older variants are unreachable
+            self._remove_primary(primary)
+
+        entry.primary = primary
+        entry.key = (primary, tuple(headers.get(name, "") for name in vary))
+        old = self._entries.pop(entry.key, None)
+        if old is not None:
+            self.current_bytes -= old.size
+
+        self._entries[entry.key] = entry
+        self._vary[primary] = vary
+        self._variants.setdefault(primary, set()).add(entry.key)
+        self._by_path.setdefault(primary[:2], set()).add(primary)
+        self.current_bytes += entry.size
+        self.stores += 1
+
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._forget(evicted)
+            self.evictions += 1
+        return True
+
+    def invalidate(self, service_name: str, path: str):
+        """Drop every stored variant of a resource, for all users"""
+        for primary in list(self._by_path.get((service_name, path), ())):
+            self._remove_primary(primary)
+            self.invalidations += 1
+
+    def _remove_primary(self, primary: PrimaryKey):
+        for key in list(self._variants.get(primary, ())):
+            self._forget(self._entries.pop(key))
+
+    def _forget(self, entry: CachedResponse):
+        self.current_bytes -= entry.size
+        variants = self._variants[entry.primary]
+        variants.discard(entry.key)
+        if variants:
+            return
+
+        del self._variants[entry.primary]
+        del self._vary[entry.primary]
+        paths = self._by_path[entry.primary[:2]]
+        paths.discard(entry.primary)
+        if not paths:
+            del self._by_path[entry.primary[:2]]
+
+    def clear(self):
+        self._entries.clear()
+        self._vary.clear()
+        self._variants.clear()
+        self._by_path.clear()
+        self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def freshness(directives: Dict[str, Optional[str]], expires_in: Optional[float]) -> float:
+    """Freshness lifetime in seconds: s-maxage, then max-age, then Expires, else 0"""
+    for name in ("s-maxage", "max-age"):
+        seconds = _seconds(directives.get(name))
+        if seconds is not None:
+            return float(seconds)
+    if expires_in is not None:
+        return max(0.0, expires_in)
+    return 0.0
@@ -0,0 +1,214 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+from ..config.settings import UPSTREAM_DEFAULT_TIMEOUT
+
+
+class Route:
+    """
+    A compiled service route and its metadata
+
+    Attributes:
+        service_name: Service the route belongs to
+        pattern: Route pattern relative to the service ("/" for the service default)
+        public: Whether the route can be called without a token
+        rate_limit: Rate-limit class name (see RATE_LIMIT_CLASSES)
+        cost: Quota units a request uses, a number or {method: number} (1 for other methods)
+        timeout: Upstream timeout in seconds
+        cacheable: Whether GET responses may be cached by the gateway
+        coalesce: Whether identical concurrent GETs may share one upstream call
+        retry: Whether idempotent requests may be retried and hedged
+        websocket: Whether WebSocket upgrades are relayed to the service
+        stream: Whether responses are relayed as they arrive (SSE, chunked) even
+            when PROXY_STREAMING is off; the timeout then bounds the wait for
+            the response and for each chunk, not the whole stream
+    """
+
+    __slots__ = (
+        "service_name", "pattern", "public", "rate_limit", "cost", "timeout", "cacheable", "coalesce", "retry",
+        "websocket", "stream",
+    )
+
+    def __init__(
+            self,
+            service_name: str,
+            pattern: str,
+            public: bool = False,
+            rate_limit: str = "default",
+            cost: Union[int, Dict[str, int]] = 1,
+            timeout: float = UPSTREAM_DEFAULT_TIMEOUT,
+            cacheable: bool = False,
+            coalesce: bool = False,
+            retry: bool = True,
+            websocket: bool = False,
+            stream: bool = False,
+    ):
+        self.service_name = service_name
+        self.pattern = pattern
+        self.public = public
+        self.rate_limit = rate_limit
+        self.cost = cost
+        self.timeout = timeout
+        self.cacheable = cacheable
+        self.coalesce = coalesce
+        self.retry = retry
+        self.websocket = websocket
+        self.stream = stream
+
+    def cost_of(self, method: str) -> int:
+        """Quota units a request with this method uses"""
+        if isinstance(self.cost, dict):
+            return self.cost.get(method, 1)
+        return self.cost
+
+    def __repr__(self):
+        return f"Route({self.service_name}:{self.pattern})"
+
+
+class _Node:
+    __slots__ = ("children", "param", "param_name", "exact", "prefix")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None
+        self.param_name: Optional[str] = None
+        # Route ending exactly at this node, and route covering everything below it
+        self.exact: Optional[Route] = None
+        self.prefix: Optional[Route] = None
+
+
+def _segments(path: str) -> List[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+class RouteTable:
+    """
+    Segment-aware route trie per service
+
+    Patterns are matched segment by segment, so "/token" does not match
+    "/tokenfoo". Supported patterns:
+        "/token"              exact path
+        "/documents/{id}"     parameterized segment (captured as params["id"])
+        "/admin/*"            prefix, "/admin" and everything below it
+
+    Literal segments take precedence over parameters: a parameter branch is
+    only tried when the literal branch leads to no route, so "/users/me" and
+    "/users/{id}/roles" both match what they should. Within a branch the
+    most specific match wins: exact, then the deepest prefix, then the
+    service default route. Routes sharing a parameter segment must use the
+    same parameter name there.
+    """
+
+    def __init__(self):
+        self._roots: Dict[str, _Node] = {}
+        self._defaults: Dict[str, Route] = {}
+
+    def add_service(self, service_name: str, default: Route):
+        self._roots.setdefault(service_name, _Node())
+        self._defaults[service_name] = default
+
+    def add(self, route: Route):
+        node = self._roots[route.service_name]
+        segments = _segments(route.pattern)
+
+        is_prefix = bool(segments) and segments[-1] == "*"
+        if is_prefix:
+            segments = segments[:-1]
+
+        for segment in segments:
+            if segment.startswith("{") and segment.endswith("}"):
+                name = segment[1:-1]
+                if node.param is None:
+                    node.param = _Node()
+                    node.param_name = name
+                elif node.param_name != name:
+                    raise ValueError(
+                        f"Route {route.service_name}:{route.pattern} names parameter {{{name}}}, "
+                        f"another route names it {{{node.param_name}}}"
+                    )
+                node = node.param
+            else:
+                node = node.children.setdefault(segment, _Node())
+
+        if is_prefix:
+            node.prefix = route
+        else:
+            node.exact = route
+
+    def replace(self, other: "RouteTable"):
+        """Take over the routes of another table in one step (service discovery reloads)"""
+        self._roots, self._defaults = other._roots, other._defaults
+
+    def services(self) -> List[str]:
+        return list(self._roots)
+
+    def match(self, service_name: str, path: str) -> Optional[Tuple[Route, Dict[str, str]]]:
+        """
+        Find the route for a path within a service
+
+        Returns:
+            tuple: (route, path params), or None if the service is unknown
+        """
+        node = self._roots.get(service_name)
+        if node is None:
+            return None
+
+        found = self._walk(node, _segments(path), 0, {})
+        if found is not None:
+            return found
+        return self._defaults[service_name], {}
+
+    def _walk(self, node: _Node, segments: List[str], index: int,
+              params: Dict[str, str]) -> Optional[Tuple[Route, Dict[str, str]]]:
+        """Most specific route at or below `node`, trying the literal child before the parameter child"""
+        if index == len(segments):
+            if node.exact is not None:
+                return node.exact, params
+        else:
+            segment = segments[index]
+            child = node.children.get(segment)
+            if child is not None:
+                found = self._walk(child, segments, index + 1, params)
+                if found is not None:
+                    return found
+            if node.param is not None:
+                found = self._walk(node.param, segments, index + 1, {**params, node.param_name: segment})
+                if found is not None:
+                    return found
+        if node.prefix is not None:
+            return node.prefix, params
+        return None
+
+
+def compile_routes(services: Dict[str, dict]) -> RouteTable:
+    """
+    Compile SERVICES into a RouteTable
+
+    Each service gets a default route built from its settings. Entries of
+    "public_routes" become exact public routes (rate-limited with the
+    service's "public_rate_limit" class), and entries of the optional
+    "routes" list ({"pattern": ..., plus any Route metadata}) override the
+    defaults for matching paths.
+    """
+    table = RouteTable()
+
+    for service_name, config in services.items():
+        defaults = {
+            "timeout": config.get("timeout", UPSTREAM_DEFAULT_TIMEOUT),
+            "rate_limit": config.get("rate_limit", "default"),
+            "cost": config.get("cost", 1),
+            "retry": config.get("retry", True),
+            "websocket": config.get("websocket", False),
+            "stream": config.get("stream", False),
+        }
+        table.add_service(service_name, Route(service_name, "/", **defaults))
+
+        public_rate_limit = config.get("public_rate_limit", defaults["rate_limit"])
+        for pattern in config.get("public_routes", []):
+            table.add(Route(service_name, pattern, public=True, **{**defaults, "rate_limit": public_rate_limit}))
+
+        for options in config.get("routes", []):
+            options = dict(options)
+            pattern = options.pop("pattern")
+            table.add(Route(service_name, pattern, **{**defaults, **options}))
+
+    return table
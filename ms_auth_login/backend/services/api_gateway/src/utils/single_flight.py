@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SharedCallAborted(Exception):
+    """Raised to waiters when the leader's call was cancelled before it finished"""
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls with the same key
+
+    The first caller for a key (the leader) runs the call; callers arriving
+    while it is in flight wait for and share its result instead of running
+    their own. Nothing is cached: once the call finishes the next caller
+    starts a new one.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `call` unless an identical call is already in flight
+
+        Returns:
+            tuple: (result, whether it came from another caller's call)
+
+        Raises:
+            Exception: Whatever the shared call raised (also for waiters)
+            SharedCallAborted: To waiters, when the leader was cancelled
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            self.shared += 1
+            # Shielded so a waiter going away does not cancel the shared call
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.leaders += 1
+        try:
+            result = await call()
+        except BaseException as exc:
+            if isinstance(exc, asyncio.CancelledError):
+                # The leader's client went away; waiters must not look cancelled themselves
+                future.set_exception(SharedCallAborted())
+            else:
+                future.set_exception(exc)
+            # Mark retrieved, waiters (if any) re-raise it themselves
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "saved_calls": self.shared,
+        }
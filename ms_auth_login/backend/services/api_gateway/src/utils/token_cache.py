@@ -0,0 +1,201 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from ..config.settings import (
+    TOKEN_CACHE_MAX_ENTRIES,
+    TOKEN_CACHE_MAX_BYTES,
+    TOKEN_CACHE_MAX_TTL,
+    REJECTED_TOKEN_CACHE_MAX_ENTRIES,
+    REJECTED_TOKEN_CACHE_TTL,
+)
+
+# Rough per-entry bookkeeping cost (digest, entry object, dict/index slots)
+_ENTRY_OVERHEAD = 200
+
+
+class _Entry:
+    __slots__ = ("payload", "expires_at", "size", "sub", "jti")
+
+    def __init__(self, payload: dict, expires_at: float, size: int):
+        self.payload = payload
+        self.expires_at = expires_at
+        self.size = size
+        self.sub = payload.get("sub")
+        self.jti = payload.get("jti")
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified JWT payloads
+
+    Entries are keyed by a SHA-256 digest of the token (the token itself is
+    never stored), expire no later than the token's `exp` claim, and are
+    bounded both by count and by an approximate memory budget. Cached
+    payloads are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = TOKEN_CACHE_MAX_ENTRIES,
+            max_bytes: int = TOKEN_CACHE_MAX_BYTES,
+            max_ttl: float = TOKEN_CACHE_MAX_TTL,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+
+        self._entries: "OrderedDict[bytes, _Entry]" = OrderedDict()
+        self._by_sub: Dict[str, Set[bytes]] = {}
+        self._by_jti: Dict[str, Set[bytes]] = {}
+        self.current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes, now: Optional[float] = None) -> Optional[dict]:
+        """Get the cached payload for a token digest, None on miss or expiry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= (now if now is not None else time.time()):
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.payload
+
+    def put(self, key: bytes, payload: dict, now: Optional[float] = None):
+        """Cache a verified payload until min(exp, now + max_ttl)"""
+        now = now if now is not None else time.time()
+        expires_at = now + self.max_ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        if expires_at <= now:
+            return
+
+        size = len(key) + len(repr(payload)) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        entry = _Entry(payload, expires_at, size)
+        self._entries[key] = entry
+        self.current_bytes += size
+        if entry.sub is not None:
+            self._by_sub.setdefault(str(entry.sub), set()).add(key)
+        if entry.jti is not None:
+            self._by_jti.setdefault(str(entry.jti), set()).add(key)
+
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def purge(self, sub: Optional[str] = None, jti: Optional[str] = None) -> int:
+        """
+        Drop cached payloads for a revoked subject and/or token id
+
+        Returns:
+            int: Number of entries removed
+        """
+        keys: Set[bytes] = set()
+        if sub is not None:
+            keys |= self._by_sub.get(str(sub), set())
+        if jti is not None:
+            keys |= self._by_jti.get(str(jti), set())
+
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_sub.clear()
+        self._by_jti.clear()
+        self.current_bytes = 0
+
+    def _remove(self, key: bytes):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        self.current_bytes -= entry.size
+        for index, value in ((self._by_sub, entry.sub), (self._by_jti, entry.jti)):
+            if value is None:
+                continue
+            keys = index.get(str(value))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[str(value)]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RejectedTokenCache:
+    """
+    Short-TTL set of recently rejected token digests
+
+    Lets the gateway turn away a replayed bad token with one hash lookup
+    instead of re-running validation. Bounded by count, oldest first out.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = REJECTED_TOKEN_CACHE_MAX_ENTRIES,
+            ttl: float = REJECTED_TOKEN_CACHE_TTL,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+        self.hits = 0
+
+    def __contains__(self, key: bytes) -> bool:
+        expires_at = self._entries.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False
+        self.hits += 1
+        return True
+
+    def add(self, key: bytes):
+        self._entries.pop(key, None)
+        self._entries[key] = time.monotonic() + self.ttl
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits}
@@ -2,12 +2,14 @@
 import json
 import hashlib
 import hmac
+import logging
 from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from sqlalchemy.orm import Session
 from uuid import UUID
 import httpx
+from auth_utils import deadline_remaining
 
 from ..schemas import WebhookCreate, WebhookResponse
 from ..db.session import get_db
@@ -15,6 +17,10 @@ from ..db.models import Webhook, User
 from .dependencies import get_current_admin
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+logger = logging.getLogger("auth_service")
+
+# Seconds a webhook receiver gets to answer
+WEBHOOK_TIMEOUT = 5.0
 
 
 @router.post("", response_model=WebhookResponse)
@@ -124,7 +130,7 @@ async def trigger_webhook(
         payload["data"] = data
 
     # Function to send webhook
-    async def send_webhook(webhook: Webhook, payload: dict):
+    async def send_webhook(webhook: Webhook, payload: dict, timeout: float = WEBHOOK_TIMEOUT):
         try:
             # Prepare payload
             json_payload = json.dumps(payload)
@@ -146,7 +152,7 @@ async def trigger_webhook(
                         "X-Webhook-Signature": signature,
                         "X-Webhook-Event": event_type
                     },
-                    timeout=5.0
+                    timeout=timeout
                 )
 
             # Update webhook stats
@@ -157,7 +163,7 @@ async def trigger_webhook(
             return response.status_code
 
         except Exception as e:
-            print(f"Error sending webhook to {webhook.url}: {str(e)}")
+            logger.warning(f"Error sending webhook to {webhook.url}: {str(e)}")
             return None
 
     # If background tasks provided, use them
@@ -165,6 +171,11 @@ async def trigger_webhook(
         for webhook in webhooks:
             background_tasks.add_task(send_webhook, webhook, payload)
     else:
-        # Otherwise, send synchronously (less recommended)
+        # Otherwise, send synchronously (less recommended); the caller waits
+        # for these, so they stop with its deadline
         for webhook in webhooks:
-            await send_webhook(webhook, payload)
\ No newline at end of file
+            left = deadline_remaining()
+            if left is not None and left <= 0:
+                logger.warning(f"Deadline exceeded, skipped webhook to {webhook.url}")
+                continue
+            await send_webhook(webhook, payload, WEBHOOK_TIMEOUT if left is None else min(WEBHOOK_TIMEOUT, left))
\ No newline at end of file
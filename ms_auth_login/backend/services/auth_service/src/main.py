@@ -1,6 +1,7 @@
 # File: backend/services/auth_service/src/main.py
 from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from auth_utils import DeadlineMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 import logging
 from sqlalchemy import event
@@ -43,6 +44,10 @@ app.add_middleware(
     max_age=3600,  # 1 hour
 )
 
+# Deadline forwarded by the API gateway; added last so it is the outermost
+# middleware and the deadline is read before anything else runs
+app.add_middleware(DeadlineMiddleware)
+
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
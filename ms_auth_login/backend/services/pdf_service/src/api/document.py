@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID, uuid4
 
-from auth_utils import get_current_user, CurrentUser, validate_ownership
+from auth_utils import get_gateway_user, CurrentUser, validate_ownership
 from ..db.session import get_db
 from ..db.models import Document, DocumentAudit
 from ..schemas import DocumentCreate, DocumentUpdate, Document as DocumentSchema, DocumentAudit as DocumentAuditSchema
@@ -19,7 +19,7 @@ router = APIRouter(
 async def create_document(
         document: DocumentCreate,
         db: Session = Depends(get_db),
-        current_user: CurrentUser = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_gateway_user)
 ):
     # Create document with current user ID from JWT
     db_document = Document(
@@ -51,7 +51,7 @@ async def read_documents(
         skip: int = 0,
         limit: int = 100,
         db: Session = Depends(get_db),
-        current_user: CurrentUser = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_gateway_user)
 ):
     # Only return documents owned by the current user unless admin
     if "admin" in current_user.roles:
@@ -68,7 +68,7 @@ async def read_documents(
 async def read_document(
         document_id: UUID,
         db: Session = Depends(get_db),
-        current_user: CurrentUser = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_gateway_user)
 ):
     document = db.query(Document).filter(Document.id == document_id).first()
 
@@ -96,7 +96,7 @@ async def update_document(
         document_id: UUID,
         document_update: DocumentUpdate,
         db: Session = Depends(get_db),
-        current_user: CurrentUser = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_gateway_user)
 ):
     db_document = db.query(Document).filter(Document.id == document_id).first()
 
@@ -131,7 +131,7 @@ async def update_document(
 async def delete_document(
         document_id: UUID,
         db: Session = Depends(get_db),
-        current_user: CurrentUser = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_gateway_user)
 ):
     document = db.query(Document).filter(Document.id == document_id).first()
 
@@ -161,7 +161,7 @@ async def delete_document(
 async def get_document_audit_trail(
         document_id: UUID,
         db: Session = Depends(get_db),
-        current_user: CurrentUser = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_gateway_user)
 ):
     document = db.query(Document).filter(Document.id == document_id).first()
 
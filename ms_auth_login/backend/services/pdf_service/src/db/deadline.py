@@ -0,0 +1,39 @@
+# File: backend/services/pdf_service/src/db/deadline.py
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from auth_utils import check_deadline, deadline_remaining
+
+
+def stop_after_deadline(conn, cursor, statement, parameters, context, executemany):
+    """Run no further statements once the caller's deadline has passed"""
+    check_deadline()
+
+
+def apply_statement_timeout(session, transaction, connection):
+    """
+    Let Postgres cancel a statement still running when the caller's deadline passes
+
+    SET LOCAL only lasts until the end of the transaction, so it is issued
+    again at the start of every transaction, including those after a commit.
+    """
+    left = deadline_remaining()
+    if left is not None and connection.dialect.name == "postgresql":
+        connection.execute(text(f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}"))
+
+
+def session_factory(engine: Engine) -> sessionmaker:
+    """
+    Create the session factory for an engine, bounded by the caller's deadline
+
+    Args:
+        engine: The engine sessions are bound to
+
+    Returns:
+        sessionmaker: Factory whose sessions stop at the deadline
+    """
+    event.listen(engine, "before_cursor_execute", stop_after_deadline)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    event.listen(factory, "after_begin", apply_statement_timeout)
+    return factory
@@ -2,7 +2,8 @@
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+
+from .deadline import session_factory
 
 # Get database connection parameters from environment variables
 # with defaults for development only
@@ -18,11 +19,12 @@ DATABASE_URL = f"postgresql://{user}:{password}@{host}/{database}"
 engine = create_engine(DATABASE_URL)
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = session_factory(engine)
 
 # Create base class for models
 Base = declarative_base()
 
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
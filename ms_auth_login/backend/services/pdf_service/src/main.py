@@ -1,6 +1,7 @@
 # File: backend/services/pdf_service/src/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from auth_utils import DeadlineMiddleware
 import logging
 
 from .api import document_router, admin_router
@@ -32,6 +33,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Deadline forwarded by the API gateway; added last so it is the outermost
+# middleware and the deadline is read before anything else runs
+app.add_middleware(DeadlineMiddleware)
+
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
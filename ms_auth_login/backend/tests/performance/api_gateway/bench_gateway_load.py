@@ -0,0 +1,290 @@
+"""
+Load test of the full gateway stack against stub upstreams
+
+Drives the gateway app (CORS, rate limit, auth, proxy and everything in
+between) through httpx.ASGITransport with an asyncio load generator, while
+in-process stubs stand in for the auth and pdf services with a configurable
+latency and payload size. Each scenario reports throughput, latency
+percentiles and memory per request; results are written as JSON so runs of
+different commits can be compared (--baseline prints the difference).
+
+Without --rate the generator is closed-loop (`--concurrency` workers send
+back to back). With --rate requests start on a fixed schedule and latency
+is measured from the scheduled start, so a stalled gateway shows up in the
+percentiles instead of silently lowering the offered load.
+
+Run from ms_auth_login/:
+    python -m backend.tests.performance.api_gateway.bench_gateway_load --output before.json
+    python -m backend.tests.performance.api_gateway.bench_gateway_load --baseline before.json
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import itertools
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from backend.services.api_gateway.src.api import router as api_router
+from backend.services.api_gateway.src.middleware.cache import response_cache
+from backend.services.api_gateway.src.middleware.gateway import GatewayMiddleware
+from backend.services.api_gateway.src.upstream import (
+    bulkheads,
+    circuit_breakers,
+    retry_policies,
+    upstream_balancers,
+    upstream_clients,
+)
+from backend.tests.performance.api_gateway.stubs import StubUpstream, make_token, stub_services
+
+# name -> (method, URL for the n-th request, whether a body is sent, authenticated)
+SCENARIOS = {
+    # Authenticated read; the query makes every request distinct, so none is coalesced
+    "pdf_read": ("GET", "/pdf/documents?page={index}", False, True),
+    # Authenticated upload, the request body is streamed through
+    "pdf_upload": ("POST", "/pdf/documents", True, True),
+    # Public login route with its stricter rate-limit class
+    "auth_login": ("POST", "/auth/token", True, False),
+}
+
+# Requests per scenario sent before measuring (token cache, pools, code paths)
+_WARMUP_REQUESTS = 50
+
+
+class SimulatedClients:
+    """ASGI shim giving requests the addresses of `count` simulated clients, round robin"""
+
+    def __init__(self, app, count: int):
+        self.app = app
+        self.count = count
+        self._counter = itertools.count()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            index = next(self._counter) % self.count
+            scope = {**scope, "client": (f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}", 40000)}
+        await self.app(scope, receive, send)
+
+
+def build_app(rate_limit_per_minute: int) -> FastAPI:
+    """The gateway app as assembled in main.py, without the lifespan (no probing)"""
+    app = FastAPI()
+    app.add_middleware(GatewayMiddleware, rate_limit_per_minute=rate_limit_per_minute)
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True,
+                       allow_methods=["*"], allow_headers=["*"])
+    app.include_router(api_router)
+    return app
+
+
+def reset_gateway_state():
+    """Start every scenario with fresh breakers, bulkheads, balancers, budgets and cache"""
+    circuit_breakers.reset()
+    bulkheads.reset()
+    upstream_balancers.reset()
+    retry_policies.reset()
+    response_cache.clear()
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    return ordered[max(0, math.ceil(len(ordered) * fraction) - 1)]
+
+
+class LoadGenerator:
+    """Sends one scenario's requests and records per-request latency and status"""
+
+    def __init__(self, client: httpx.AsyncClient, scenario: str, tokens: List[str], body: bytes):
+        self.client = client
+        self.method, self.url, has_body, authenticated = SCENARIOS[scenario]
+        # Requests rotate through the users' tokens, each user has a quota of its own
+        self.headers = [{"Authorization": f"Bearer {token}"} if authenticated else {} for token in tokens]
+        self.body = body if has_body else None
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+
+    async def send(self, index: int, started: Optional[float] = None):
+        """Send the n-th request, latency counts from `started` (default: now)"""
+        if started is None:
+            started = time.perf_counter()
+        response = await self.client.request(self.method, self.url.format(index=index),
+                                             headers=self.headers[index % len(self.headers)], content=self.body)
+        self.latencies.append(time.perf_counter() - started)
+        self.statuses[response.status_code] += 1
+
+    async def closed_loop(self, requests: int, concurrency: int, first: int = 0):
+        indexes = iter(range(first, first + requests))
+
+        async def worker():
+            for index in indexes:
+                await self.send(index)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def open_loop(self, requests: int, rate: float, concurrency: int, first: int = 0):
+        """Start requests at `rate` per second, at most `concurrency` in flight (later ones wait)"""
+        slots = asyncio.Semaphore(concurrency)
+        begin = time.perf_counter()
+
+        async def scheduled(index: int, at: float):
+            async with slots:
+                await self.send(index, at)
+
+        tasks = []
+        for offset in range(requests):
+            at = begin + offset / rate
+            delay = at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(scheduled(first + offset, at)))
+        await asyncio.gather(*tasks)
+
+
+async def measure_memory(generator: LoadGenerator, requests: int, first: int) -> dict:
+    """
+    Memory per request, from sequential requests
+
+    CPython keeps no cheap count of allocations, so two proxies are used:
+    the average peak of traced memory above its level before each request
+    (what one request needs at once), and the blocks still allocated
+    afterwards (growth that outlives requests, e.g. caches or leaks).
+    """
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    peaks = 0
+    for index in range(first, first + requests):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        await generator.send(index)
+        peaks += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    gc.collect()
+    return {
+        "peak_kib_per_request": round(peaks / requests / 1024, 1),
+        "retained_blocks_per_request": round((sys.getallocatedblocks() - blocks) / requests, 2),
+    }
+
+
+async def run_scenario(app, scenario: str, args, upstreams: Dict[str, StubUpstream]) -> dict:
+    reset_gateway_state()
+    transport = httpx.ASGITransport(app=SimulatedClients(app, args.clients))
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        tokens = [make_token() for _ in range(args.users)]
+        generator = LoadGenerator(client, scenario, tokens, b"x" * args.body_size)
+        await generator.closed_loop(_WARMUP_REQUESTS, min(args.concurrency, _WARMUP_REQUESTS))
+        generator.latencies.clear()
+        generator.statuses.clear()
+        upstream_calls = sum(upstream.requests for upstream in upstreams.values())
+
+        started = time.perf_counter()
+        if args.rate:
+            await generator.open_loop(args.requests, args.rate, args.concurrency, _WARMUP_REQUESTS)
+        else:
+            await generator.closed_loop(args.requests, args.concurrency, _WARMUP_REQUESTS)
+        elapsed = time.perf_counter() - started
+
+        ordered = sorted(generator.latencies)
+        result = {
+            "requests": len(ordered),
+            "elapsed_s": round(elapsed, 3),
+            "rps": round(len(ordered) / elapsed, 1),
+            "latency_ms": {
+                name: round(percentile(ordered, fraction) * 1000, 3)
+                for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+            },
+            "status_codes": {str(code): count for code, count in sorted(generator.statuses.items())},
+            "upstream_requests": sum(upstream.requests for upstream in upstreams.values()) - upstream_calls,
+        }
+        if args.memory_requests:
+            result.update(await measure_memory(generator, args.memory_requests, _WARMUP_REQUESTS + args.requests))
+        return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(name: str, result: dict, baseline: Optional[dict]):
+    latency = result["latency_ms"]
+    line = (f"{name:<12} {result['rps']:>9.0f} req/s  p50 {latency['p50']:>7.2f}  p95 {latency['p95']:>7.2f}  "
+            f"p99 {latency['p99']:>7.2f} ms  {result['status_codes']}")
+    if "peak_kib_per_request" in result:
+        line += f"  {result['peak_kib_per_request']} KiB peak/request"
+    print(line)
+    if baseline is not None:
+        before = baseline["latency_ms"]
+        print(f"{'':<12} vs baseline: req/s {(result['rps'] / baseline['rps'] - 1) * 100:+.1f}%  "
+              f"p50 {(latency['p50'] / before['p50'] - 1) * 100:+.1f}%  "
+              f"p99 {(latency['p99'] / before['p99'] - 1) * 100:+.1f}%")
+
+
+async def main(args):
+    upstreams = {
+        "auth": StubUpstream(args.latency_ms / 1000, args.payload_size),
+        "pdf": StubUpstream(args.latency_ms / 1000, args.payload_size),
+    }
+    upstream_clients.transport = stub_services(upstreams)
+    app = build_app(args.rate_limit)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["scenarios"]
+
+    scenarios = {}
+    try:
+        for name in args.scenarios:
+            scenarios[name] = await run_scenario(app, name, args, upstreams)
+            print_result(name, scenarios[name], baseline.get(name))
+    finally:
+        await upstream_clients.shutdown()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {
+            name: getattr(args, name) for name in (
+                "requests", "concurrency", "rate", "clients", "users", "rate_limit",
+                "latency_ms", "payload_size", "body_size", "memory_requests",
+            )
+        },
+        "scenarios": scenarios,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=5000, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50, help="workers, or max in flight with --rate")
+    parser.add_argument("--rate", type=float, help="open-loop arrival rate in requests per second")
+    parser.add_argument("--clients", type=int, default=10_000, help="simulated client addresses")
+    parser.add_argument("--users", type=int, default=1000, help="simulated users (tokens), each with its own quota")
+    parser.add_argument("--rate-limit", type=int, default=60, help="requests per minute per client")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="stub upstream latency")
+    parser.add_argument("--payload-size", type=int, default=1024, help="stub upstream response bytes")
+    parser.add_argument("--body-size", type=int, default=4096, help="request body bytes for uploads and logins")
+    parser.add_argument("--memory-requests", type=int, default=200,
+                        help="sequential requests traced for memory per request (0 disables)")
+    parser.add_argument("--output", default="gateway_load.json", help="JSON results file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,123 @@
+"""
+Per-request overhead of the gateway middleware pipeline
+
+Compares the previous chain of three BaseHTTPMiddleware subclasses (each
+re-parsing the path and re-scanning SERVICES) against the single pure-ASGI
+GatewayMiddleware. Upstreams are replaced by an in-process MockTransport so
+only gateway work is measured.
+
+Run from ms_auth_login/:
+    python -m backend.tests.performance.api_gateway.bench_pipeline_overhead
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from backend.services.api_gateway.src.config.settings import SERVICES
+from backend.services.api_gateway.src.middleware.gateway import GatewayMiddleware
+from backend.services.api_gateway.src.upstream import upstream_clients
+from backend.services.api_gateway.src.utils.jwt import verify_token
+from backend.tests.performance.api_gateway.stubs import make_token, stub_transport
+
+
+class LegacyRateLimit(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.clients = {}
+
+    async def dispatch(self, request, call_next):
+        path_parts = request.url.path.strip("/").split("/")
+        if path_parts and path_parts[0] == "auth":
+            service_path = "/" + "/".join(path_parts[1:])
+            any(service_path.startswith(route) for route in SERVICES["auth"]["public_routes"])
+        # Same per-client timestamp list bookkeeping as RateLimiter
+        now = time.time()
+        timestamps = self.clients.setdefault(request.client.host, [])
+        self.clients[request.client.host] = [ts for ts in timestamps if now - ts < 60] + [now]
+        return await call_next(request)
+
+
+class LegacyAuth(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        path_parts = request.url.path.strip("/").split("/")
+        service_name = path_parts[0]
+        if service_name not in SERVICES:
+            return Response("Service not found", status_code=404)
+        service_path = "/" + "/".join(path_parts[1:])
+        if not any(service_path.startswith(route) for route in SERVICES[service_name]["public_routes"]):
+            await verify_token(request.headers["Authorization"].split(" ")[1])
+        return await call_next(request)
+
+
+class LegacyProxy(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        path_parts = request.url.path.strip("/").split("/")
+        service_name = path_parts[0]
+        if service_name not in SERVICES:
+            return await call_next(request)
+        body = await request.body()
+        headers = dict(request.headers)
+        headers.pop("host", None)
+        response = await upstream_clients.get(service_name).request(
+            request.method, "/" + "/".join(path_parts[1:]), content=body, headers=headers
+        )
+        return Response(response.content, status_code=response.status_code, headers=dict(response.headers))
+
+
+def build_legacy_app() -> FastAPI:
+    app = FastAPI()
+    # Same order of execution as a correctly ordered legacy chain: rate limit -> auth -> proxy
+    app.add_middleware(LegacyProxy)
+    app.add_middleware(LegacyAuth)
+    app.add_middleware(LegacyRateLimit)
+    return app
+
+
+def build_pipeline_app() -> FastAPI:
+    app = FastAPI()
+    # The legacy stack has no per-user quotas either
+    app.add_middleware(GatewayMiddleware, rate_limit_per_minute=10 ** 9, quota_tiers={})
+    return app
+
+
+async def drive(app, requests: int, concurrency: int) -> float:
+    """Send `requests` GETs with `concurrency` workers, return elapsed seconds"""
+    token = make_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    remaining = iter(range(requests))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gateway") as client:
+        async def worker():
+            for _ in remaining:
+                response = await client.get("/pdf/documents", headers=headers)
+                assert response.status_code == 200, response.text
+
+        # Warm up
+        await client.get("/pdf/documents", headers=headers)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+
+async def main(requests: int, concurrency: int):
+    upstream_clients.transport = stub_transport()
+
+    for name, app in (("BaseHTTPMiddleware chain", build_legacy_app()), ("ASGI pipeline", build_pipeline_app())):
+        elapsed = await drive(app, requests, concurrency)
+        print(f"{name:<26} {requests / elapsed:>9.0f} req/s  {elapsed / requests * 1e6:>8.1f} us/request")
+
+    await upstream_clients.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
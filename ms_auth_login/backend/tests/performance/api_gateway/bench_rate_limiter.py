@@ -0,0 +1,79 @@
+"""
+Rate limiter cost with millions of distinct client keys
+
+Measures time per check and the number of tracked keys for the GCRA
+InMemoryRateLimiter, next to the previous per-IP timestamp-list approach.
+Keys arrive spread over simulated time, so idle keys become evictable.
+
+Run from ms_auth_login/:
+    python -m backend.tests.performance.api_gateway.bench_rate_limiter --keys 2000000
+"""
+import argparse
+import time
+import tracemalloc
+
+from backend.services.api_gateway.src.ratelimit import InMemoryRateLimiter
+
+
+def legacy_check(clients: dict, key: str, limit: int, now: float) -> bool:
+    """The timestamp-list algorithm RateLimitMiddleware used before GCRA"""
+    if key not in clients:
+        clients[key] = []
+    clients[key] = [ts for ts in clients[key] if now - ts < 60]
+    if len(clients[key]) >= limit:
+        return False
+    clients[key].append(now)
+    return True
+
+
+def run(name: str, check, keys: int, requests_per_second: float, measure_memory: bool):
+    if measure_memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    for index in range(keys):
+        check(f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}:{index}", index / requests_per_second)
+    elapsed = time.perf_counter() - started
+
+    peak = None
+    if measure_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    line = f"{name:<16} {keys:>9} keys  {elapsed / keys * 1e9:>7.0f} ns/check"
+    if peak is not None:
+        line += f"  peak {peak / 2 ** 20:>7.1f} MiB"
+    print(line)
+
+
+def hot_key(name: str, check, checks: int):
+    """One busy client sending 1000 requests per second (limit high enough to allow them)"""
+    started = time.perf_counter()
+    for index in range(checks):
+        check(index / 1000)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<16} {checks:>9} checks {elapsed / checks * 1e9:>6.0f} ns/check")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keys", type=int, default=2_000_000)
+    parser.add_argument("--rps", type=float, default=10_000.0, help="simulated arrival rate of new keys")
+    parser.add_argument("--memory", action="store_true", help="trace peak allocations (slower)")
+    args = parser.parse_args()
+
+    limiter = InMemoryRateLimiter()
+    run("gcra", lambda key, now: limiter.acquire(key, 60, 60, now=now), args.keys, args.rps, args.memory)
+    print(f"{'':<16} tracked keys at end: {len(limiter)}, evicted: {limiter.evictions}")
+
+    clients = {}
+    run("timestamp lists", lambda key, now: legacy_check(clients, key, 60, now), args.keys, args.rps, args.memory)
+    print(f"{'':<16} tracked keys at end: {len(clients)}")
+
+    hot_limiter, hot_clients = InMemoryRateLimiter(), {}
+    hot_key("gcra hot key", lambda now: hot_limiter.acquire("hot", 100_000, 60, now=now), 200_000)
+    hot_key("lists hot key", lambda now: legacy_check(hot_clients, "hot", 100_000, now), 5_000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""In-process upstream stubs and token helpers shared by the gateway benchmarks"""
+import asyncio
+import datetime
+import uuid
+from typing import Dict
+from urllib.parse import urlsplit
+
+import httpx
+import jwt
+
+from backend.services.api_gateway.src.config.settings import JWT_SECRET_KEY, JWT_ALGORITHM, SERVICES
+from backend.services.api_gateway.src.upstream import service_replicas
+
+
+class StubStream(httpx.AsyncByteStream):
+    """Response body that is only produced while streamed, like a network body"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
+
+
+def stub_transport(payload: bytes = b'{"ok": true}') -> httpx.MockTransport:
+    """MockTransport answering every request with 200 and `payload`"""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        return httpx.Response(
+            200,
+            headers={"content-type": "application/json", "content-length": str(len(payload))},
+            stream=StubStream(payload),
+        )
+
+    return httpx.MockTransport(handler)
+
+
+class StubUpstream:
+    """
+    Stub service answering every request with 200 and `payload_size` bytes of JSON after `latency` seconds
+
+    Counts the requests it served, so benchmarks can check that the
+    gateway really reached the upstream instead of a cache.
+    """
+
+    def __init__(self, latency: float = 0.0, payload_size: int = 64):
+        self.latency = latency
+        # {"data": "xxx..."} padded to the requested size
+        self.payload = b'{"data":"' + b"x" * max(0, payload_size - 11) + b'"}'
+        self.requests = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return httpx.Response(
+            200,
+            headers={"content-type": "application/json", "content-length": str(len(self.payload))},
+            stream=StubStream(self.payload),
+        )
+
+
+def stub_services(upstreams: Dict[str, StubUpstream]) -> httpx.MockTransport:
+    """MockTransport dispatching to the stub of the service a replica URL belongs to (404 for the others)"""
+    by_host = {
+        urlsplit(replica["url"]).netloc: upstreams[service_name]
+        for service_name in upstreams
+        for replica in service_replicas(SERVICES[service_name])
+    }
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        upstream = by_host.get(request.url.netloc.decode("ascii"))
+        if upstream is None:
+            return httpx.Response(404)
+        return await upstream.handle(request)
+
+    return httpx.MockTransport(handler)
+
+
+def make_token(**claims) -> str:
+    """Sign an access token accepted by every service route"""
+    now = datetime.datetime.utcnow()
+    payload = {
+        "sub": str(uuid.uuid4()),
+        "roles": ["user"],
+        "aud": ["pdf-service", "flashcard-service", "chat-service"],
+        "exp": (now + datetime.timedelta(minutes=15)).timestamp(),
+        "iat": now.timestamp(),
+        "jti": str(uuid.uuid4()),
+    }
+    payload.update(claims)
+    return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
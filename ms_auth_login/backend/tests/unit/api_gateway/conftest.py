@@ -0,0 +1,108 @@
+import datetime
+import uuid
+
+import httpx
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.services.api_gateway.src.config.settings import JWT_SECRET_KEY, JWT_ALGORITHM
+from backend.services.api_gateway.src.middleware.cache import response_cache
+from backend.services.api_gateway.src.upstream import (
+    bulkheads,
+    circuit_breakers,
+    retry_policies,
+    upstream_balancers,
+    upstream_clients,
+    upstream_prober,
+)
+from backend.services.api_gateway.src.utils.jwt import token_cache, rejected_tokens
+
+
+def make_token(**claims) -> str:
+    """Sign a gateway access token, claims override the defaults"""
+    now = datetime.datetime.utcnow()
+    payload = {
+        "sub": str(uuid.uuid4()),
+        "email": "test@example.com",
+        "roles": ["user"],
+        "permissions": ["read:own"],
+        "aud": ["pdf-service", "flashcard-service", "chat-service"],
+        "exp": (now + datetime.timedelta(minutes=15)).timestamp(),
+        "iat": now.timestamp(),
+        "jti": str(uuid.uuid4()),
+    }
+    payload.update(claims)
+    return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+
+class NetworkStream(httpx.AsyncByteStream):
+    """Body that is only read while streamed, like a response coming off the network"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
+
+
+@pytest.fixture
+def upstream():
+    """
+    Route gateway upstream traffic to an in-process handler
+
+    Tests set `upstream.handler` to a function taking an httpx.Request and
+    returning an httpx.Response; every request seen is kept in `upstream.requests`.
+    """
+    class Upstream:
+        requests = []
+
+        @staticmethod
+        def handler(request):
+            return httpx.Response(200, json={"path": request.url.path})
+
+    async def dispatch(request):
+        await request.aread()
+        Upstream.requests.append(request)
+        response = Upstream.handler(request)
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=NetworkStream(response.content),
+        )
+
+    upstream_clients.transport = httpx.MockTransport(dispatch)
+    upstream_clients._clients.clear()
+    yield Upstream
+    upstream_clients.transport = None
+    upstream_clients._clients.clear()
+
+
+@pytest.fixture
+def gateway_client(upstream):
+    from backend.services.api_gateway.src.main import app
+    # Rebuild the middleware stack so pipeline state (rate limits, caches) starts fresh
+    app.middleware_stack = None
+    token_cache.clear()
+    rejected_tokens.clear()
+    circuit_breakers.reset()
+    bulkheads.reset()
+    upstream_balancers.reset()
+    retry_policies.reset()
+    response_cache.clear()
+    upstream_prober.reset()
+    # Probes would show up as upstream requests, tests run them explicitly
+    interval, upstream_prober.interval = upstream_prober.interval, 0
+    with TestClient(app) as client:
+        yield client
+    upstream_prober.interval = interval
+
+
+@pytest.fixture
+def token_factory():
+    return make_token
+
+
+@pytest.fixture
+def access_token():
+    return make_token()
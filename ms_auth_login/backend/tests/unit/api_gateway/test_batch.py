@@ -0,0 +1,137 @@
+import json
+
+import httpx
+
+from backend.services.api_gateway.src.utils.jwt import token_cache
+
+
+def results(response) -> dict:
+    """Batch results by item id"""
+    return {result["id"]: result for result in map(json.loads, response.text.splitlines())}
+
+
+class TestBatch:
+    def test_items_are_dispatched_and_streamed_back(self, gateway_client, upstream, access_token):
+        response = gateway_client.post("/batch", headers={"Authorization": f"Bearer {access_token}"}, json={
+            "requests": [
+                {"id": "me", "path": "/auth/users/me"},
+                {"id": "list", "path": "/pdf/documents?page=2"},
+                {"id": "create", "method": "POST", "path": "/pdf/documents", "body": {"title": "x"}},
+            ]
+        })
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        by_id = results(response)
+        assert by_id["me"]["status"] == 200
+        assert by_id["me"]["body"] == {"path": "/users/me"}
+        assert by_id["list"]["body"] == {"path": "/documents"}
+        assert by_id["create"]["status"] == 200
+
+        sent = {(request.method, request.url.path): request for request in upstream.requests}
+        assert sent["GET", "/documents"].url.query == b"page=2"
+        assert [request.content for request in upstream.requests if request.method == "POST"] == [b'{"title": "x"}']
+        assert all(request.headers["accept-encoding"] == "identity" for request in upstream.requests)
+
+    def test_token_is_verified_once(self, gateway_client, upstream, access_token):
+        token_cache.clear()
+        misses = token_cache.misses
+
+        gateway_client.post("/batch", headers={"Authorization": f"Bearer {access_token}"}, json={
+            "requests": [{"id": index, "path": f"/pdf/documents/{index}"} for index in range(5)]
+        })
+
+        assert token_cache.misses - misses == 1
+        assert token_cache.hits == 0
+
+    def test_items_cannot_bring_their_own_credentials(self, gateway_client, upstream, access_token, token_factory):
+        other = token_factory()
+
+        gateway_client.post("/batch", headers={"Authorization": f"Bearer {access_token}"}, json={
+            "requests": [{"id": "docs", "path": "/pdf/documents",
+                          "headers": {"Authorization": f"Bearer {other}", "Cookie": "session=other"}}]
+        })
+
+        (sent,) = upstream.requests
+        assert sent.headers["authorization"] == f"Bearer {access_token}"
+        assert "cookie" not in sent.headers
+
+    def test_items_are_authorized_one_by_one(self, gateway_client, upstream, token_factory):
+        token = token_factory(aud=["pdf-service"])
+
+        response = gateway_client.post("/batch", headers={"Authorization": f"Bearer {token}"}, json={
+            "requests": [
+                {"id": "pdf", "path": "/pdf/documents"},
+                {"id": "chat", "path": "/chat/conversations"},
+                {"id": "nowhere", "path": "/unknown/path"},
+            ]
+        })
+
+        by_id = results(response)
+        assert by_id["pdf"]["status"] == 200
+        assert by_id["chat"]["status"] == 403
+        assert by_id["nowhere"]["status"] == 404
+        assert [request.url.path for request in upstream.requests] == ["/documents"]
+
+    def test_missing_token_only_fails_protected_items(self, gateway_client, upstream):
+        response = gateway_client.post("/batch", json={
+            "requests": [
+                {"id": "login", "method": "POST", "path": "/auth/token"},
+                {"id": "docs", "path": "/pdf/documents"},
+            ]
+        })
+
+        by_id = results(response)
+        assert by_id["login"]["status"] == 200
+        assert by_id["docs"]["status"] == 401
+
+    def test_items_are_charged_to_their_rate_limit_class(self, gateway_client, upstream):
+        # The "auth" class allows 5 requests per minute, a batch of 6 exceeds it at once
+        response = gateway_client.post("/batch", json={
+            "requests": [{"id": index, "method": "POST", "path": "/auth/token"} for index in range(6)]
+        })
+
+        assert {result["status"] for result in results(response).values()} == {429}
+        assert upstream.requests == []
+
+        response = gateway_client.post("/batch", json={
+            "requests": [{"id": index, "method": "POST", "path": "/auth/token"} for index in range(5)]
+        })
+        assert {result["status"] for result in results(response).values()} == {200}
+
+    def test_oversized_item_response_is_left_out(self, gateway_client, upstream, access_token):
+        stage = gateway_client.app.middleware_stack
+        while not hasattr(stage, "batch"):
+            stage = stage.app
+        stage.batch.max_response_bytes = 10
+        upstream.handler = lambda request: httpx.Response(200, content=b"x" * 100)
+
+        response = gateway_client.post("/batch", headers={"Authorization": f"Bearer {access_token}"}, json={
+            "requests": [{"id": "big", "path": "/pdf/documents"}]
+        })
+
+        result = results(response)["big"]
+        assert result["status"] == 200
+        assert result["body"] is None
+        assert "too large" in result["error"]
+
+    def test_binary_body_is_base64(self, gateway_client, upstream, access_token):
+        upstream.handler = lambda request: httpx.Response(
+            200, content=b"\xff\x00", headers={"content-type": "application/octet-stream"}
+        )
+
+        response = gateway_client.post("/batch", headers={"Authorization": f"Bearer {access_token}"}, json={
+            "requests": [{"id": "file", "path": "/pdf/documents/1/content"}]
+        })
+
+        result = results(response)["file"]
+        assert (result["body"], result["body_encoding"]) == ("/wA=", "base64")
+
+    def test_malformed_envelopes_are_rejected(self, gateway_client, upstream):
+        for body in ({}, {"requests": []}, {"requests": [{"path": "no-slash"}]},
+                     {"requests": [{"path": "/pdf/x", "method": "TRACE"}]},
+                     {"requests": [{"path": "/pdf/x"}] * 21}):
+            response = gateway_client.post("/batch", json=body)
+            assert response.status_code == 400, body
+
+        assert upstream.requests == []
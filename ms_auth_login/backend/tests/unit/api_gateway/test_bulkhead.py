@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+import httpx
+
+from backend.services.api_gateway.src.upstream import (
+    AdaptiveLimit,
+    Bulkhead,
+    bulkheads,
+    upstream_balancers,
+    upstream_clients,
+)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestAdaptiveLimit:
+    def test_grows_additively_while_fast_and_used(self):
+        limit = AdaptiveLimit(initial=10, min_limit=1, max_limit=100, tolerance=2.0, backoff=0.5)
+        for _ in range(10):
+            limit.update(0.01, True, in_flight=9)
+
+        # +1/limit per completion: about one more slot per round of requests
+        assert 10.9 < limit.value < 11
+
+    def test_does_not_grow_while_idle(self):
+        limit = AdaptiveLimit(initial=10, min_limit=1, max_limit=100)
+        for _ in range(100):
+            limit.update(0.01, True, in_flight=0)
+
+        assert limit.current == 10
+
+    def test_failures_and_slow_calls_back_off(self):
+        limit = AdaptiveLimit(initial=20, min_limit=4, max_limit=100, tolerance=2.0, backoff=0.5)
+        limit.update(0.01, True, in_flight=10)
+
+        limit.update(0.01, False, in_flight=10)
+        assert limit.current == 10
+        limit.update(0.5, True, in_flight=10)
+        assert limit.current == 5
+        limit.update(0.01, False, in_flight=10)
+        assert limit.current == 4
+
+
+class TestBulkhead:
+    def test_over_limit_requests_queue_earliest_deadline_first(self):
+        async def scenario():
+            bulkhead = Bulkhead("pdf", queue_size=10, initial=1, min_limit=1)
+            now = time.monotonic()
+            assert await bulkhead.acquire(now + 10)
+
+            order = []
+
+            async def wait(name, deadline):
+                assert await bulkhead.acquire(deadline)
+                order.append(name)
+                bulkhead.release(0.01, True)
+
+            tasks = [asyncio.create_task(wait("late", now + 9)), asyncio.create_task(wait("early", now + 5))]
+            await asyncio.sleep(0)
+            assert bulkhead.queue_depth == 2
+
+            bulkhead.release(0.01, True)
+            await asyncio.gather(*tasks)
+            return order, bulkhead.stats()
+
+        order, stats = run(scenario())
+
+        assert order == ["early", "late"]
+        assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
+
+    def test_full_queue_sheds(self):
+        async def scenario():
+            bulkhead = Bulkhead("pdf", queue_size=1, initial=1, min_limit=1)
+            deadline = time.monotonic() + 10
+            await bulkhead.acquire(deadline)
+            waiter = asyncio.create_task(bulkhead.acquire(deadline))
+            await asyncio.sleep(0)
+
+            shed = await bulkhead.acquire(deadline)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            return shed, bulkhead.stats()
+
+        shed, stats = run(scenario())
+
+        assert shed is False
+        assert stats["shed"] == 1
+        assert stats["queue_depth"] == 0
+
+    def test_queued_request_gives_up_at_its_deadline(self):
+        async def scenario():
+            bulkhead = Bulkhead("pdf", queue_size=5, initial=1, min_limit=1)
+            await bulkhead.acquire(time.monotonic() + 10)
+            return await bulkhead.acquire(time.monotonic() + 0.01), bulkhead.stats()
+
+        acquired, stats = run(scenario())
+
+        assert acquired is False
+        assert stats["expired"] == 1
+        assert stats["queue_depth"] == 0
+
+
+class TestGatewayBulkhead:
+    def test_shed_requests_get_503(self, gateway_client, upstream, access_token):
+        bulkhead = bulkheads.get("pdf")
+        bulkhead.queue_size = 0
+        bulkhead.in_flight = bulkhead.limit.current
+
+        response = gateway_client.post("/pdf/documents", json={},
+                                       headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert upstream.requests == []
+
+    def test_other_services_are_not_affected(self, gateway_client, upstream, access_token):
+        pdf = bulkheads.get("pdf")
+        pdf.queue_size = 0
+        pdf.in_flight = pdf.limit.current
+
+        response = gateway_client.post("/auth/token")
+
+        assert response.status_code == 200
+
+    def test_slots_are_released_after_each_call(self, gateway_client, upstream, access_token):
+        upstream.handler = lambda request: httpx.Response(500)
+        for _ in range(3):
+            gateway_client.post("/pdf/documents", json={}, headers={"Authorization": f"Bearer {access_token}"})
+
+        stats = bulkheads.get("pdf").stats()
+        assert stats["in_flight"] == 0
+        assert stats["limit"] < 20
+
+    def test_streamed_body_keeps_its_slot_until_relayed(self, gateway_client, upstream, access_token):
+        during = []
+
+        class Body(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                replica = upstream_balancers.get("pdf").stats()[0]
+                during.append((bulkheads.get("pdf").in_flight, replica["outstanding"]))
+                yield b"chunk"
+
+        upstream_clients.transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=Body()))
+        upstream_clients._clients.clear()
+
+        response = gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.content == b"chunk"
+        assert during == [(1, 1)]
+        assert bulkheads.get("pdf").in_flight == 0
+        assert upstream_balancers.get("pdf").stats()[0]["outstanding"] == 0
@@ -0,0 +1,112 @@
+import httpx
+
+from backend.services.api_gateway.src.upstream import CircuitBreaker
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    settings = dict(window=10, min_requests=4, failure_rate=0.5, slow_call_duration=2.0,
+                    slow_call_rate=0.8, open_duration=30.0, half_open_probes=2)
+    settings.update(overrides)
+    return CircuitBreaker("pdf", **settings)
+
+
+class TestCircuitBreaker:
+    def test_opens_when_failure_rate_is_reached(self):
+        breaker = make_breaker()
+        for success in (True, False, True):
+            assert breaker.allow(now=100.0)
+            breaker.record(success, 0.1, now=100.0)
+        assert breaker.state == "closed"
+
+        breaker.allow(now=100.5)
+        breaker.record(False, 0.1, now=100.5)
+
+        assert breaker.state == "open"
+        assert not breaker.allow(now=101.0)
+        assert breaker.retry_after(now=101.0) == 30
+
+    def test_needs_minimum_requests(self):
+        breaker = make_breaker()
+        for _ in range(3):
+            breaker.allow(now=100.0)
+            breaker.record(False, 0.1, now=100.0)
+
+        assert breaker.state == "closed"
+
+    def test_slow_calls_trip_the_breaker(self):
+        breaker = make_breaker()
+        for _ in range(4):
+            breaker.allow(now=100.0)
+            breaker.record(True, 5.0, now=100.0)
+
+        assert breaker.state == "open"
+
+    def test_old_outcomes_leave_the_window(self):
+        breaker = make_breaker()
+        for _ in range(3):
+            breaker.allow(now=100.0)
+            breaker.record(False, 0.1, now=100.0)
+
+        breaker.allow(now=111.0)
+        breaker.record(False, 0.1, now=111.0)
+
+        assert breaker.state == "closed"
+
+    def test_half_open_probes_close_the_breaker(self):
+        breaker = make_breaker()
+        breaker._open(100.0)
+
+        assert breaker.allow(now=130.0)
+        assert breaker.allow(now=130.0)
+        assert not breaker.allow(now=130.0)
+        assert breaker.state == "half_open"
+
+        breaker.record(True, 0.1, now=130.1)
+        breaker.record(True, 0.1, now=130.1)
+
+        assert breaker.state == "closed"
+
+    def test_failed_probe_reopens_for_longer(self):
+        breaker = make_breaker()
+        breaker._open(100.0)
+
+        breaker.allow(now=130.0)
+        breaker.record(False, 0.1, now=130.1)
+
+        assert breaker.state == "open"
+        assert breaker.retry_after(now=130.1) == 60
+
+    def test_released_probe_frees_its_slot(self):
+        breaker = make_breaker(half_open_probes=1)
+        breaker._open(100.0)
+
+        assert breaker.allow(now=130.0)
+        breaker.release()
+
+        assert breaker.allow(now=130.0)
+
+
+class TestCircuitBreakerInProxy:
+    def test_open_breaker_fails_fast(self, gateway_client, upstream, access_token):
+        upstream.handler = lambda request: httpx.Response(503)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        statuses = [gateway_client.get("/pdf/documents", headers=headers).status_code for _ in range(20)]
+        response = gateway_client.get("/pdf/documents", headers=headers)
+
+        assert statuses == [503] * 20
+        assert len(upstream.requests) == 20
+        assert response.status_code == 503
+        assert int(response.headers["retry-after"]) > 0
+
+    def test_breaker_state_is_reported(self, gateway_client, upstream, access_token):
+        upstream.handler = lambda request: httpx.Response(503)
+        for _ in range(20):
+            gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        health = gateway_client.get("/health/detailed").json()
+
+        assert health["status"] == "degraded"
+        assert health["services"]["pdf"]["status"] == "down"
+        assert health["services"]["pdf"]["circuit_breaker"]["state"] == "open"
+        assert health["services"]["chat"]["status"] == "unknown"
@@ -0,0 +1,157 @@
+import asyncio
+import gzip
+import json
+import zlib
+
+import httpx
+import pytest
+
+from backend.services.api_gateway.src.middleware.compression import ResponseCompressor, negotiate_encoding
+
+JSON_BODY = json.dumps([{"id": index, "title": "Document title"} for index in range(200)]).encode()
+
+
+def gzip_only() -> ResponseCompressor:
+    compressor = ResponseCompressor(enabled=True, min_size=1024,
+                                    content_types=["application/json", "text/plain"])
+    compressor.encoders = {"gzip": compressor.encoders["gzip"]}
+    return compressor
+
+
+def run(compressor, messages, accept_encoding="gzip", method="GET"):
+    """Send ASGI response messages through the compressor, return (start message, body chunks)"""
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def replay():
+        wrapped = compressor.wrap(send, {"method": method}, accept_encoding)
+        for message in messages:
+            await wrapped(message)
+
+    asyncio.run(replay())
+    return sent[0], [message.get("body", b"") for message in sent[1:]]
+
+
+def start(content_type="application/json", length=None, extra=()):
+    headers = [(b"content-type", content_type.encode())]
+    if length is not None:
+        headers.append((b"content-length", str(length).encode()))
+    return {"type": "http.response.start", "status": 200, "headers": headers + list(extra)}
+
+
+def body(data, more_body=False):
+    return {"type": "http.response.body", "body": data, "more_body": more_body}
+
+
+def headers_of(message) -> dict:
+    return {name.decode(): value.decode() for name, value in message["headers"]}
+
+
+class TestNegotiation:
+    def test_highest_quality_wins(self):
+        assert negotiate_encoding("gzip;q=0.5, br", {"br": None, "gzip": None}) == "br"
+        assert negotiate_encoding("gzip, br;q=0.1", {"br": None, "gzip": None}) == "gzip"
+
+    def test_server_preference_breaks_ties(self):
+        assert negotiate_encoding("gzip, br", {"br": None, "gzip": None}) == "br"
+        assert negotiate_encoding("*", {"br": None, "gzip": None}) == "br"
+
+    def test_q_zero_and_unknown_encodings_are_refused(self):
+        assert negotiate_encoding("gzip;q=0", {"gzip": None}) is None
+        assert negotiate_encoding("*;q=0.5, gzip;q=0", {"gzip": None}) is None
+        assert negotiate_encoding("deflate", {"gzip": None}) is None
+        assert negotiate_encoding(None, {"gzip": None}) is None
+
+
+class TestResponseCompressor:
+    def test_large_json_is_gzipped(self):
+        head, chunks = run(gzip_only(), [start(length=len(JSON_BODY), extra=[(b"etag", b'"v1"')]), body(JSON_BODY)])
+
+        headers = headers_of(head)
+        compressed = b"".join(chunks)
+        assert headers["content-encoding"] == "gzip"
+        assert headers["vary"] == "Accept-Encoding"
+        assert headers["etag"] == 'W/"v1"'
+        assert int(headers["content-length"]) == len(compressed) < len(JSON_BODY)
+        assert gzip.decompress(compressed) == JSON_BODY
+
+    def test_small_body_is_sent_as_is(self):
+        head, chunks = run(gzip_only(), [start(length=2), body(b"{}")])
+
+        assert "content-encoding" not in headers_of(head)
+        assert chunks == [b"{}"]
+
+    def test_upstream_encoded_body_passes_through(self):
+        encoded = gzip.compress(JSON_BODY)
+        head, chunks = run(gzip_only(), [start(extra=[(b"content-encoding", b"gzip")]), body(encoded)])
+
+        assert headers_of(head)["content-encoding"] == "gzip"
+        assert chunks == [encoded]
+
+    def test_content_type_outside_allow_list_is_not_compressed(self):
+        png = b"\x89PNG" + bytes(4096)
+        head, chunks = run(gzip_only(), [start("image/png"), body(png)])
+
+        assert "content-encoding" not in headers_of(head)
+        assert chunks == [png]
+
+    def test_client_without_accept_encoding_gets_identity(self):
+        head, chunks = run(gzip_only(), [start(), body(JSON_BODY)], accept_encoding=None)
+
+        assert "content-encoding" not in headers_of(head)
+        assert chunks == [JSON_BODY]
+
+    def test_streamed_body_is_flushed_per_chunk(self):
+        parts = [JSON_BODY[:100], JSON_BODY[100:2000], JSON_BODY[2000:]]
+        messages = [start()] + [body(part, more_body=True) for part in parts] + [body(b"")]
+        head, chunks = run(gzip_only(), messages)
+
+        headers = headers_of(head)
+        assert headers["content-encoding"] == "gzip"
+        assert "content-length" not in headers
+
+        # Every chunk decodes on its own arrival, nothing waits for the end of the stream
+        decoder = zlib.decompressobj(31)
+        assert decoder.decompress(chunks[0]) == parts[0]
+        assert decoder.decompress(chunks[1]) == parts[1]
+        assert decoder.decompress(b"".join(chunks[2:])) + decoder.flush() == parts[2]
+
+    def test_range_responses_pass_through(self):
+        partial = {**start(extra=[(b"content-range", b"bytes 0-4095/9000")]), "status": 206}
+        ranged = start(extra=[(b"content-range", b"bytes */9000")])
+
+        for message in (partial, ranged):
+            head, chunks = run(gzip_only(), [message, body(JSON_BODY)])
+
+            assert "content-encoding" not in headers_of(head)
+            assert chunks == [JSON_BODY]
+
+    def test_head_requests_are_not_compressed(self):
+        head, _ = run(gzip_only(), [start(length=len(JSON_BODY)), body(b"")], method="HEAD")
+
+        assert "content-encoding" not in headers_of(head)
+
+    def test_brotli_when_installed(self):
+        brotli = pytest.importorskip("brotli")
+        compressor = ResponseCompressor(enabled=True, min_size=1024)
+
+        head, chunks = run(compressor, [start(), body(JSON_BODY)], accept_encoding="gzip, br")
+
+        assert headers_of(head)["content-encoding"] == "br"
+        assert brotli.decompress(b"".join(chunks)) == JSON_BODY
+
+
+class TestGatewayCompression:
+    def test_proxied_json_is_compressed(self, gateway_client, upstream, access_token):
+        documents = [{"id": index, "title": "Document title"} for index in range(200)]
+        upstream.handler = lambda request: httpx.Response(200, json=documents)
+
+        response = gateway_client.get("/pdf/documents", headers={
+            "Authorization": f"Bearer {access_token}",
+            "Accept-Encoding": "gzip",
+        })
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json() == documents
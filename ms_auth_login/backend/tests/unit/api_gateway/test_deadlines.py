@@ -0,0 +1,37 @@
+import httpx
+
+from backend.services.api_gateway.src.config.settings import SERVICES
+
+HEADER = "x-request-timeout-ms"
+
+
+class TestDeadlinePropagation:
+    def test_remaining_budget_is_forwarded(self, gateway_client, upstream, access_token):
+        gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        forwarded = int(upstream.requests[-1].headers[HEADER])
+        assert 0 < forwarded <= SERVICES["pdf"]["timeout"] * 1000
+
+    def test_callers_can_only_shorten_the_deadline(self, gateway_client, upstream, access_token):
+        for requested, limit in (("1500", 1500), ("999999999", SERVICES["pdf"]["timeout"] * 1000)):
+            gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}", HEADER: requested})
+
+            assert [name for name, _ in upstream.requests[-1].headers.multi_items()].count(HEADER) == 1
+            assert 0 < int(upstream.requests[-1].headers[HEADER]) <= limit
+
+    def test_expired_deadline_is_not_sent_upstream(self, gateway_client, upstream, access_token):
+        response = gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}", HEADER: "0"})
+
+        assert response.status_code == 504
+        assert upstream.requests == []
+
+    def test_upstream_timeout_is_a_gateway_timeout(self, gateway_client, upstream, access_token):
+        def handler(request):
+            raise httpx.ReadTimeout("timed out")
+
+        upstream.handler = handler
+
+        response = gateway_client.post("/pdf/documents", json={},
+                                       headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == 504
@@ -0,0 +1,128 @@
+import asyncio
+import socket
+
+import pytest
+
+from backend.services.api_gateway.src.upstream.clients import UpstreamClientRegistry
+from backend.services.api_gateway.src.upstream.resolver import DNSCache
+
+
+class FakeResolver:
+    """System resolver stand-in: host -> addresses, or an OSError to raise"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    async def __call__(self, host):
+        self.calls.append(host)
+        await asyncio.sleep(0)
+        answer = self.answers[host]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class TestDNSCache:
+    def test_addresses_are_reused_within_the_ttl(self):
+        lookup = FakeResolver({"pdf-service": ["10.0.0.1"]})
+        cache = DNSCache(ttl=30, resolve=lookup)
+
+        async def run():
+            first = await cache.resolve("pdf-service", now=0)
+            second = await cache.resolve("pdf-service", now=10)
+            return first, second
+
+        assert asyncio.run(run()) == (["10.0.0.1"], ["10.0.0.1"])
+        assert lookup.calls == ["pdf-service"]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_ip_addresses_skip_the_resolver(self):
+        lookup = FakeResolver({})
+        cache = DNSCache(resolve=lookup)
+
+        assert asyncio.run(cache.resolve("127.0.0.1")) == ["127.0.0.1"]
+        assert lookup.calls == []
+
+    def test_concurrent_misses_share_one_lookup(self):
+        lookup = FakeResolver({"pdf-service": ["10.0.0.1"]})
+        cache = DNSCache(resolve=lookup)
+
+        async def run():
+            return await asyncio.gather(*(cache.resolve("pdf-service") for _ in range(10)))
+
+        assert all(addresses == ["10.0.0.1"] for addresses in asyncio.run(run()))
+        assert lookup.calls == ["pdf-service"]
+
+    def test_stale_addresses_survive_resolver_failures(self):
+        lookup = FakeResolver({"pdf-service": ["10.0.0.1"]})
+        cache = DNSCache(ttl=30, stale_ttl=300, resolve=lookup)
+
+        async def run():
+            # Entries are timestamped with the real clock, look up relative to it
+            await cache.resolve("pdf-service")
+            resolved_at = cache._entries["pdf-service"].resolved_at
+            lookup.answers["pdf-service"] = socket.gaierror("resolver down")
+
+            stale = await cache.resolve("pdf-service", now=resolved_at + 60)
+            with pytest.raises(socket.gaierror):
+                await cache.resolve("pdf-service", now=resolved_at + 600)
+            return stale
+
+        assert asyncio.run(run()) == ["10.0.0.1"]
+        assert (cache.stale, cache.failures) == (1, 2)
+
+    def test_refresh_picks_up_new_addresses(self):
+        lookup = FakeResolver({"pdf-service": ["10.0.0.1"]})
+        cache = DNSCache(ttl=30, resolve=lookup)
+
+        async def run():
+            await cache.resolve("pdf-service")
+            lookup.answers["pdf-service"] = ["10.0.0.2", "10.0.0.3"]
+            await cache.refresh()
+            return await cache.resolve("pdf-service")
+
+        assert asyncio.run(run()) == ["10.0.0.2", "10.0.0.3"]
+        assert cache.hits == 1
+
+    def test_failed_refresh_keeps_the_cached_addresses(self):
+        lookup = FakeResolver({"pdf-service": ["10.0.0.1"]})
+        cache = DNSCache(resolve=lookup)
+
+        async def run():
+            await cache.resolve("pdf-service")
+            lookup.answers["pdf-service"] = socket.gaierror("resolver down")
+            await cache.refresh()
+
+        asyncio.run(run())
+        assert cache.stats()["hosts"] == {"pdf-service": ["10.0.0.1"]}
+
+
+class TestCachingNetworkBackend:
+    def test_upstream_connections_use_cached_addresses(self):
+        lookup = FakeResolver({"pdf-service": ["127.0.0.1"]})
+        cache = DNSCache(resolve=lookup)
+
+        async def handle(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok")
+            await writer.drain()
+            writer.close()
+
+        async def run():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            registry = UpstreamClientRegistry({"pdf": {"url": f"http://pdf-service:{port}"}}, resolver=cache)
+            try:
+                # Every response closes its connection, the host is still looked up only once
+                return [await registry.get("pdf").get("/documents") for _ in range(3)]
+            finally:
+                await registry.shutdown()
+                server.close()
+
+        responses = asyncio.run(run())
+
+        assert [response.text for response in responses] == ["ok", "ok", "ok"]
+        assert lookup.calls == ["pdf-service"]
+        # Only the TCP connect uses the address, the request still names the host
+        assert responses[0].request.headers["host"].startswith("pdf-service:")
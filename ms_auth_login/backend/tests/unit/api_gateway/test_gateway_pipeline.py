@@ -0,0 +1,44 @@
+class TestGatewayPipeline:
+    def test_gateway_routes_fall_through_to_app(self, gateway_client, upstream):
+        response = gateway_client.get("/health")
+
+        assert response.status_code == 200
+        assert upstream.requests == []
+
+    def test_protected_route_requires_token(self, gateway_client, upstream):
+        response = gateway_client.get("/pdf/documents")
+
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "Bearer"
+        assert upstream.requests == []
+
+    def test_valid_token_is_proxied(self, gateway_client, upstream, access_token):
+        response = gateway_client.get(
+            "/pdf/documents",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"path": "/documents"}
+
+    def test_wrong_audience_is_forbidden(self, gateway_client, upstream, token_factory):
+        token = token_factory(aud=["other-service"])
+
+        response = gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {token}"})
+
+        assert response.status_code == 403
+        assert upstream.requests == []
+
+    def test_public_auth_routes_are_rate_limited(self, gateway_client, upstream):
+        statuses = [gateway_client.post("/auth/token").status_code for _ in range(6)]
+
+        assert statuses == [200] * 5 + [429]
+
+    def test_cors_preflight_is_answered_by_gateway(self, gateway_client, upstream):
+        response = gateway_client.options(
+            "/pdf/documents",
+            headers={"Origin": "http://localhost:3000", "Access-Control-Request-Method": "GET"},
+        )
+
+        assert response.status_code == 200
+        assert upstream.requests == []
@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from backend.libs.auth_utils.src.auth_utils import dependencies
+from backend.libs.auth_utils.src.auth_utils.identity import verify_identity_assertion
+from backend.services.api_gateway.src.middleware.proxy import IDENTITY_HEADER
+from backend.services.api_gateway.src.utils.identity import IdentityAsserter
+
+KEY = "cluster-internal-key"
+CLAIMS = {
+    "sub": "user-1",
+    "email": "test@example.com",
+    "roles": ["user"],
+    "permissions": ["read:own"],
+    "exp": time.time() + 900,
+    "jti": "not-forwarded",
+}
+
+
+class TestIdentityAssertion:
+    def test_round_trip(self):
+        assertion = IdentityAsserter(KEY, ttl=60).sign(CLAIMS, "pdf-service")
+
+        identity = verify_identity_assertion(assertion, KEY, "pdf-service")
+
+        assert identity["sub"] == "user-1"
+        assert identity["roles"] == ["user"]
+        assert identity["permissions"] == ["read:own"]
+        assert "jti" not in identity
+        assert identity["exp"] <= time.time() + 60
+
+    def test_expiry_never_outlives_the_token(self):
+        assertion = IdentityAsserter(KEY, ttl=600).sign({**CLAIMS, "exp": 1000}, "pdf-service", now=900)
+
+        assert verify_identity_assertion(assertion, KEY, "pdf-service", now=999)["exp"] == 1000
+        with pytest.raises(HTTPException, match="expired"):
+            verify_identity_assertion(assertion, KEY, "pdf-service", now=1001)
+
+    @pytest.mark.parametrize("tamper", [
+        lambda value: value[:-2] + ("AA" if not value.endswith("AA") else "BB"),
+        lambda value: value.replace("v1.", "v1.e30", 1),
+        lambda value: "v1.garbage",
+        lambda value: "not an assertion",
+    ])
+    def test_forged_or_malformed_assertions_are_rejected(self, tamper):
+        assertion = IdentityAsserter(KEY).sign(CLAIMS, "pdf-service")
+
+        with pytest.raises(HTTPException) as exc_info:
+            verify_identity_assertion(tamper(assertion), KEY, "pdf-service")
+
+        assert exc_info.value.status_code == 401
+
+    def test_wrong_key_or_audience_is_rejected(self):
+        assertion = IdentityAsserter(KEY).sign(CLAIMS, "pdf-service")
+
+        with pytest.raises(HTTPException):
+            verify_identity_assertion(assertion, "another-key", "pdf-service")
+        with pytest.raises(HTTPException, match="chat-service"):
+            verify_identity_assertion(assertion, KEY, "chat-service")
+
+    def test_assertion_without_a_configured_audience_is_refused(self):
+        assertion = IdentityAsserter(KEY).sign(CLAIMS, "pdf-service")
+
+        with pytest.raises(HTTPException, match="audience"):
+            verify_identity_assertion(assertion, KEY, None)
+
+
+class TestGatewayForwarding:
+    @pytest.fixture
+    def signing_gateway(self, gateway_client):
+        authenticator = gateway_client.app.middleware_stack
+        # Reach the pipeline built for this test client and give it a key
+        while not hasattr(authenticator, "authenticator"):
+            authenticator = authenticator.app
+        authenticator.authenticator.asserter = IdentityAsserter(KEY)
+        return gateway_client
+
+    def test_verified_identity_is_forwarded(self, signing_gateway, upstream, access_token):
+        signing_gateway.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        identity = verify_identity_assertion(upstream.requests[-1].headers[IDENTITY_HEADER], KEY, "pdf-service")
+        assert identity["aud"] == "pdf-service"
+
+    def test_client_supplied_assertion_is_stripped(self, gateway_client, upstream):
+        forged = IdentityAsserter("guessed-key").sign(CLAIMS, "auth")
+
+        gateway_client.post("/auth/token", headers={IDENTITY_HEADER: forged})
+
+        assert IDENTITY_HEADER not in upstream.requests[-1].headers
+
+    def test_no_assertion_without_a_key(self, gateway_client, upstream, access_token):
+        gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        assert IDENTITY_HEADER not in upstream.requests[-1].headers
+
+
+class TestServiceSideVerification:
+    @pytest.fixture(autouse=True)
+    def shared_key(self, monkeypatch):
+        monkeypatch.setattr(dependencies, "GATEWAY_IDENTITY_KEY", KEY)
+        monkeypatch.setattr(dependencies, "GATEWAY_IDENTITY_AUDIENCE", None)
+
+    def gateway_user(self, audience: str, service_name: str = None):
+        assertion = IdentityAsserter(KEY).sign(CLAIMS, audience)
+        request = Request({"type": "http", "headers": [(IDENTITY_HEADER.encode(), assertion.encode())]})
+        return asyncio.run(dependencies.get_gateway_user(request, None, service_name))
+
+    def test_assertion_for_this_service_is_accepted(self, monkeypatch):
+        assert self.gateway_user("pdf-service", service_name="pdf-service").id == "user-1"
+
+        monkeypatch.setattr(dependencies, "GATEWAY_IDENTITY_AUDIENCE", "pdf-service")
+        assert self.gateway_user("pdf-service").id == "user-1"
+
+    def test_assertion_for_another_service_is_refused(self, monkeypatch):
+        with pytest.raises(HTTPException, match="pdf-service"):
+            self.gateway_user("chat-service", service_name="pdf-service")
+
+        monkeypatch.setattr(dependencies, "GATEWAY_IDENTITY_AUDIENCE", "pdf-service")
+        with pytest.raises(HTTPException, match="pdf-service"):
+            self.gateway_user("chat-service", service_name="chat-service")
+
+    def test_assertion_is_refused_without_an_audience(self):
+        with pytest.raises(HTTPException, match="audience"):
+            self.gateway_user("pdf-service")
@@ -0,0 +1,82 @@
+from backend.services.api_gateway.src.upstream import LoadBalancer
+
+REPLICAS = [
+    {"url": "http://pdf-1:8001", "weight": 1.0},
+    {"url": "http://pdf-2:8001", "weight": 1.0},
+    {"url": "http://pdf-3:8001", "weight": 1.0},
+]
+
+
+def make_balancer(**overrides) -> LoadBalancer:
+    settings = dict(slow_start=30.0, eject_consecutive_failures=3, ejection_time=30.0,
+                    max_ejection_percent=50, now=1000.0)
+    settings.update(overrides)
+    return LoadBalancer("pdf", REPLICAS, **settings)
+
+
+class TestLoadBalancer:
+    def test_least_outstanding_spreads_concurrent_requests(self):
+        balancer = make_balancer()
+
+        picked = []
+        for _ in range(6):
+            replica = balancer.pick(now=1000.0)
+            balancer.start(replica)
+            picked.append(replica.url)
+
+        assert sorted(picked) == sorted([replica["url"] for replica in REPLICAS] * 2)
+
+    def test_busy_replica_is_avoided(self):
+        balancer = make_balancer()
+        busy = balancer.replicas[0]
+        for _ in range(5):
+            balancer.start(busy)
+
+        assert all(balancer.pick(now=1000.0) is not busy for _ in range(10))
+
+    def test_power_of_two_prefers_the_less_loaded_replica(self):
+        balancer = make_balancer(strategy="power_of_two")
+        busy = balancer.replicas[0]
+        for _ in range(5):
+            balancer.start(busy)
+
+        assert all(balancer.pick(now=1000.0) is not busy for _ in range(20))
+
+    def test_consecutive_failures_eject_a_replica(self):
+        balancer = make_balancer()
+        failing = balancer.replicas[0]
+        for _ in range(3):
+            balancer.start(failing)
+            balancer.finish(failing, False, 0.1, now=1000.0)
+
+        assert failing.stats(1000.0)["state"] == "ejected"
+        assert all(balancer.pick(now=1010.0) is not failing for _ in range(10))
+        assert failing.available(1030.0)
+
+    def test_ejections_are_capped(self):
+        balancer = make_balancer()
+        for replica in balancer.replicas:
+            for _ in range(3):
+                balancer.start(replica)
+                balancer.finish(replica, False, 0.1, now=1000.0)
+
+        assert sum(not replica.available(1000.0) for replica in balancer.replicas) == 1
+
+    def test_recovered_replica_slow_starts(self):
+        balancer = make_balancer()
+        recovered = balancer.replicas[0]
+        balancer.mark_health(recovered.url, False, unhealthy_threshold=1, now=1000.0)
+        assert not recovered.available(1000.0)
+
+        balancer.mark_health(recovered.url, True, now=1003.0)
+
+        # 10% of its weight right after recovery, full weight after the slow-start period
+        assert recovered.load(1003.0, 30.0) == 10 * balancer.replicas[1].load(1003.0, 30.0)
+        assert recovered.load(1033.0, 30.0) == balancer.replicas[1].load(1033.0, 30.0)
+
+    def test_all_replicas_down_falls_back_to_all(self):
+        balancer = make_balancer()
+        for replica in balancer.replicas:
+            balancer.mark_health(replica.url, False, unhealthy_threshold=1, now=1000.0)
+
+        assert balancer.pick(now=1000.0) in balancer.replicas
@@ -0,0 +1,106 @@
+import io
+import json
+import logging
+
+import pytest
+
+from backend.services.api_gateway.src.config.logging import JsonLinesFormatter, LogSampler, QueueLogHandler
+
+
+@pytest.fixture
+def log_output():
+    """A QueueLogHandler (writer not started) writing JSON lines to a StringIO, on a logger of its own"""
+    stream = io.StringIO()
+    handler = QueueLogHandler(stream=stream, queue_size=100, batch_size=10)
+    handler.setFormatter(JsonLinesFormatter())
+    logger = logging.getLogger("test_logging")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    def lines():
+        handler.flush()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield logger, handler, lines
+    logger.removeHandler(handler)
+    handler.close()
+
+
+class TestQueueLogHandler:
+    def test_records_are_written_as_json_lines(self, log_output):
+        logger, handler, lines = log_output
+        handler.start()
+
+        logger.warning("Upstream %s failed", "pdf", extra={"service": "pdf"})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Batch item failed")
+
+        first, second = lines()
+        assert (first["level"], first["message"], first["service"]) == ("WARNING", "Upstream pdf failed", "pdf")
+        assert "ValueError: boom" in second["exception"]
+        assert handler.stats()["written"] == 2
+
+    def test_full_queue_drops_instead_of_blocking(self, log_output):
+        logger, handler, lines = log_output
+        # The writer is not started yet, nothing drains the queue
+        handler.queue.maxsize = 3
+
+        for index in range(5):
+            logger.info("record %d", index)
+
+        assert handler.dropped == 2
+        handler.start()
+        messages = [line["message"] for line in lines()]
+        assert messages[:3] == ["record 0", "record 1", "record 2"]
+        assert messages[3] == "2 log records dropped, the log queue was full"
+
+
+class TestLogSampler:
+    @staticmethod
+    def record(log_class=None, level=logging.INFO):
+        record = logging.makeLogRecord({"name": "api_gateway", "levelno": level,
+                                        "levelname": logging.getLevelName(level)})
+        if log_class is not None:
+            record.log_class = log_class
+        return record
+
+    def test_sample_rates_by_class_and_prefix(self):
+        sampler = LogSampler({"access.2xx": 0.0, "access": 1.0}, per_second=0)
+
+        assert not sampler.filter(self.record("access.2xx"))
+        assert sampler.filter(self.record("access.5xx"))
+        assert sampler.filter(self.record())
+        assert sampler.sampled == 1
+
+    def test_each_class_is_rate_limited_separately(self):
+        sampler = LogSampler({}, per_second=3)
+
+        errors = [sampler.filter(self.record(level=logging.ERROR)) for _ in range(5)]
+        info = sampler.filter(self.record())
+
+        assert errors == [True, True, True, False, False]
+        assert info
+        assert sampler.rate_limited == 2
+
+
+class TestAccessLog:
+    def test_proxied_requests_are_logged(self, gateway_client, upstream, access_token):
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        access_logger = logging.getLogger("api_gateway.access")
+        access_logger.addHandler(handler)
+        try:
+            gateway_client.get("/pdf/documents/7", headers={"Authorization": f"Bearer {access_token}"})
+            gateway_client.get("/pdf/documents/7")
+        finally:
+            access_logger.removeHandler(handler)
+
+        ok, unauthorized = records
+        assert (ok.method, ok.path, ok.status, ok.service) == ("GET", "/pdf/documents/7", 200, "pdf")
+        assert ok.route == "/documents/{document_id}"
+        assert ok.log_class == "access.2xx"
+        assert unauthorized.log_class == "access.4xx"
@@ -0,0 +1,69 @@
+import pytest
+
+from backend.services.api_gateway.src.middleware.metrics import REQUESTS, RATE_LIMIT_REJECTIONS
+from backend.services.api_gateway.src.utils.metrics import MetricsRegistry, _Metric
+
+
+class TestMetricsRegistry:
+    def test_renders_prometheus_text_format(self):
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Requests", ("service",))
+        latency = registry.histogram("latency_seconds", "Latency", ("service",), buckets=(0.1, 1.0))
+        requests.inc("pdf")
+        requests.inc("pdf")
+        latency.observe(0.05, "pdf")
+        latency.observe(0.5, "pdf")
+        latency.observe(5.0, "pdf")
+
+        lines = registry.render().splitlines()
+
+        assert lines[:3] == ["# HELP requests_total Requests", "# TYPE requests_total counter", 'requests_total{service="pdf"} 2']
+        assert 'latency_seconds_bucket{service="pdf",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{service="pdf",le="1"} 2' in lines
+        assert 'latency_seconds_bucket{service="pdf",le="+Inf"} 3' in lines
+        assert 'latency_seconds_sum{service="pdf"} 5.55' in lines
+        assert 'latency_seconds_count{service="pdf"} 3' in lines
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter("c", "C", ("path",)).inc('a"b\\')
+
+        assert 'c{path="a\\"b\\\\"} 1' in registry.render()
+
+
+class TestMetricsEndpoint:
+    def test_metric_types_must_render(self):
+        class Untyped(_Metric):
+            pass
+
+        with pytest.raises(TypeError):
+            Untyped("gateway_untyped", "No samples")
+
+    def test_proxied_requests_are_counted(self, gateway_client, upstream, access_token):
+        before = REQUESTS.value("pdf", "/documents", "2xx")
+
+        gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+        response = gateway_client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert REQUESTS.value("pdf", "/documents", "2xx") == before + 1
+        body = response.text
+        assert 'gateway_upstream_duration_seconds_count{service="pdf"}' in body
+        assert 'gateway_overhead_seconds_bucket{service="pdf",le="+Inf"}' in body
+        assert 'gateway_in_flight_requests{service="pdf"} 0' in body
+        assert "gateway_token_cache_hit_ratio" in body
+        assert 'gateway_upstream_replica_outstanding_requests{service="pdf",replica="http://pdf-service:8001"} 0' in body
+
+    def test_rate_limit_rejections_are_counted(self, gateway_client, upstream):
+        before = RATE_LIMIT_REJECTIONS.value("auth")
+
+        for _ in range(6):
+            gateway_client.post("/auth/token")
+
+        assert RATE_LIMIT_REJECTIONS.value("auth") == before + 1
+
+    def test_scrapes_are_not_rate_limited(self, gateway_client, upstream):
+        response = gateway_client.get("/metrics")
+
+        assert "x-ratelimit-limit" not in response.headers
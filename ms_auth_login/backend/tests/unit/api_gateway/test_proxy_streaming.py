@@ -0,0 +1,81 @@
+import httpx
+
+from backend.services.api_gateway.src.config.settings import PROXY_MAX_BODY_SIZE
+from backend.services.api_gateway.src.middleware.proxy import filter_headers
+
+
+class TestProxyStreaming:
+    def test_filter_headers_drops_hop_by_hop(self):
+        headers = [
+            ("Connection", "keep-alive, X-Debug"),
+            ("Keep-Alive", "timeout=5"),
+            ("X-Debug", "1"),
+            ("Transfer-Encoding", "chunked"),
+            ("Set-Cookie", "a=1"),
+            ("Set-Cookie", "b=2"),
+        ]
+
+        assert filter_headers(headers) == [("Set-Cookie", "a=1"), ("Set-Cookie", "b=2")]
+
+    def test_upload_is_forwarded_and_response_relayed(self, gateway_client, upstream):
+        upstream.handler = lambda request: httpx.Response(
+            201,
+            content=request.content[::-1],
+            headers=[("Set-Cookie", "a=1"), ("Set-Cookie", "b=2"), ("Connection", "close")],
+        )
+
+        response = gateway_client.post(
+            "/auth/register?x=1&x=2",
+            content=b"0123456789",
+            headers={"Connection": "X-Debug", "X-Debug": "1"},
+        )
+
+        assert response.status_code == 201
+        assert response.content == b"9876543210"
+        assert response.headers.get_list("set-cookie") == ["a=1", "b=2"]
+        assert "connection" not in response.headers
+        assert "x-debug" not in upstream.requests[0].headers
+        assert upstream.requests[0].url.query == b"x=1&x=2"
+
+    def test_get_without_body_is_not_chunked(self, gateway_client, upstream):
+        gateway_client.get("/auth/register")
+
+        assert "transfer-encoding" not in upstream.requests[0].headers
+
+    def test_client_without_accept_encoding_gets_identity(self, gateway_client, upstream):
+        # The test client sends httpx's defaults, a plain client sends none of them
+        for name in ("accept-encoding", "user-agent"):
+            del gateway_client.headers[name]
+
+        gateway_client.get("/auth/register")
+
+        sent = upstream.requests[0].headers
+        assert sent["accept-encoding"] == "identity"
+        assert "user-agent" not in sent
+
+    def test_client_accept_encoding_is_forwarded(self, gateway_client, upstream):
+        gateway_client.get("/auth/register", headers={"Accept-Encoding": "br"})
+
+        assert upstream.requests[0].headers.get_list("accept-encoding") == ["br"]
+
+    def test_announced_oversized_body_is_rejected(self, gateway_client, upstream):
+        response = gateway_client.post(
+            "/auth/register",
+            content=b"x",
+            headers={"Content-Length": str(PROXY_MAX_BODY_SIZE + 1)},
+        )
+
+        assert response.status_code == 413
+        assert upstream.requests == []
+
+    def test_streamed_oversized_body_is_rejected(self, gateway_client, upstream, monkeypatch):
+        monkeypatch.setattr("backend.services.api_gateway.src.middleware.proxy.PROXY_MAX_BODY_SIZE", 8)
+
+        def chunks():
+            yield b"0123"
+            yield b"4567"
+            yield b"89"
+
+        response = gateway_client.post("/auth/register", content=chunks())
+
+        assert response.status_code == 413
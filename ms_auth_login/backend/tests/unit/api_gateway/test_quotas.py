@@ -0,0 +1,95 @@
+import pytest
+
+from backend.services.api_gateway.src.middleware.rate_limit import RateLimiter
+
+
+@pytest.fixture
+def rate_limiter(gateway_client):
+    """The rate-limit stage of the pipeline built for this test client, with small quota tiers"""
+    stage = gateway_client.app.middleware_stack
+    while not hasattr(stage, "rate_limiter"):
+        stage = stage.app
+    stage.rate_limiter.quota_tiers = {"default": 3, "user": 20, "admin": 100}
+    return stage.rate_limiter
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+class TestQuotaTiers:
+    def test_best_tier_among_roles(self):
+        limiter = RateLimiter(quota_tiers={"default": 3, "user": 20, "admin": 100})
+
+        assert limiter.tier({"roles": ["user", "admin"]}) == ("admin", 100)
+        assert limiter.tier({"roles": "user"}) == ("user", 20)
+        assert limiter.tier({"roles": ["auditor"]}) == ("default", 3)
+        assert RateLimiter(quota_tiers={"admin": 100}).tier({"roles": ["user"]}) is None
+
+    def test_protected_routes_get_the_authenticated_ip_floor(self):
+        limiter = RateLimiter(rate_limit_per_minute=60)
+
+        assert limiter.limits["authenticated"] >= 60
+        assert not RateLimiter(quota_tiers={}).quotas_enabled
+
+
+class TestGatewayQuotas:
+    def test_quota_is_per_user_not_per_ip(self, gateway_client, upstream, rate_limiter, token_factory):
+        first, second = token_factory(roles=[]), token_factory(roles=[])
+
+        statuses = [gateway_client.get("/pdf/documents", headers=bearer(first)).status_code for _ in range(4)]
+        other = gateway_client.get("/pdf/documents", headers=bearer(second))
+
+        assert statuses == [200] * 3 + [429]
+        # Same client address, different user: a budget of its own
+        assert other.status_code == 200
+        assert other.headers["x-quota-limit"] == "3"
+        assert other.headers["x-quota-remaining"] == "2"
+
+    def test_rejection_headers(self, gateway_client, upstream, rate_limiter, token_factory):
+        token = token_factory(roles=[])
+        for _ in range(3):
+            gateway_client.get("/pdf/documents", headers=bearer(token))
+
+        response = gateway_client.get("/pdf/documents", headers=bearer(token))
+
+        assert response.status_code == 429
+        assert response.headers["x-quota-remaining"] == "0"
+        assert response.headers["retry-after"] == "20"
+        assert len(upstream.requests) == 3
+
+    def test_admins_get_a_larger_tier(self, gateway_client, upstream, rate_limiter, token_factory):
+        admin = token_factory(roles=["user", "admin"])
+
+        response = gateway_client.get("/pdf/documents", headers=bearer(admin))
+
+        assert response.headers["x-quota-limit"] == "100"
+
+    def test_routes_are_charged_their_cost(self, gateway_client, upstream, rate_limiter, access_token):
+        # Uploads to /pdf/documents cost 10, reads 1
+        upload = gateway_client.post("/pdf/documents", headers=bearer(access_token), content=b"x")
+        read = gateway_client.get("/pdf/documents", headers=bearer(access_token))
+
+        assert upload.headers["x-quota-remaining"] == "10"
+        assert read.headers["x-quota-remaining"] == "9"
+        assert gateway_client.post("/pdf/documents", headers=bearer(access_token), content=b"x").status_code == 429
+
+    def test_public_and_rejected_requests_are_not_charged(self, gateway_client, upstream, rate_limiter):
+        login = gateway_client.post("/auth/token")
+        unauthorized = gateway_client.get("/pdf/documents")
+
+        assert login.status_code == 200
+        assert "x-quota-limit" not in login.headers
+        assert unauthorized.status_code == 401
+        assert "x-quota-limit" not in unauthorized.headers
+
+    def test_batch_items_are_charged_together(self, gateway_client, upstream, rate_limiter, token_factory):
+        token = token_factory(roles=[])
+
+        response = gateway_client.post("/batch", headers=bearer(token), json={
+            "requests": [{"id": index, "path": f"/pdf/documents/{index}"} for index in range(4)]
+        })
+
+        assert response.status_code == 200
+        assert response.text.count('"status":429') == 4
+        assert upstream.requests == []
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from backend.services.api_gateway.src.ratelimit import (
+    InMemoryRateLimiter,
+    RedisRateLimiter,
+    SharedMemoryRateLimiter,
+    create_rate_limit_backend,
+)
+from backend.services.api_gateway.src.ratelimit.base import RateLimitBackend
+from backend.services.api_gateway.src.ratelimit.redis import encode_command, read_reply
+
+
+class StandInRedis:
+    """Minimal Redis-protocol server with the commands the rate limiter uses"""
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"redis://{host}:{port}/0"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                command = [part.decode() for part in await read_reply(reader)]
+                self.commands.append(command)
+                writer.write(self._execute(command))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+
+    def _execute(self, command) -> bytes:
+        name, args = command[0].upper(), command[1:]
+        if name in ("INCRBY", "DECRBY"):
+            delta = int(args[1]) * (1 if name == "INCRBY" else -1)
+            self.data[args[0]] = int(self.data.get(args[0], 0)) + delta
+            return b":%d\r\n" % self.data[args[0]]
+        if name == "GET":
+            value = self.data.get(args[0])
+            return b"$-1\r\n" if value is None else encode_command([str(value)])[4:]
+        if name == "PEXPIRE":
+            return b":1\r\n"
+        if name in ("PING", "SELECT", "AUTH"):
+            return b"+OK\r\n"
+        return b"-ERR unknown command\r\n"
+
+
+class TestSharedMemoryRateLimiter:
+    def test_state_is_shared_between_workers(self, tmp_path):
+        path = str(tmp_path / "ratelimit")
+        worker_a = SharedMemoryRateLimiter(path=path, slots=64)
+        worker_b = SharedMemoryRateLimiter(path=path, slots=64)
+
+        results = [
+            (worker_a if index % 2 else worker_b).acquire("auth:1.2.3.4", limit=5, period=60, now=100.0)
+            for index in range(6)
+        ]
+
+        assert [result.allowed for result in results] == [True] * 5 + [False]
+        asyncio.run(worker_a.close())
+        asyncio.run(worker_b.close())
+
+    def test_table_size_is_constant(self, tmp_path):
+        limiter = SharedMemoryRateLimiter(path=str(tmp_path / "ratelimit"), slots=16)
+        for index in range(1000):
+            assert limiter.acquire(f"ip{index}", limit=5, period=60, now=100.0).allowed
+
+        assert (tmp_path / "ratelimit").stat().st_size == 16 * 16
+        assert limiter.evictions > 0
+        asyncio.run(limiter.close())
+
+
+class TestRedisRateLimiter:
+    def test_counters_are_shared_with_one_round_trip_per_hit(self):
+        async def run():
+            server = StandInRedis()
+            url = await server.start()
+            replica_a, replica_b = RedisRateLimiter(url=url), RedisRateLimiter(url=url)
+
+            results = []
+            for index in range(7):
+                replica = replica_a if index % 2 else replica_b
+                results.append(await replica.hit("default:1.2.3.4", limit=5, period=3600))
+
+            # Rejected hits are rolled back with the next pipeline
+            await replica_a.hit("other", limit=5, period=3600)
+            await replica_b.hit("other", limit=5, period=3600)
+
+            round_trips = replica_a.round_trips + replica_b.round_trips
+            counters = {key: value for key, value in server.data.items() if "1.2.3.4" in key}
+            await replica_a.close()
+            await replica_b.close()
+            await server.stop()
+            return results, round_trips, counters
+
+        results, round_trips, counters = asyncio.run(run())
+
+        assert [result.allowed for result in results] == [True] * 5 + [False] * 2
+        assert [result.remaining for result in results[:5]] == [4, 3, 2, 1, 0]
+        assert round_trips == 9
+        assert list(counters.values()) == [5]
+
+    def test_concurrent_hits_are_pipelined(self):
+        async def run():
+            server = StandInRedis()
+            url = await server.start()
+            limiter = RedisRateLimiter(url=url)
+
+            results = await asyncio.gather(*(limiter.hit("burst", limit=50, period=3600) for _ in range(100)))
+
+            await limiter.close()
+            await server.stop()
+            return results
+
+        results = asyncio.run(run())
+
+        assert sum(result.allowed for result in results) == 50
+
+    def test_fails_open_when_unreachable(self):
+        limiter = RedisRateLimiter(url="redis://127.0.0.1:1/0", timeout=0.5)
+
+        result = asyncio.run(limiter.hit("key", limit=1, period=60))
+
+        assert result.allowed
+        assert limiter.errors == 1
+
+
+class TestBackendFactory:
+    def test_default_backend_is_in_process(self):
+        assert isinstance(create_rate_limit_backend("memory"), InMemoryRateLimiter)
+
+    def test_incomplete_backend_cannot_be_created(self):
+        class NoHit(RateLimitBackend):
+            pass
+
+        with pytest.raises(TypeError):
+            NoHit()
@@ -0,0 +1,70 @@
+from backend.services.api_gateway.src.ratelimit import InMemoryRateLimiter
+
+
+class TestInMemoryRateLimiter:
+    def test_allows_burst_then_rejects(self):
+        limiter = InMemoryRateLimiter()
+        results = [limiter.acquire("ip", limit=5, period=60, now=0.0) for _ in range(6)]
+
+        assert [result.allowed for result in results] == [True] * 5 + [False]
+        assert [result.remaining for result in results[:5]] == [4, 3, 2, 1, 0]
+        assert results[5].retry_after == 12.0
+
+    def test_capacity_is_restored_over_time(self):
+        limiter = InMemoryRateLimiter()
+        for _ in range(5):
+            limiter.acquire("ip", limit=5, period=60, now=0.0)
+
+        assert not limiter.acquire("ip", limit=5, period=60, now=11.9).allowed
+        assert limiter.acquire("ip", limit=5, period=60, now=12.0).allowed
+
+    def test_weighted_cost(self):
+        limiter = InMemoryRateLimiter()
+
+        assert limiter.acquire("ip", limit=10, period=60, cost=8, now=0.0).remaining == 2
+        assert not limiter.acquire("ip", limit=10, period=60, cost=3, now=0.0).allowed
+
+    def test_idle_keys_are_evicted(self):
+        limiter = InMemoryRateLimiter()
+        for index in range(100):
+            limiter.acquire(f"ip{index}", limit=60, period=60, now=0.0)
+        assert len(limiter) == 100
+
+        # One second per request drained, so every earlier key is idle by now;
+        # each update evicts a bounded number of them
+        for index in range(50):
+            limiter.acquire(f"fresh{index}", limit=60, period=60, now=2.0)
+        assert len(limiter) == 50
+
+    def test_key_count_is_capped(self):
+        limiter = InMemoryRateLimiter(max_keys=10)
+        for index in range(100):
+            limiter.acquire(f"ip{index}", limit=60, period=60, now=0.0)
+
+        assert len(limiter) == 10
+        assert limiter.evictions == 90
+
+    def test_headers(self):
+        limiter = InMemoryRateLimiter()
+        limiter.acquire("ip", limit=1, period=60, now=0.0)
+        rejected = limiter.acquire("ip", limit=1, period=60, now=0.0)
+
+        assert rejected.headers() == {
+            "X-RateLimit-Limit": "1",
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": "60",
+            "Retry-After": "60",
+        }
+
+    def test_gateway_sets_rate_limit_headers(self, gateway_client, upstream):
+        response = gateway_client.post("/auth/token")
+
+        assert response.headers["x-ratelimit-limit"] == "5"
+        assert response.headers["x-ratelimit-remaining"] == "4"
+
+        for _ in range(4):
+            gateway_client.post("/auth/token")
+        response = gateway_client.post("/auth/token")
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "12"
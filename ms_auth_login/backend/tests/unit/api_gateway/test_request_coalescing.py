@@ -0,0 +1,109 @@
+import asyncio
+
+from fastapi.responses import Response
+
+from backend.services.api_gateway.src.config.settings import SERVICES
+from backend.services.api_gateway.src.middleware.coalesce import RequestCoalescing
+from backend.services.api_gateway.src.middleware.context import RequestContext
+from backend.services.api_gateway.src.utils.route_table import compile_routes
+from backend.services.api_gateway.src.utils.single_flight import SingleFlight
+
+ROUTES = compile_routes(SERVICES)
+
+
+class SlowProxy:
+    """Stand-in for ServiceProxy that answers after a short delay"""
+
+    def __init__(self, body: bytes = b'{"id": 1}'):
+        self.calls = 0
+        self.body = body
+
+    async def forward(self, context, receive, conditional_headers=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return Response(content=self.body, status_code=200)
+
+
+def make_context(path: str, sub: str = "user-1", method: str = "GET", headers=()) -> RequestContext:
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "client": ("127.0.0.1", 1234),
+    }
+    context = RequestContext(scope, ROUTES)
+    context.claims = {"sub": sub}
+    return context
+
+
+def run_concurrently(stage, contexts):
+    async def run():
+        return await asyncio.gather(*(stage.forward(context, None) for context in contexts))
+
+    return asyncio.run(run())
+
+
+class TestRequestCoalescing:
+    def test_identical_requests_share_one_upstream_call(self):
+        proxy, flights = SlowProxy(), SingleFlight()
+        stage = RequestCoalescing(proxy, flights)
+
+        responses = run_concurrently(stage, [make_context("/pdf/documents/1") for _ in range(5)])
+
+        assert proxy.calls == 1
+        assert {response.body for response in responses} == {b'{"id": 1}'}
+        assert flights.stats() == {"in_flight": 0, "upstream_calls": 1, "saved_calls": 4}
+
+    def test_different_users_are_not_coalesced(self):
+        proxy = SlowProxy()
+        stage = RequestCoalescing(proxy, SingleFlight())
+
+        run_concurrently(stage, [make_context("/pdf/documents/1", sub=sub) for sub in ("a", "b")])
+
+        assert proxy.calls == 2
+
+    def test_response_varying_headers_are_part_of_the_key(self):
+        proxy = SlowProxy()
+        stage = RequestCoalescing(proxy, SingleFlight())
+
+        run_concurrently(stage, [
+            make_context("/pdf/documents/1", headers=[("accept-language", language)]) for language in ("en", "de")
+        ])
+
+        assert proxy.calls == 2
+
+    def test_routes_without_opt_in_are_not_coalesced(self):
+        proxy = SlowProxy()
+        stage = RequestCoalescing(proxy, SingleFlight())
+
+        run_concurrently(stage, [make_context("/chat/messages") for _ in range(3)])
+
+        assert proxy.calls == 3
+
+    def test_large_responses_are_not_shared(self):
+        proxy = SlowProxy(body=b"x" * 100)
+        stage = RequestCoalescing(proxy, SingleFlight(), max_body_size=10)
+
+        responses = run_concurrently(stage, [make_context("/pdf/documents/1") for _ in range(3)])
+
+        assert proxy.calls == 3
+        assert all(response.body == b"x" * 100 for response in responses)
+
+    def test_waiters_survive_a_cancelled_leader(self):
+        proxy = SlowProxy()
+        stage = RequestCoalescing(proxy, SingleFlight())
+
+        async def run():
+            leader = asyncio.create_task(stage.forward(make_context("/pdf/documents/1"), None))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(stage.forward(make_context("/pdf/documents/1"), None))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await waiter
+
+        response = asyncio.run(run())
+
+        assert response.status_code == 200
+        assert proxy.calls == 2
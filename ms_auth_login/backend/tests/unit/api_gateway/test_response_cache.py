@@ -0,0 +1,152 @@
+import httpx
+from starlette.datastructures import Headers
+
+from backend.services.api_gateway.src.utils.response_cache import CachedResponse, ResponseCache, parse_cache_control
+
+
+def document_handler(cache_control="max-age=60", etag='"v1"', **extra_headers):
+    """Upstream returning a document, answering 304 when the client's validator matches"""
+    def handler(request: httpx.Request):
+        headers = {"cache-control": cache_control, **extra_headers}
+        if etag is not None:
+            headers["etag"] = etag
+            if request.headers.get("if-none-match") == etag:
+                return httpx.Response(304, headers=headers)
+        return httpx.Response(200, headers=headers, json={"path": request.url.path})
+
+    return handler
+
+
+class TestResponseCaching:
+    def test_fresh_response_is_served_from_cache(self, gateway_client, upstream, access_token):
+        upstream.handler = document_handler()
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        first = gateway_client.get("/pdf/documents/1", headers=headers)
+        second = gateway_client.get("/pdf/documents/1", headers=headers)
+
+        assert len(upstream.requests) == 1
+        assert first.headers["x-cache"] == "MISS"
+        assert second.headers["x-cache"] == "HIT"
+        assert second.json() == first.json() == {"path": "/documents/1"}
+        assert second.headers["etag"] == '"v1"'
+
+    def test_entries_are_per_user(self, gateway_client, upstream, token_factory):
+        upstream.handler = document_handler()
+
+        for token in (token_factory(), token_factory()):
+            gateway_client.get("/pdf/documents/1", headers={"Authorization": f"Bearer {token}"})
+
+        assert len(upstream.requests) == 2
+
+    def test_tokens_without_subject_are_not_cached(self, gateway_client, upstream, token_factory):
+        upstream.handler = document_handler()
+
+        responses = [
+            gateway_client.get("/pdf/documents/1", headers={"Authorization": f"Bearer {token_factory(sub='')}"})
+            for _ in range(2)
+        ]
+
+        assert len(upstream.requests) == 2
+        assert all("x-cache" not in response.headers for response in responses)
+
+    def test_stale_entry_is_revalidated(self, gateway_client, upstream, access_token):
+        upstream.handler = document_handler(cache_control="no-cache")
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        gateway_client.get("/pdf/documents/1", headers=headers)
+        response = gateway_client.get("/pdf/documents/1", headers=headers)
+
+        assert len(upstream.requests) == 2
+        assert upstream.requests[1].headers["if-none-match"] == '"v1"'
+        assert response.status_code == 200
+        assert response.headers["x-cache"] == "REVALIDATED"
+        assert response.json() == {"path": "/documents/1"}
+
+    def test_client_validator_is_answered_by_gateway(self, gateway_client, upstream, access_token):
+        upstream.handler = document_handler()
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        gateway_client.get("/pdf/documents/1", headers=headers)
+        response = gateway_client.get("/pdf/documents/1", headers={**headers, "If-None-Match": '"v1"'})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert len(upstream.requests) == 1
+
+    def test_client_validator_reaches_upstream_on_a_miss(self, gateway_client, upstream, access_token):
+        upstream.handler = document_handler()
+        headers = {"Authorization": f"Bearer {access_token}", "If-None-Match": '"v1"'}
+
+        response = gateway_client.get("/pdf/documents/1", headers=headers)
+
+        assert upstream.requests[0].headers["if-none-match"] == '"v1"'
+        assert response.status_code == 304
+
+    def test_no_store_is_not_cached(self, gateway_client, upstream, access_token):
+        upstream.handler = document_handler(cache_control="no-store")
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        for _ in range(2):
+            gateway_client.get("/pdf/documents/1", headers=headers)
+
+        assert len(upstream.requests) == 2
+
+    def test_routes_not_marked_cacheable_are_not_cached(self, gateway_client, upstream, access_token):
+        upstream.handler = document_handler()
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        for _ in range(2):
+            gateway_client.get("/pdf/documents", headers=headers)
+
+        assert len(upstream.requests) == 2
+
+    def test_vary_keeps_separate_variants(self, gateway_client, upstream, access_token):
+        upstream.handler = document_handler(vary="Accept-Language")
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        for language in ("en", "de", "en"):
+            gateway_client.get("/pdf/documents/1", headers={**headers, "Accept-Language": language})
+
+        assert len(upstream.requests) == 2
+
+    def test_write_invalidates_cached_copies(self, gateway_client, upstream, access_token):
+        upstream.handler = document_handler()
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        gateway_client.get("/pdf/documents/1", headers=headers)
+        gateway_client.put("/pdf/documents/1", headers=headers, json={"title": "new"})
+        gateway_client.get("/pdf/documents/1", headers=headers)
+
+        assert [request.method for request in upstream.requests] == ["GET", "PUT", "GET"]
+
+
+class TestResponseCacheStore:
+    @staticmethod
+    def make_entry(body: bytes) -> CachedResponse:
+        return CachedResponse(200, [(b"etag", b'"v1"')], body, '"v1"', None, 0.0, 60.0, False, 100.0)
+
+    def test_evicts_least_recently_used_by_bytes(self):
+        cache = ResponseCache(max_bytes=3000, max_entry_bytes=3000)
+        headers = Headers({})
+        for name in ("a", "b", "c"):
+            cache.store(("pdf", f"/{name}", "", "u"), (), headers, self.make_entry(b"x" * 600))
+        cache.lookup(("pdf", "/a", "", "u"), headers)
+
+        cache.store(("pdf", "/d", "", "u"), (), headers, self.make_entry(b"x" * 600))
+
+        assert cache.lookup(("pdf", "/b", "", "u"), headers) is None
+        assert cache.lookup(("pdf", "/a", "", "u"), headers) is not None
+        assert cache.current_bytes <= 3000
+        assert cache.evictions == 1
+
+    def test_oversized_entries_are_not_stored(self):
+        cache = ResponseCache(max_bytes=10_000, max_entry_bytes=1000)
+
+        assert not cache.store(("pdf", "/a", "", "u"), (), Headers({}), self.make_entry(b"x" * 2000))
+        assert len(cache) == 0
+
+    def test_parse_cache_control(self):
+        assert parse_cache_control('private, max-age="30", no-cache') == {
+            "private": None, "max-age": "30", "no-cache": None,
+        }
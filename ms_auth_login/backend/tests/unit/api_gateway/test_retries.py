@@ -0,0 +1,248 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend.services.api_gateway.src.config.settings import SERVICES
+from backend.services.api_gateway.src.middleware.context import RequestContext
+from backend.services.api_gateway.src.middleware.proxy import ServiceProxy
+from backend.services.api_gateway.src.upstream import (
+    LatencyTracker,
+    RetryBudget,
+    RetryPolicyRegistry,
+    circuit_breakers,
+    retry_policies,
+    upstream_balancers,
+    upstream_clients,
+)
+from backend.services.api_gateway.src.utils.route_table import compile_routes
+
+ROUTES = compile_routes(SERVICES)
+
+
+def failing_then_ok(failures: int, failure=lambda: httpx.Response(503)):
+    """Upstream handler answering `failure` for the first calls, then 200"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) <= failures:
+            result = failure()
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return httpx.Response(200, json={"attempt": len(calls)})
+
+    return handler
+
+
+class TestRetryBudget:
+    def test_retries_are_a_bounded_share_of_requests(self):
+        budget = RetryBudget(ratio=0.1, capacity=2)
+
+        assert budget.withdraw() and budget.withdraw()
+        assert not budget.withdraw()
+
+        for _ in range(10):
+            budget.deposit()
+        assert budget.withdraw()
+        assert not budget.withdraw()
+        assert budget.stats()["spent"] == 3
+        assert budget.stats()["exhausted"] == 2
+
+    def test_deposits_are_capped(self):
+        budget = RetryBudget(ratio=1, capacity=3)
+        for _ in range(100):
+            budget.deposit()
+
+        assert budget.tokens == 3
+
+
+class TestLatencyTracker:
+    def test_percentile_needs_enough_samples(self):
+        tracker = LatencyTracker(percentile=0.95, min_samples=20)
+        for _ in range(19):
+            tracker.observe(0.01)
+        assert tracker.value() is None
+
+        tracker.observe(0.01)
+        assert tracker.value() == 0.01
+
+    def test_p95_ignores_the_slowest_five_percent(self):
+        tracker = LatencyTracker(percentile=0.95, min_samples=100)
+        for index in range(100):
+            tracker.observe(1.0 if index % 20 == 0 else 0.01)
+
+        assert tracker.value() == 0.01
+
+
+class TestRetries:
+    def test_idempotent_request_is_retried(self, gateway_client, upstream, access_token):
+        upstream.handler = failing_then_ok(1)
+
+        response = gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == 200
+        assert response.json() == {"attempt": 2}
+        assert retry_policies.get("pdf").retries == 1
+
+    def test_connection_errors_are_retried(self, gateway_client, upstream, access_token):
+        upstream.handler = failing_then_ok(2, lambda: httpx.ConnectError("connection refused"))
+
+        response = gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.json() == {"attempt": 3}
+
+    def test_gives_up_after_max_retries(self, gateway_client, upstream, access_token):
+        upstream.handler = failing_then_ok(100)
+
+        response = gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == 503
+        assert len(upstream.requests) == 3
+
+    def test_post_is_never_retried(self, gateway_client, upstream, access_token):
+        upstream.handler = failing_then_ok(1)
+
+        response = gateway_client.post("/pdf/documents", json={"title": "x"},
+                                       headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == 503
+        assert len(upstream.requests) == 1
+
+    def test_put_body_is_replayed(self, gateway_client, upstream, access_token):
+        upstream.handler = failing_then_ok(1)
+
+        response = gateway_client.put("/pdf/documents/1", json={"title": "x"},
+                                      headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == 200
+        assert [request.content for request in upstream.requests] == [b'{"title":"x"}'] * 2
+
+    def test_spent_budget_stops_retries(self, gateway_client, upstream, access_token):
+        upstream.handler = failing_then_ok(100)
+        retry_policies.get("pdf").budget.tokens = 0
+
+        response = gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == 503
+        assert len(upstream.requests) == 1
+        assert retry_policies.get("pdf").budget.exhausted == 1
+
+    def test_non_retryable_status_is_returned_at_once(self, gateway_client, upstream, access_token):
+        upstream.handler = failing_then_ok(1, lambda: httpx.Response(500))
+
+        response = gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == 500
+        assert len(upstream.requests) == 1
+
+
+class TestHedging:
+    @pytest.fixture
+    def hedging_proxy(self, upstream):
+        circuit_breakers.reset()
+        upstream_balancers.reset()
+        policies = RetryPolicyRegistry(SERVICES)
+        policy = policies.get("pdf")
+        for _ in range(policy.latency.min_samples):
+            policy.latency.observe(0.01)
+        return ServiceProxy(policies, hedge=True), policy
+
+    @staticmethod
+    def forward(proxy, handler):
+        upstream_clients.transport = httpx.MockTransport(handler)
+        upstream_clients._clients.clear()
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/pdf/documents",
+            "query_string": b"",
+            "headers": [],
+            "client": ("127.0.0.1", 1234),
+        }
+        return asyncio.run(proxy.forward(RequestContext(scope, ROUTES), None))
+
+    def test_slow_attempt_is_hedged(self, hedging_proxy):
+        proxy, policy = hedging_proxy
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                await asyncio.sleep(5)
+            return httpx.Response(200, json={"attempt": len(calls)})
+
+        response = self.forward(proxy, handler)
+
+        assert response.status_code == 200
+        assert len(calls) == 2
+        assert (policy.hedges, policy.hedge_wins) == (1, 1)
+        # The cancelled attempt was released, not counted as a failure
+        assert all(replica["outstanding"] == 0 and replica["failures"] == 0
+                   for replica in upstream_balancers.get("pdf").stats())
+
+    def test_fast_attempt_is_not_hedged(self, hedging_proxy):
+        proxy, policy = hedging_proxy
+
+        async def handler(request):
+            return httpx.Response(200)
+
+        self.forward(proxy, handler)
+
+        assert policy.hedges == 0
+
+    def test_no_hedge_without_budget(self, hedging_proxy):
+        proxy, policy = hedging_proxy
+        policy.budget.tokens = 0
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200)
+
+        self.forward(proxy, handler)
+
+        assert len(calls) == 1
+        assert policy.hedges == 0
+
+    def test_losing_response_is_closed_when_both_answer_at_once(self, hedging_proxy):
+        proxy, policy = hedging_proxy
+        closed = []
+
+        class Body(httpx.AsyncByteStream):
+            def __init__(self, attempt):
+                self.attempt = attempt
+
+            async def __aiter__(self):
+                yield b"{}"
+
+            async def aclose(self):
+                closed.append(self.attempt)
+
+        async def run():
+            # Both attempts wait for the same answer, so they finish in the same round
+            answered = asyncio.get_running_loop().create_future()
+            asyncio.get_running_loop().call_later(0.1, answered.set_result, None)
+            attempts = []
+
+            async def send(*attempt):
+                attempts.append(len(attempts) + 1)
+                number = len(attempts)
+                await answered
+                return httpx.Response(200, stream=Body(number))
+
+            proxy._send = send
+            scope = {"type": "http", "method": "GET", "path": "/pdf/documents", "query_string": b"",
+                     "headers": [], "client": ("127.0.0.1", 1234)}
+            context = RequestContext(scope, ROUTES)
+            response = await proxy._send_hedged(context, "GET", "/documents", None, [], None, policy, None,
+                                                upstream_balancers.get("pdf"))
+            return response, attempts
+
+        response, attempts = asyncio.run(run())
+
+        assert attempts == [1, 2]
+        assert response.stream.attempt not in closed
+        assert len(closed) == 1
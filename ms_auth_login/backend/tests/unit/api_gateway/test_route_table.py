@@ -0,0 +1,93 @@
+import pytest
+
+from backend.services.api_gateway.src.config.settings import SERVICES
+from backend.services.api_gateway.src.utils.route_table import compile_routes
+
+
+SERVICES_UNDER_TEST = {
+    "auth": {
+        "url": "http://auth-service:8000",
+        "timeout": 10.0,
+        "public_routes": ["/token", "/token/refresh"],
+        "public_rate_limit": "auth",
+        "routes": [{"pattern": "/users/me", "cacheable": True}],
+    },
+    "pdf": {
+        "url": "http://pdf-service:8001",
+        "timeout": 60.0,
+        "public_routes": [],
+        "routes": [
+            {"pattern": "/documents/{document_id}", "cacheable": True},
+            {"pattern": "/documents/{document_id}/audit", "timeout": 5.0},
+            {"pattern": "/documents/search", "timeout": 2.0},
+            {"pattern": "/public/*", "public": True},
+        ],
+    },
+}
+
+
+class TestRouteTable:
+    def setup_method(self):
+        self.routes = compile_routes(SERVICES_UNDER_TEST)
+
+    def test_public_routes_are_segment_aware(self):
+        route, _ = self.routes.match("auth", "/token")
+        assert route.public
+        assert route.rate_limit == "auth"
+
+        route, _ = self.routes.match("auth", "/tokenfoo")
+        assert not route.public
+        assert route.pattern == "/"
+
+        route, _ = self.routes.match("auth", "/token/refresh/")
+        assert route.pattern == "/token/refresh"
+
+    def test_parameterized_routes_capture_params(self):
+        route, params = self.routes.match("pdf", "/documents/42")
+        assert route.cacheable
+        assert params == {"document_id": "42"}
+
+        route, params = self.routes.match("pdf", "/documents/42/audit")
+        assert route.timeout == 5.0
+        assert params == {"document_id": "42"}
+
+    def test_literal_segments_take_precedence(self):
+        route, params = self.routes.match("pdf", "/documents/search")
+        assert route.timeout == 2.0
+        assert params == {}
+
+    def test_parameter_branch_is_tried_when_the_literal_one_leads_nowhere(self):
+        routes = compile_routes({"auth": {"url": "http://auth", "routes": [
+            {"pattern": "/users/me", "cacheable": True},
+            {"pattern": "/users/{user_id}/roles", "timeout": 3.0},
+        ]}})
+
+        route, params = routes.match("auth", "/users/me/roles")
+        assert route.pattern == "/users/{user_id}/roles"
+        assert params == {"user_id": "me"}
+        assert routes.match("auth", "/users/me")[0].cacheable
+
+    def test_conflicting_parameter_names_are_rejected(self):
+        with pytest.raises(ValueError):
+            compile_routes({"pdf": {"url": "http://pdf", "routes": [
+                {"pattern": "/docs/{doc_id}"},
+                {"pattern": "/docs/{id}/pages"},
+            ]}})
+
+    def test_prefix_routes_cover_subpaths(self):
+        assert self.routes.match("pdf", "/public")[0].public
+        assert self.routes.match("pdf", "/public/a/b/c")[0].public
+
+    def test_unmatched_paths_use_service_defaults(self):
+        route, _ = self.routes.match("pdf", "/documents")
+        assert route.pattern == "/"
+        assert route.timeout == 60.0
+        assert not route.public
+
+    def test_unknown_service(self):
+        assert self.routes.match("unknown", "/token") is None
+
+    def test_settings_compile(self):
+        routes = compile_routes(SERVICES)
+        assert set(routes.services()) == set(SERVICES)
+        assert routes.match("auth", "/register")[0].public
@@ -0,0 +1,169 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend.services.api_gateway.src.config.settings import SERVICES
+from backend.services.api_gateway.src.upstream import (
+    DiscoveryError,
+    ServiceDiscovery,
+    UnknownReplica,
+    circuit_breakers,
+    service_discovery,
+    service_routes,
+    upstream_balancers,
+    upstream_clients,
+)
+from backend.services.api_gateway.src.upstream.discovery import parse_discovery_file
+
+
+@pytest.fixture
+def discovery():
+    """The gateway's service discovery, with the configured services restored afterwards"""
+    yield service_discovery
+    service_discovery.apply({})
+
+
+class TestParseDiscoveryFile:
+    def test_json_and_yaml(self):
+        pytest.importorskip("yaml")
+        expected = {"pdf": {"urls": ["http://pdf-1:8001"]}, "chat": None}
+
+        assert parse_discovery_file("services.json", json.dumps({"services": expected})) == expected
+        assert parse_discovery_file("services.yaml", (
+            "services:\n"
+            "  pdf:\n"
+            "    urls: [http://pdf-1:8001]\n"
+            "  chat: null\n"
+        )) == expected
+
+    def test_malformed_files_are_rejected(self):
+        for text in ("{", "[]", '{"services": []}', '{"services": {"pdf": "http://pdf"}}'):
+            with pytest.raises(DiscoveryError):
+                parse_discovery_file("services.json", text)
+
+
+class TestServiceDiscovery:
+    def test_new_replicas_receive_traffic(self, discovery, gateway_client, upstream, access_token):
+        discovery.apply({"pdf": {"urls": ["http://pdf-new:9001"]}})
+
+        response = gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == 200
+        assert upstream.requests[-1].url.host == "pdf-new"
+
+    def test_services_can_be_added_and_removed(self, discovery, gateway_client, upstream, access_token):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        discovery.apply({
+            "search": {"urls": ["http://search:9000"], "audience": None, "routes": [{"pattern": "/q", "public": True}]},
+            "flashcard": None,
+        })
+
+        assert gateway_client.get("/search/q").status_code == 200
+        assert upstream.requests[-1].url.host == "search"
+        # No longer a service route, the app answers it
+        assert gateway_client.get("/flashcard/cards", headers=headers).status_code == 404
+        assert "flashcard" not in SERVICES
+        assert gateway_client.get("/health").json()["services"] == ["auth", "pdf", "chat", "search"]
+
+    def test_replica_changes_keep_balancer_and_breaker_state(self, discovery):
+        discovery.apply({"pdf": {"urls": ["http://pdf-1:8001"]}})
+        breaker = circuit_breakers.get("pdf")
+        first = upstream_balancers.get("pdf").replicas[0]
+        first.requests = 42
+
+        discovery.apply({"pdf": {"urls": ["http://pdf-1:8001", "http://pdf-2:8001"]}})
+
+        assert circuit_breakers.get("pdf") is breaker
+        assert upstream_balancers.get("pdf").replicas[0] is first
+        assert [replica.url for replica in upstream_balancers.get("pdf").replicas] == [
+            "http://pdf-1:8001", "http://pdf-2:8001"
+        ]
+
+        discovery.apply({"pdf": {"urls": ["http://pdf-1:8001", "http://pdf-2:8001"], "timeout": 5.0}})
+
+        assert circuit_breakers.get("pdf") is not breaker
+        assert service_routes.match("pdf", "/anything")[0].timeout == 5.0
+
+    def test_service_removed_mid_retry_is_answered_with_503(self, discovery, gateway_client, upstream,
+                                                             access_token):
+        def handler(request):
+            # The first attempt fails, and the service is gone before the retry
+            discovery.apply({"pdf": None})
+            return httpx.Response(503)
+
+        upstream.handler = handler
+
+        response = gateway_client.get("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == 503
+        assert "no longer available" in response.text
+        assert len(upstream.requests) == 1
+        assert not any(key[0] == "pdf" for key in upstream_clients._clients)
+
+    def test_retired_replica_clients_are_not_recreated(self, discovery):
+        discovery.apply({"pdf": {"urls": ["http://pdf-new:9001"]}})
+
+        with pytest.raises(UnknownReplica):
+            upstream_clients.get("pdf", "http://pdf-service:8001")
+        with pytest.raises(UnknownReplica):
+            upstream_clients.get("search")
+
+    def test_invalid_configuration_changes_nothing(self, discovery):
+        before = dict(SERVICES)
+
+        for overrides in ({"pdf": {"urls": ["pdf-service:8001"]}},
+                          {"pdf": {"routes": [{"pattern": "/x", "unknown": True}]}},
+                          {"pdf": {"balancer": {"strategy": "random"}}},
+                          {"search": {"audience": None}}):
+            with pytest.raises(DiscoveryError):
+                discovery.apply(overrides)
+
+        assert SERVICES == before
+        assert service_routes.match("search", "/") is None
+
+    def test_removed_replica_clients_are_closed_after_draining(self, discovery, upstream, tmp_path):
+        path = tmp_path / "services.json"
+        watcher = ServiceDiscovery(SERVICES, service_routes, path=str(path), interval=0, drain_timeout=0.01)
+
+        async def run():
+            old = upstream_clients.get("pdf")
+            path.write_text(json.dumps({"services": {"pdf": {"urls": ["http://pdf-new:9001"]}}}))
+            await watcher.check()
+            # Requests still using the old client may finish
+            closed_at_swap = old.is_closed
+            await asyncio.sleep(0.05)
+            return old, closed_at_swap, upstream_clients.get("pdf")
+
+        try:
+            old, closed_at_swap, new = asyncio.run(run())
+        finally:
+            asyncio.run(watcher.shutdown())
+            watcher.apply({})
+
+        assert not closed_at_swap
+        assert old.is_closed
+        assert new.base_url.host == "pdf-new"
+        assert watcher.reloads == 1
+
+    def test_file_is_reloaded_only_when_it_changes(self, discovery, tmp_path):
+        path = tmp_path / "services.json"
+        path.write_text(json.dumps({"services": {"pdf": {"urls": ["http://pdf-1:8001"]}}}))
+        watcher = ServiceDiscovery(SERVICES, service_routes, path=str(path), interval=0)
+
+        async def run():
+            await watcher.startup()
+            await watcher.check()
+            path.write_text("{broken")
+            await watcher.check()
+            await watcher.check()
+            await watcher.shutdown()
+
+        try:
+            asyncio.run(run())
+        finally:
+            watcher.apply({})
+
+        assert (watcher.reloads, watcher.failures) == (1, 1)
+        assert "Cannot parse" in watcher.stats()["last_error"]
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import jwt
+
+from backend.services.api_gateway.src.utils.jwt import verify_token, token_cache, revoke_cached_tokens
+from backend.services.api_gateway.src.utils.token_cache import TokenCache
+
+
+class TestTokenCache:
+    def test_entries_never_outlive_token_exp(self):
+        cache = TokenCache(max_ttl=3600)
+        now = time.time()
+        cache.put(b"k", {"sub": "u1", "exp": now + 10}, now=now)
+
+        assert cache.get(b"k", now=now + 9) is not None
+        assert cache.get(b"k", now=now + 10) is None
+        assert cache.stats()["expirations"] == 1
+        assert cache.stats()["entries"] == 0
+
+    def test_expired_tokens_are_not_cached(self):
+        cache = TokenCache()
+        cache.put(b"k", {"exp": time.time() - 1})
+
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        exp = time.time() + 60
+        cache = TokenCache(max_entries=2)
+        for key in (b"a", b"b"):
+            cache.put(key, {"exp": exp})
+        cache.get(b"a")
+        cache.put(b"c", {"exp": exp})
+
+        assert cache.get(b"b") is None
+        assert cache.get(b"a") is not None
+        assert cache.stats()["evictions"] == 1
+
+        small = TokenCache(max_bytes=600)
+        for key in (b"a", b"b", b"c"):
+            small.put(key, {"exp": exp})
+        assert small.stats()["bytes"] <= 600
+        assert small.stats()["entries"] < 3
+
+    def test_purge_by_sub_and_jti(self):
+        exp = time.time() + 60
+        cache = TokenCache()
+        cache.put(b"a", {"sub": "u1", "jti": "t1", "exp": exp})
+        cache.put(b"b", {"sub": "u1", "jti": "t2", "exp": exp})
+        cache.put(b"c", {"sub": "u2", "jti": "t3", "exp": exp})
+
+        assert cache.purge(jti="t3") == 1
+        assert cache.purge(sub="u1") == 2
+        assert cache.stats()["entries"] == 0
+        assert cache.stats()["bytes"] == 0
+
+    def test_verify_token_decodes_once(self, access_token):
+        token_cache.clear()
+
+        with patch("backend.services.api_gateway.src.utils.jwt.jwt.decode", wraps=jwt.decode) as decode:
+            first = asyncio.run(verify_token(access_token))
+            second = asyncio.run(verify_token(access_token))
+
+        assert first == second
+        assert decode.call_count == 1
+
+        assert revoke_cached_tokens(sub=first["sub"]) == 1
+        token_cache.clear()
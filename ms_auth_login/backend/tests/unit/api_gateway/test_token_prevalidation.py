@@ -0,0 +1,71 @@
+import asyncio
+import base64
+import json
+import logging
+from unittest.mock import MagicMock, patch
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from backend.services.api_gateway.src.utils.jwt import prevalidate_token, verify_token, rejected_tokens
+from backend.services.api_gateway.src.utils.log_throttle import ThrottledLogger
+
+
+def _segment(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+
+class TestTokenPrevalidation:
+    def test_valid_token_passes(self, access_token):
+        assert prevalidate_token(access_token) is None
+
+    @pytest.mark.parametrize("token, reason", [
+        ("x" * 10000, "too long"),
+        ("abc.def", "malformed"),
+        ("abc.def.", "malformed"),
+        ("a$c.def.ghi", "malformed"),
+        ("!!!!.def.ghi", "malformed"),
+        ("bm90anNvbg.def.ghi", "undecodable header"),
+        (_segment({"alg": "none"}) + ".e30.c2ln", "algorithm not allowed"),
+        (_segment({"alg": "RS256"}) + ".e30.c2ln", "algorithm not allowed"),
+    ])
+    def test_malformed_tokens_are_rejected(self, token, reason):
+        assert prevalidate_token(token) == reason
+
+    def test_rejected_tokens_skip_verification(self, token_factory):
+        rejected_tokens.clear()
+        forged = token_factory()[:-4] + "AAAA"
+
+        with patch("backend.services.api_gateway.src.utils.jwt.jwt.decode", wraps=jwt.decode) as decode:
+            for _ in range(3):
+                with pytest.raises(HTTPException) as exc_info:
+                    asyncio.run(verify_token(forged))
+                assert exc_info.value.detail == "Invalid authentication credentials"
+
+        assert decode.call_count == 1
+        rejected_tokens.clear()
+
+    def test_gateway_does_not_echo_errors(self, gateway_client, upstream):
+        response = gateway_client.get("/pdf/documents", headers={"Authorization": "Bearer abc.def.ghi"})
+
+        assert response.status_code == 401
+        assert response.text == "Invalid authentication credentials"
+
+
+class TestThrottledLogger:
+    def test_repeated_messages_are_aggregated(self):
+        logger = MagicMock()
+        throttled = ThrottledLogger(logger, interval=60)
+
+        for _ in range(5):
+            throttled.warning("bad_token", "Token rejected")
+        throttled.warning("other", "Other event")
+
+        assert logger.log.call_count == 2
+        logger.log.assert_any_call(logging.WARNING, "Token rejected")
+
+        # Once the interval passed, the next record reports what was suppressed
+        throttled._state["bad_token"] = (throttled._state["bad_token"][0] - 61, 4)
+        throttled.warning("bad_token", "Token rejected")
+        assert "4 similar suppressed" in logger.log.call_args[0][1]
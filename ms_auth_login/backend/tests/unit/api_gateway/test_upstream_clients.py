@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+
+from backend.services.api_gateway.src.upstream.clients import UpstreamClientRegistry
+
+
+SERVICES = {
+    "auth": {"url": "http://auth-service:8000", "timeout": 10.0, "public_routes": []},
+    "pdf": {"url": "http://pdf-service:8001", "public_routes": []},
+}
+
+
+class TestUpstreamClientRegistry:
+    def test_startup_creates_one_client_per_service(self):
+        async def run():
+            registry = UpstreamClientRegistry(SERVICES)
+            await registry.startup()
+            clients = {name: registry.get(name) for name in SERVICES}
+
+            # The same long-lived client is reused for every request
+            assert registry.get("auth") is clients["auth"]
+            assert clients["auth"] is not clients["pdf"]
+            assert str(clients["pdf"].base_url) == "http://pdf-service:8001"
+            assert clients["auth"].timeout.read == 10.0
+
+            await registry.shutdown()
+            assert all(client.is_closed for client in clients.values())
+
+        asyncio.run(run())
+
+    def test_stats_report_pool_usage(self):
+        async def run():
+            registry = UpstreamClientRegistry(SERVICES)
+            await registry.startup()
+            stats = registry.stats()
+            await registry.shutdown()
+            return stats
+
+        stats = asyncio.run(run())
+
+        assert set(stats) == {"auth", "pdf"}
+        assert stats["auth"] == {
+            "in_use": 0,
+            "idle": 0,
+            "waiting": 0,
+            "max_connections": 100,
+            "max_keepalive_connections": 20,
+        }
+
+    def test_requests_use_service_base_url(self):
+        seen = []
+
+        def handler(request: httpx.Request):
+            seen.append(str(request.url))
+            return httpx.Response(200, json={"ok": True})
+
+        async def run():
+            registry = UpstreamClientRegistry(SERVICES, transport=httpx.MockTransport(handler))
+            response = await registry.get("auth").get("/users/me")
+            await registry.shutdown()
+            return response
+
+        response = asyncio.run(run())
+
+        assert response.status_code == 200
+        assert seen == ["http://auth-service:8000/users/me"]
+
+    def test_one_client_per_replica(self):
+        services = {"pdf": {"urls": ["http://pdf-1:8001", {"url": "http://pdf-2:8001", "weight": 2}]}}
+
+        async def run():
+            registry = UpstreamClientRegistry(services)
+            await registry.startup()
+            first, second = registry.get("pdf", "http://pdf-1:8001"), registry.get("pdf", "http://pdf-2:8001")
+            stats = registry.stats()
+            await registry.shutdown()
+            return first, second, stats
+
+        first, second, stats = asyncio.run(run())
+
+        assert first is not second
+        assert str(second.base_url) == "http://pdf-2:8001"
+        assert stats["pdf"]["max_connections"] == 200
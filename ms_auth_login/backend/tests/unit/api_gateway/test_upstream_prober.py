@@ -0,0 +1,77 @@
+import asyncio
+
+import httpx
+
+from backend.services.api_gateway.src.upstream import LoadBalancerRegistry, UpstreamClientRegistry, UpstreamProber
+
+SERVICES = {
+    "pdf": {"urls": ["http://pdf-1:8001", "http://pdf-2:8001"], "public_routes": []},
+    "chat": {"urls": ["http://chat:8003"], "public_routes": []},
+}
+
+
+def run_probes(handler, rounds: int = 1, timeout: float = 1.0) -> UpstreamProber:
+    async def run():
+        clients = UpstreamClientRegistry(SERVICES, transport=httpx.MockTransport(handler))
+        prober = UpstreamProber(SERVICES, clients, LoadBalancerRegistry(SERVICES), timeout=timeout)
+        for _ in range(rounds):
+            await prober.probe_all()
+        await clients.shutdown()
+        return prober
+
+    return asyncio.run(run())
+
+
+class TestUpstreamProber:
+    def test_probes_every_replica(self):
+        seen = []
+
+        def handler(request: httpx.Request):
+            seen.append(str(request.url))
+            return httpx.Response(200)
+
+        prober = run_probes(handler)
+
+        assert sorted(seen) == ["http://chat:8003/health", "http://pdf-1:8001/health", "http://pdf-2:8001/health"]
+        assert prober.service_status("pdf") == "up"
+
+    def test_failing_replica_degrades_service(self):
+        def handler(request: httpx.Request):
+            return httpx.Response(503 if request.url.host == "pdf-2" else 200)
+
+        prober = run_probes(handler, rounds=2)
+
+        assert prober.service_status("pdf") == "degraded"
+        assert prober.service_status("chat") == "up"
+        stats = {probe["url"]: probe for probe in prober.stats("pdf")}
+        assert stats["http://pdf-2:8001"]["availability"] == 0.0
+        assert stats["http://pdf-2:8001"]["last_status"] == 503
+        assert [replica["state"] for replica in prober.balancers.stats()["pdf"]] == ["up", "unhealthy"]
+
+    def test_slow_probe_times_out(self):
+        async def handler(request: httpx.Request):
+            if request.url.host == "chat":
+                await asyncio.sleep(1)
+            return httpx.Response(200)
+
+        prober = run_probes(handler, timeout=0.05)
+
+        assert prober.service_status("chat") == "down"
+        assert prober.stats("chat")[0]["last_error"] == "TimeoutError"
+
+    def test_unprobed_service_is_unknown(self):
+        prober = UpstreamProber(SERVICES, UpstreamClientRegistry(SERVICES), LoadBalancerRegistry(SERVICES))
+
+        assert prober.service_status("pdf") == "unknown"
+        assert prober.stats("pdf")[0] == {"url": "http://pdf-1:8001", "probed": False}
+
+
+class TestDetailedHealth:
+    def test_reports_cached_state_without_upstream_calls(self, gateway_client, upstream):
+        health = gateway_client.get("/health/detailed").json()
+
+        assert upstream.requests == []
+        assert health["services"]["pdf"]["status"] == "unknown"
+        assert health["services"]["pdf"]["replicas"][0]["probe"] == {"url": "http://pdf-service:8001", "probed": False}
+        assert health["system"]["rss_bytes"] > 0
+        assert {"cpu_percent", "loop_lag_ms", "max_loop_lag_ms"} <= set(health["system"])
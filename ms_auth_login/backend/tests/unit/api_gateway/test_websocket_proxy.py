@@ -0,0 +1,210 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.testclient import WebSocketDenialResponse
+from starlette.websockets import WebSocketDisconnect
+
+from backend.services.api_gateway.src.middleware.proxy import IDENTITY_HEADER
+from backend.services.api_gateway.src.middleware.websocket import UpstreamHandshakeError, promote_query_token
+from backend.services.api_gateway.src.upstream import upstream_balancers
+
+
+class EchoUpstream:
+    """In-memory upstream WebSocket echoing every message back"""
+
+    def __init__(self, subprotocol=None):
+        self.subprotocol = subprotocol
+        self.close_code = None
+        self.close_reason = None
+        self.received = []
+        self._queue = asyncio.Queue()
+
+    async def send(self, data):
+        self.received.append(data)
+        await self._queue.put(data)
+
+    async def receive(self):
+        data = await self._queue.get()
+        if data is None:
+            return None
+        if data == "close":
+            self.close_code, self.close_reason = 4000, "done"
+            return None
+        return data
+
+    async def close(self, code=1000, reason=""):
+        if self.close_code is None:
+            self.close_code, self.close_reason = code, reason
+            self._queue.put_nowait(None)
+
+
+@pytest.fixture
+def ws_gateway(gateway_client):
+    """The gateway client with its WebSocket stage opening EchoUpstreams"""
+    stage = gateway_client.app.middleware_stack
+    while not hasattr(stage, "websockets"):
+        stage = stage.app
+    proxy = stage.websockets
+
+    class Handshakes:
+        calls = []
+        error = None
+
+    async def connect(url, headers, subprotocols, timeout):
+        if Handshakes.error is not None:
+            raise UpstreamHandshakeError(Handshakes.error)
+        upstream = EchoUpstream(subprotocols[0] if subprotocols else None)
+        Handshakes.calls.append({"url": url, "headers": dict(headers), "upstream": upstream})
+        return upstream
+
+    proxy.connect = connect
+    gateway_client.handshakes = Handshakes
+    gateway_client.websocket_proxy = proxy
+    return gateway_client
+
+
+class TestPromoteQueryToken:
+    def test_token_moves_into_the_authorization_header(self):
+        scope = {"headers": [(b"host", b"gateway")], "query_string": b"room=1&access_token=abc"}
+
+        promoted = promote_query_token(scope)
+
+        assert (b"authorization", b"Bearer abc") in promoted["headers"]
+        assert promoted["query_string"] == b"room=1"
+
+    def test_authorization_header_wins(self):
+        scope = {"headers": [(b"authorization", b"Bearer header")], "query_string": b"access_token=abc"}
+
+        assert promote_query_token(scope) is scope
+
+
+class TestWebSocketProxy:
+    def test_messages_are_relayed_both_ways(self, ws_gateway, access_token):
+        with ws_gateway.websocket_connect("/chat/ws?room=1",
+                                          headers={"Authorization": f"Bearer {access_token}"}) as websocket:
+            websocket.send_text("hello")
+            assert websocket.receive_text() == "hello"
+            websocket.send_bytes(b"\x00\x01")
+            assert websocket.receive_bytes() == b"\x00\x01"
+
+        call = ws_gateway.handshakes.calls[0]
+        assert call["url"] == "ws://chat-service:8003/ws?room=1"
+        assert call["upstream"].received == ["hello", b"\x00\x01"]
+        # The client's close reached the upstream, and the replica is free again
+        assert call["upstream"].close_code == 1000
+        assert all(replica["outstanding"] == 0 for replica in upstream_balancers.get("chat").stats())
+
+    def test_token_from_query_string(self, ws_gateway, access_token):
+        with ws_gateway.websocket_connect(f"/chat/ws?access_token={access_token}&room=1") as websocket:
+            websocket.send_text("hi")
+            assert websocket.receive_text() == "hi"
+
+        call = ws_gateway.handshakes.calls[0]
+        assert call["url"] == "ws://chat-service:8003/ws?room=1"
+        assert call["headers"]["authorization"] == f"Bearer {access_token}"
+
+    def test_subprotocol_and_headers(self, ws_gateway, access_token):
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Sec-WebSocket-Protocol": "chat.v2, chat.v1",
+            IDENTITY_HEADER: "forged",
+        }
+        with ws_gateway.websocket_connect("/chat/ws", headers=headers) as websocket:
+            assert websocket.accepted_subprotocol == "chat.v2"
+
+        forwarded = ws_gateway.handshakes.calls[0]["headers"]
+        assert not any(name.startswith("sec-websocket") for name in forwarded)
+        assert "upgrade" not in forwarded
+        assert IDENTITY_HEADER not in forwarded
+
+    def test_unauthenticated_handshake_is_denied(self, ws_gateway):
+        with pytest.raises(WebSocketDenialResponse) as exc_info:
+            with ws_gateway.websocket_connect("/chat/ws"):
+                pass
+
+        assert exc_info.value.status_code == 401
+        assert ws_gateway.handshakes.calls == []
+
+    def test_route_without_websockets_is_denied(self, ws_gateway, access_token):
+        with pytest.raises(WebSocketDenialResponse) as exc_info:
+            with ws_gateway.websocket_connect("/pdf/documents", headers={"Authorization": f"Bearer {access_token}"}):
+                pass
+
+        assert exc_info.value.status_code == 404
+
+    def test_connection_cap(self, ws_gateway, access_token):
+        ws_gateway.websocket_proxy.max_connections = 1
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        with ws_gateway.websocket_connect("/chat/ws", headers=headers):
+            with pytest.raises(WebSocketDenialResponse) as exc_info:
+                with ws_gateway.websocket_connect("/chat/ws", headers=headers):
+                    pass
+
+        assert exc_info.value.status_code == 503
+        assert ws_gateway.websocket_proxy.connections["chat"] == 0
+
+    def test_upstream_handshake_failure(self, ws_gateway, access_token):
+        ws_gateway.handshakes.error = 403
+
+        with pytest.raises(WebSocketDenialResponse) as exc_info:
+            with ws_gateway.websocket_connect("/chat/ws", headers={"Authorization": f"Bearer {access_token}"}):
+                pass
+
+        assert exc_info.value.status_code == 403
+
+    def test_upstream_close_code_is_relayed(self, ws_gateway, access_token):
+        with ws_gateway.websocket_connect("/chat/ws", headers={"Authorization": f"Bearer {access_token}"}) as websocket:
+            websocket.send_text("close")
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                websocket.receive_text()
+
+        assert exc_info.value.code == 4000
+
+    def test_idle_connection_is_closed(self, ws_gateway, access_token):
+        ws_gateway.websocket_proxy.idle_timeout = 0.05
+
+        with ws_gateway.websocket_connect("/chat/ws", headers={"Authorization": f"Bearer {access_token}"}) as websocket:
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                websocket.receive_text()
+
+        assert exc_info.value.code == 1001
+        assert ws_gateway.handshakes.calls[0]["upstream"].close_code == 1001
+
+    def test_oversized_message_closes_the_connection(self, ws_gateway, access_token):
+        ws_gateway.websocket_proxy.max_message_size = 4
+
+        with ws_gateway.websocket_connect("/chat/ws", headers={"Authorization": f"Bearer {access_token}"}) as websocket:
+            websocket.send_text("too long")
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                websocket.receive_text()
+
+        assert exc_info.value.code == 1009
+        assert ws_gateway.handshakes.calls[0]["upstream"].received == []
+
+    def test_missing_websockets_package(self, ws_gateway, access_token):
+        ws_gateway.websocket_proxy.connect = None
+
+        with pytest.raises(WebSocketDenialResponse) as exc_info:
+            with ws_gateway.websocket_connect("/chat/ws", headers={"Authorization": f"Bearer {access_token}"}):
+                pass
+
+        assert exc_info.value.status_code == 501
+
+
+class TestServerSentEvents:
+    def test_event_stream_is_relayed_unbuffered(self, gateway_client, upstream, access_token):
+        events = b"data: one\n\n" * 200
+        upstream.handler = lambda request: httpx.Response(
+            200, content=events, headers={"content-type": "text/event-stream"}
+        )
+
+        response = gateway_client.get("/chat/stream", headers={
+            "Authorization": f"Bearer {access_token}",
+            "Accept-Encoding": "gzip",
+        })
+
+        assert response.status_code == 200
+        assert response.content == events
+        assert "content-encoding" not in response.headers
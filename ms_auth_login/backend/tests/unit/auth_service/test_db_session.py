@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, event, text
+
+from backend.services.auth_service.src.db import deadline as db_deadline
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """A session on an in-memory engine posing as Postgres, and the SET statements it ran"""
+    engine = create_engine("sqlite://")
+    monkeypatch.setattr(engine.dialect, "name", "postgresql")
+    monkeypatch.setattr(db_deadline, "deadline_remaining", lambda: 1.5)
+    seen = []
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SET LOCAL"):
+            seen.append(statement)
+            # SQLite has no statement_timeout
+            statement = "SELECT 1"
+        return statement, parameters
+
+    db = db_deadline.session_factory(engine)()
+    yield db, seen
+    db.close()
+
+
+class TestStatementTimeout:
+    def test_timeout_is_set_for_every_transaction(self, statements):
+        db, seen = statements
+
+        db.execute(text("SELECT 1"))
+        db.commit()
+        # SET LOCAL ended with the first transaction, the next one needs its own
+        db.execute(text("SELECT 1"))
+
+        assert seen == ["SET LOCAL statement_timeout = 1500"] * 2
+
+    def test_no_timeout_without_deadline(self, statements, monkeypatch):
+        db, seen = statements
+        monkeypatch.setattr(db_deadline, "deadline_remaining", lambda: None)
+
+        db.execute(text("SELECT 1"))
+
+        assert seen == []
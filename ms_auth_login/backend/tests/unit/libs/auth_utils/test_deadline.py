@@ -0,0 +1,55 @@
+from fastapi import BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+
+from backend.libs.auth_utils.src.auth_utils.deadline import DeadlineMiddleware, check_deadline, deadline_remaining
+
+
+def make_app(seen: dict) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware)
+
+    def after_response():
+        seen["background"] = deadline_remaining()
+
+    @app.get("/work")
+    def work(background_tasks: BackgroundTasks):
+        check_deadline()
+        seen["remaining"] = deadline_remaining()
+        background_tasks.add_task(after_response)
+        return {}
+
+    return app
+
+
+class TestDeadlineMiddleware:
+    def test_forwarded_deadline_is_visible_to_handlers(self):
+        seen = {}
+        client = TestClient(make_app(seen))
+
+        assert client.get("/work", headers={"X-Request-Timeout-Ms": "2000"}).status_code == 200
+        assert 0 < seen["remaining"] <= 2
+
+    def test_background_tasks_are_not_bound_by_the_deadline(self):
+        seen = {}
+        client = TestClient(make_app(seen))
+
+        client.get("/work", headers={"X-Request-Timeout-Ms": "2000"})
+
+        assert seen["background"] is None
+
+    def test_expired_deadline_is_rejected_before_running(self):
+        seen = {}
+        client = TestClient(make_app(seen))
+
+        response = client.get("/work", headers={"X-Request-Timeout-Ms": "0"})
+
+        assert response.status_code == 504
+        assert seen == {}
+
+    def test_no_header_means_no_deadline(self):
+        seen = {}
+        client = TestClient(make_app(seen))
+
+        client.get("/work")
+
+        assert seen["remaining"] is None